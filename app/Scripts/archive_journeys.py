@@ -0,0 +1,58 @@
+"""
+Move journeys + journey_events older than the retention window into the Parquet archive
+(app/Services/journeyService/archive.py). Safe to run from cron, and to re-run after it died halfway.
+
+    python app/Scripts/archive_journeys.py
+    python app/Scripts/archive_journeys.py --retention-days 14 --archive-dir /data/routereality-archive
+    python app/Scripts/archive_journeys.py --list          # what's in the archive, nothing moved
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.models.Database import engine
+from app.Services.journeyService.archive import (
+    JOURNEY_ARCHIVE_DIR, KINDS, archive_parts, archived_days, pyarrow_or_raise,
+)
+from app.Services.journeyService.retention import JOURNEY_RETENTION_DAYS, min_retention_days, run_retention
+
+
+def summary(archive_dir: str) -> None:
+    for kind in KINDS:
+        days = archived_days(kind, archive_dir)
+        if not days:
+            print(f"  {kind:<15} empty")
+            continue
+        parts = archive_parts(kind, archive_dir)
+        # footers only, no data pages read
+        rows = sum(pyarrow_or_raise().parquet.ParquetFile(p).metadata.num_rows for p in parts)
+        size = sum(p.stat().st_size for p in parts)
+        print(f"  {kind:<15} {rows:>10} rows, {len(days)} days ({days[0].isoformat()} → {days[-1].isoformat()}), "
+              f"{len(parts)} files, {size / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old journeys to Parquet and delete them from the database")
+    parser.add_argument("--retention-days", type=int, default=JOURNEY_RETENTION_DAYS)
+    parser.add_argument("--archive-dir", default=JOURNEY_ARCHIVE_DIR)
+    parser.add_argument("--list", action="store_true", help="only summarise the archive")
+    args = parser.parse_args()
+    if not args.list and args.retention_days < min_retention_days():
+        parser.error(f"--retention-days must be at least {min_retention_days()}, "
+                     "journeys younger than that can still be in flight")
+
+    engine.echo = False
+    if not args.list:
+        started = time.perf_counter()
+        report = run_retention(args.retention_days, args.archive_dir)
+        journeys, events = report["journeys"], report["journey_events"]
+        print(f"Before {report['before']}: {journeys['rows']} journeys, {events['rows']} journey events archived "
+              f"({(journeys['bytes'] + events['bytes']) / 1e6:.1f} MB) in {time.perf_counter() - started:.1f}s")
+
+    print(f"{args.archive_dir}:")
+    summary(args.archive_dir)
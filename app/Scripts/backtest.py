@@ -0,0 +1,146 @@
+"""
+Offline backtest of the prediction logic against historical journeys.
+
+    python app/Scripts/backtest.py --workers 8
+    python app/Scripts/backtest.py --parquet journeys.parquet --horizon 5
+    python app/Scripts/backtest.py --archive --days 180      # the journey archive, the DB isn't touched
+    python app/Scripts/backtest.py --predictor app.Services.Prediction.logic:predict_bus_time \\
+                                   --predictor my_tuning:predict_bus_time_v2
+
+Predictors take the same keyword arguments as predict_bus_time and return (datetime, confidence).
+They get the headway profile as built from the HEADWAY_PROFILE_LOOKBACK_DAYS before each day, and
+downstream ETAs from the segment matrices - those come from the DB (the current ones, so the last
+SEGMENT_HISTORY_DAYS shape every day replayed) and are left out with --archive / --parquet.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.Services.Prediction.backtest import DEFAULT_PREDICTOR, records_from_rows, run_backtest
+from app.Services.Prediction.profiles import HEADWAY_PROFILE_LOOKBACK_DAYS
+
+COLUMNS = ["route_id", "end_stop_id", "created_at", "start_time", "status", "start_stop_id", "planned_start_time"]
+# what an export can do without: no lateness in the profiles / no downstream ETAs then
+OPTIONAL_COLUMNS = {"start_stop_id", "planned_start_time"}
+
+
+def load_from_db(days: int):
+    from sqlalchemy import select
+    from app.models.Database import SessionLocal
+    from app.models.Journey import Journey
+
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(*(getattr(Journey, c) for c in COLUMNS))
+            .where(Journey.created_at >= since)
+        ).all()
+    finally:
+        db.close()
+    return records_from_rows(rows)
+
+
+def load_from_parquet(path: Path):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("pyarrow is needed for --parquet (pip install pyarrow)")
+
+    present = set(pq.read_schema(path).names)
+    table = pq.read_table(path, columns=[c for c in COLUMNS if c in present or c not in OPTIONAL_COLUMNS])
+    return records_from_rows(SimpleNamespace(**row) for row in table.to_pylist())
+
+
+def load_from_archive(archive_dir: str, days: int):
+    from app.Services.journeyService.archive import iter_archive
+
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).date()
+    try:
+        batches = iter_archive("journeys", since=since, columns=COLUMNS, archive_dir=archive_dir)
+        return records_from_rows(SimpleNamespace(**row) for batch in batches for row in batch.to_pylist())
+    except RuntimeError as e:  # no pyarrow
+        raise SystemExit(str(e))
+
+
+def load_segment_matrices():
+    from app.models.Database import SessionLocal
+    from app.Services.Prediction.segments import build_segment_matrices
+
+    db = SessionLocal()
+    try:
+        return build_segment_matrices(db)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay journeys and score the prediction logic per route")
+    parser.add_argument("--parquet", type=Path, help="read journeys from a Parquet export instead of the DB")
+    parser.add_argument("--archive", nargs="?", const="", metavar="DIR",
+                        help="read archived journeys (archive_journeys.py) instead of the DB, defaults to JOURNEY_ARCHIVE_DIR")
+    parser.add_argument("--days", type=int, default=365, help="how much DB / archive history to replay")
+    parser.add_argument("--horizon", type=float, default=10.0, help="minutes before each arrival to predict from")
+    parser.add_argument("--predictor", action="append", help="module:function, repeat to A/B several")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--no-timetable", action="store_true", help="don't feed scheduled times in")
+    parser.add_argument("--profile-days", type=int, default=HEADWAY_PROFILE_LOOKBACK_DAYS,
+                        help="history before each day the headway profiles are built from, 0 leaves them out")
+    parser.add_argument("--no-downstream", action="store_true", help="don't feed downstream ETAs in")
+    parser.add_argument("--json", action="store_true", help="dump the raw report as JSON")
+    args = parser.parse_args()
+    if args.horizon <= 0:
+        parser.error("--horizon has to be more than 0 minutes, the prediction is made before the arrival")
+
+    started = time.perf_counter()
+    if args.parquet:
+        records = load_from_parquet(args.parquet)
+    elif args.archive is not None:
+        from app.Services.journeyService.archive import JOURNEY_ARCHIVE_DIR
+        records = load_from_archive(args.archive or JOURNEY_ARCHIVE_DIR, args.days)
+    else:
+        records = load_from_db(args.days)
+    print(f"Loaded {len(records)} journeys in {time.perf_counter() - started:.1f}s")
+
+    from_db = not args.parquet and args.archive is None
+    matrices = load_segment_matrices() if from_db and not args.no_downstream else None
+    inputs = ["events", "arrivals"]
+    inputs += [] if args.no_timetable else ["timetable"]
+    inputs += [f"profiles ({args.profile_days}d)"] if args.profile_days else []
+    inputs += ["downstream"] if matrices else []
+    print(f"Inputs: {', '.join(inputs)}")
+
+    started = time.perf_counter()
+    report = run_backtest(
+        records,
+        predictors=args.predictor or [DEFAULT_PREDICTOR],
+        horizon_min=args.horizon,
+        workers=args.workers,
+        use_timetable=not args.no_timetable,
+        profile_days=args.profile_days,
+        matrices=matrices,
+    )
+    print(f"Replayed in {time.perf_counter() - started:.1f}s on {args.workers} workers")
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    for predictor, routes in report.items():
+        print(f"\n{predictor}")
+        print(f"{'route':<12}{'n':>8}{'MAE':>8}{'p90':>8}{'bias':>8}{'us/call':>10}")
+        for route_id, m in sorted(routes.items()):
+            print(f"{route_id:<12}{m['count']:>8}{m['mae_min']:>8}{m['p90_abs_min']:>8}{m['bias_min']:>8}{m['us_per_call']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Load test the API in DB_MODE=sync and DB_MODE=async and compare throughput / latency.
+
+Starts uvicorn once per mode against whatever DATABASE_URL points at, hammers it with
+--concurrency clients for --duration seconds, prints requests/s, p50 and p99.
+
+    python app/Scripts/bench_db_modes.py --route 9B --concurrency 200 --duration 20
+    python app/Scripts/bench_db_modes.py --route 9B --start-stop 700000001 --end-stop 700000009
+
+With --start-stop/--end-stop every 10th request is a journey start (a write), the rest are
+route predictions. Needs httpx, and asyncpg / aiosqlite for the async mode.
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import httpx
+import numpy as np
+
+MODES = ["sync", "async"]
+
+
+def start_server(mode: str, port: int, workers: int) -> subprocess.Popen:
+    env = dict(os.environ, DB_MODE=mode)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=project_root,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+async def wait_healthy(base: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base}/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise SystemExit(f"server at {base} never came up")
+
+
+async def client_loop(client: httpx.AsyncClient, args, stop_at: float, latencies: list, errors: list) -> None:
+    n = 0
+    while time.monotonic() < stop_at:
+        n += 1
+        started = time.perf_counter()
+        try:
+            if args.start_stop and n % 10 == 0:
+                r = await client.post("/journeys/start", json={
+                    "route_id": args.route,
+                    "start_stop_id": args.start_stop,
+                    "end_stop_id": args.end_stop,
+                })
+            else:
+                r = await client.get(f"/predictions/route/{args.route}")
+            if r.status_code >= 500:
+                errors.append(r.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - started)
+
+
+async def run_load(base: str, args) -> dict:
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        # warm up caches / connection pools before measuring
+        await client.get(f"/predictions/route/{args.route}")
+
+        stop_at = time.monotonic() + args.duration
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            client_loop(client, args, stop_at, latencies, errors)
+            for _ in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(ms, 50)) if len(ms) else float("nan"),
+        "p99_ms": float(np.percentile(ms, 99)) if len(ms) else float("nan"),
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sync vs async DB mode under load")
+    parser.add_argument("--route", required=True)
+    parser.add_argument("--start-stop")
+    parser.add_argument("--end-stop")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers per run")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    args = parser.parse_args()
+
+    if bool(args.start_stop) != bool(args.end_stop):
+        parser.error("--start-stop and --end-stop go together")
+
+    results = {}
+    for mode in args.modes:
+        server = start_server(mode, args.port, args.workers)
+        base = f"http://127.0.0.1:{args.port}"
+        try:
+            asyncio.run(wait_healthy(base))
+            print(f"{mode}: {args.concurrency} clients for {args.duration:.0f}s...")
+            results[mode] = asyncio.run(run_load(base, args))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"\n{'mode':<8}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for mode, r in results.items():
+        print(f"{mode:<8}{r['requests']:>10}{r['rps']:>10.1f}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
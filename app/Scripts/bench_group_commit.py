@@ -0,0 +1,157 @@
+"""
+Journey events/second with and without group commit (EVENT_GROUP_COMMIT).
+
+Seeds --journeys synthetic STARTED journeys on a throwaway route, then --threads request
+threads push every journey through DELAYED → ARRIVED → STOP_REACHED, once through
+JourneyEventHandler.add_event (session + commit per event, like the router) and once
+through the group commit writer. Final statuses are checked and the rows deleted afterwards.
+
+    python app/Scripts/bench_group_commit.py
+    python app/Scripts/bench_group_commit.py --database-url sqlite:////tmp/bench.db --threads 32 --journeys 2000
+    python app/Scripts/bench_group_commit.py --max-batch 128 --wait-ms 5      (uses DATABASE_URL if no --database-url)
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from uuid import uuid4
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+EVENTS = ["DELAYED", "ARRIVED", "STOP_REACHED"]
+BENCH_ROUTE = "BENCH-GC"
+
+
+def seed(n: int, n_stops: int = 10):
+    from app.models.Database import SessionLocal
+    from app.models.Journey import Journey
+    from app.models.Route import Route, RouteStop, Stop
+
+    db = SessionLocal()
+    try:
+        if db.get(Route, BENCH_ROUTE) is None:
+            db.add(Route(id=BENCH_ROUTE, name="group commit bench"))
+            for i in range(n_stops):
+                db.add(Stop(id=f"{BENCH_ROUTE}-{i}", name=f"Bench stop {i}", latitude=54.6, longitude=-5.9 + i * 0.001))
+                db.add(RouteStop(route_id=BENCH_ROUTE, stop_id=f"{BENCH_ROUTE}-{i}", sequence=i + 1))
+            db.flush()
+
+        now = datetime.now(timezone.utc)
+        ids = [str(uuid4()) for _ in range(n)]
+        db.add_all([
+            Journey(
+                id=journey_id, route_id=BENCH_ROUTE,
+                start_stop_id=f"{BENCH_ROUTE}-{k % (n_stops - 1)}", end_stop_id=f"{BENCH_ROUTE}-{n_stops - 1}",
+                status="STARTED", created_at=now, planned_start_time=now,
+                predicted_status="PENDING", predicted_arrival=now.isoformat(),
+                data_source="bench", is_synthetic=True,
+            )
+            for k, journey_id in enumerate(ids)
+        ])
+        db.commit()
+        return ids
+    finally:
+        db.close()
+
+
+def cleanup() -> None:
+    from sqlalchemy import delete
+    from app.models.Database import engine
+    from app.models.Journey import Journey
+    from app.models.JourneyEvent import JourneyEvent
+    from app.models.Route import Route, RouteStop, Stop
+    from app.models.StopArrivalStats import StopArrivalStats
+    from app.models.StopTripRollup import StopTripRollup
+
+    with engine.begin() as conn:
+        conn.execute(delete(JourneyEvent).where(JourneyEvent.route_id == BENCH_ROUTE))
+        conn.execute(delete(StopTripRollup).where(StopTripRollup.stop_id.like(f"{BENCH_ROUTE}-%")))
+        conn.execute(delete(Journey).where(Journey.route_id == BENCH_ROUTE))
+        conn.execute(delete(StopArrivalStats).where(StopArrivalStats.route_id == BENCH_ROUTE))
+        conn.execute(delete(RouteStop).where(RouteStop.route_id == BENCH_ROUTE))
+        conn.execute(delete(Stop).where(Stop.id.like(f"{BENCH_ROUTE}-%")))
+        conn.execute(delete(Route).where(Route.id == BENCH_ROUTE))
+
+
+def run(label: str, ids, threads: int, send) -> None:
+    from app.models.Database import SessionLocal
+    from app.models.Journey import Journey
+
+    errors = []
+
+    def journey_worker(journey_id):
+        for event in EVENTS:
+            try:
+                send(journey_id, event)
+            except Exception as e:
+                errors.append(e)
+                return
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(journey_worker, ids))
+    elapsed = time.perf_counter() - started
+
+    db = SessionLocal()
+    try:
+        finished = db.query(Journey).filter(Journey.id.in_(ids), Journey.status == "STOP_REACHED").count()
+    finally:
+        db.close()
+
+    events = len(ids) * len(EVENTS)
+    print(f"  {label:<14} {events / elapsed:>8,.0f} events/s  ({events} events in {elapsed:.2f}s, "
+          f"{finished}/{len(ids)} journeys finished, {len(errors)} errors)")
+    if errors:
+        print(f"    first error: {errors[0]!r}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the journey event write path with and without group commit")
+    parser.add_argument("--database-url", help="defaults to DATABASE_URL, or a temp sqlite file if that isn't set")
+    parser.add_argument("--journeys", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--wait-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='gc-bench-')}/bench.db")
+
+    from app.models.Database import Base, SessionLocal, engine
+    import app.models.Journey, app.models.JourneyEvent, app.models.Route, app.models.StopArrivalStats, app.models.StopTripRollup  # noqa: F401 (tables)
+    from app.Services.journeyService.eventHandler import JourneyEventHandler
+    from app.Services.journeyService.group_commit import GroupCommitWriter
+
+    engine.echo = False
+    Base.metadata.create_all(engine)
+    print(f"{engine.url.render_as_string(hide_password=True)}: {args.journeys} journeys x {len(EVENTS)} events, "
+          f"{args.threads} threads")
+
+    def direct(journey_id, event):
+        db = SessionLocal()
+        try:
+            JourneyEventHandler.add_event(journey_id=journey_id, event_type=event, db=db)
+        finally:
+            db.close()
+
+    writer = GroupCommitWriter(max_batch=args.max_batch, max_wait_ms=args.wait_ms)
+
+    try:
+        run("commit/event", seed(args.journeys), args.threads, direct)
+
+        writer.start()
+        run("group commit", seed(args.journeys), args.threads, writer.add_event)
+        writer.stop()
+        stats = writer.stats()
+        print(f"    {stats['batches']} batches, avg {stats['avg_batch']} events, largest {stats['largest_batch']}, "
+              f"{stats['replayed_batches']} replayed")
+    finally:
+        writer.stop()
+        cleanup()
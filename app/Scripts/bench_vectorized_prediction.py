@@ -0,0 +1,96 @@
+"""
+Time vectorized.predict_bus_times against logic.predict_bus_time per query.
+
+Random queries are built to hit every branch (fresh / stale ARRIVED, delays, downstream
+ETAs, crowd history, timetable missed or not, profile lateness / headway). That they give
+the same answers is tests/test_vectorized_prediction.py's job.
+
+    python app/Scripts/bench_vectorized_prediction.py --queries 20000
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, time as dtime, timedelta, timezone
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.Services.Prediction.logic import predict_bus_time
+from app.Services.Prediction.profiles import ProfileSignal
+from app.Services.Prediction.vectorized import pack_queries, predict_bus_times
+
+
+def random_query(rng: random.Random) -> dict:
+    now = datetime(2026, 1, 5, tzinfo=timezone.utc) + timedelta(seconds=rng.uniform(0, 14 * 86400))
+
+    def around(lo_min, hi_min):
+        return now + timedelta(minutes=rng.uniform(lo_min, hi_min))
+
+    events = []
+    for _ in range(rng.choice([0, 0, 1, 2, 5])):
+        kind = rng.choice(["ARRIVED", "ARRIVED", "DELAYED", "STARTED"])
+        events.append({"type": kind, "time": around(-30, 1)})
+
+    past = sorted((around(-200, 20) for _ in range(rng.choice([0, 1, 3, 10, 14]))), reverse=True)
+
+    static_time, is_tomorrow = None, False
+    if rng.random() < 0.7:
+        at = around(-40, 60)
+        static_time = dtime(at.hour, at.minute)
+        is_tomorrow = rng.random() < 0.1
+
+    profile = None
+    if rng.random() < 0.5:
+        profile = ProfileSignal(
+            headway_min=rng.choice([None, rng.uniform(4, 40)]),
+            lateness_min=rng.choice([None, rng.uniform(-10, 25)]),
+            samples=rng.randint(3, 50),
+        )
+
+    downstream = around(-5, 30) if rng.random() < 0.3 else None
+
+    return {
+        "static_time": static_time,
+        "static_is_tomorrow": is_tomorrow,
+        "user_events": events,
+        "past_arrivals": past,
+        "now": now,
+        "profile": profile,
+        "downstream_eta": downstream,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized prediction against the scalar one")
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    queries = [random_query(rng) for _ in range(args.queries)]
+
+    started = time.perf_counter()
+    for q in queries:
+        predict_bus_time(**q)
+    scalar_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    arrays = pack_queries(queries)
+    pack_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    predict_bus_times(**arrays)
+    vector_s = time.perf_counter() - started
+
+    n = len(queries)
+    print(f"{n} queries")
+    print(f"  scalar      {scalar_s / n * 1e6:8.2f} us/query")
+    print(f"  vectorized  {vector_s / n * 1e6:8.2f} us/query (+{pack_s / n * 1e6:.2f} us/query packing)")
+    print(f"  speedup     {scalar_s / vector_s:8.1f}x ({scalar_s / (vector_s + pack_s):.1f}x with packing)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+Rebuild headway_profiles from historical arrivals.
+Run it from cron / beat every so often - API workers pick the new table up on their next refresh.
+
+    python app/Scripts/build_headway_profiles.py
+    python app/Scripts/build_headway_profiles.py --days 28
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.models.HeadwayProfile import HeadwayProfile
+from app.Scripts.rebuild_arrival_stats import run_rebuild
+from app.Services.Prediction.profiles import HEADWAY_PROFILE_LOOKBACK_DAYS, build_headway_profiles
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild headway_profiles from journeys")
+    parser.add_argument("--days", type=int, default=HEADWAY_PROFILE_LOOKBACK_DAYS, help="look back this many days")
+    args = parser.parse_args()
+
+    run_rebuild(HeadwayProfile, build_headway_profiles, "route/stop profiles", lookback_days=args.days)
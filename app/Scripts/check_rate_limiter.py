@@ -0,0 +1,198 @@
+"""
+Checks the rate limiter backends (app/utils/rate_limiter.py) the way the workers use them.
+
+- cooldown, refund + token bucket behaviour per backend
+- several processes hitting one key: the shared backends must allow exactly `capacity`
+  in total (the in-memory one allows capacity per process, which is the bug it replaced)
+- the memory backend stays at max_keys under a flood of distinct keys
+- hits/s per backend
+
+The redis backend is run against a tiny in-process RESP stand-in (SET NX PX / INCR / DECR / PTTL / DEL),
+or a real server with --redis-url. tests/test_rate_limiter.py asserts the same behaviour under pytest.
+
+    python app/Scripts/check_rate_limiter.py
+    python app/Scripts/check_rate_limiter.py --processes 8 --redis-url redis://127.0.0.1:6379/0
+"""
+
+import argparse
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import Pool
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.utils.rate_limiter import MemoryBackend, RateLimit, RateLimiter, RespBackend, SQLiteBackend
+
+
+class _StandIn(socketserver.StreamRequestHandler):
+    """Just enough of the RESP protocol for RespBackend"""
+
+    disable_nagle_algorithm = True
+    store = {}  # key → (value, expires_at or None)
+    lock = threading.Lock()
+
+    def _reply(self, value):
+        if isinstance(value, int):
+            self.wfile.write(b":%d\r\n" % value)
+        elif value is None:
+            self.wfile.write(b"$-1\r\n")
+        else:
+            self.wfile.write(b"+%s\r\n" % value.encode())
+
+    def _get(self, key, now):
+        entry = self.store.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            del self.store[key]
+            return None
+        return entry
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                size = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(size + 2)[:-2].decode())
+
+            cmd, key = args[0].upper(), args[1] if len(args) > 1 else None
+            with self.lock:
+                now = time.monotonic()
+                entry = self._get(key, now) if key is not None else None
+                if cmd in ("PING", "AUTH", "SELECT"):
+                    self._reply("OK")
+                elif cmd == "SET":
+                    opts = [a.upper() for a in args[3:]]
+                    if "NX" in opts and entry is not None:
+                        self._reply(None)
+                        continue
+                    px = int(args[3 + opts.index("PX") + 1]) if "PX" in opts else None
+                    self.store[key] = (args[2], now + px / 1000 if px else None)
+                    self._reply("OK")
+                elif cmd in ("INCR", "DECR"):
+                    step = 1 if cmd == "INCR" else -1
+                    value = int(entry[0]) + step if entry else step
+                    self.store[key] = (str(value), entry[1] if entry else None)
+                    self._reply(value)
+                elif cmd == "DEL":
+                    self._reply(1 if self.store.pop(key, None) is not None else 0)
+                elif cmd == "PTTL":
+                    if entry is None:
+                        self._reply(-2)
+                    else:
+                        self._reply(-1 if entry[1] is None else int((entry[1] - now) * 1000))
+                else:
+                    self.wfile.write(b"-ERR unknown command\r\n")
+
+
+def start_stand_in() -> str:
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _StandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"redis://127.0.0.1:{server.server_address[1]}/0"
+
+
+def make(kind: str, target: str):
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(target)
+    return RespBackend(target)
+
+
+def _worker(args):
+    kind, target, key, limit, hits = args
+    limiter = RateLimiter(make(kind, target))
+    return sum(limiter.hit(limit, key).allowed for _ in range(hits))
+
+
+def check_behaviour(kind: str, target: str) -> None:
+    limiter = RateLimiter(make(kind, target))
+    tag = f"{kind}-{time.time_ns()}"
+
+    cooldown = RateLimit("cooldown", 1, 0.3)
+    first, second = limiter.hit(cooldown, tag), limiter.hit(cooldown, tag)
+    assert first.allowed and not second.allowed, (first, second)
+    assert 0 < second.retry_after <= 0.3, second
+    time.sleep(0.35)
+    assert limiter.hit(cooldown, tag).allowed
+
+    # a refunded hit can be spent again straight away
+    refund = RateLimit("refund", 1, 60)
+    assert limiter.hit(refund, tag).allowed
+    limiter.refund(refund, tag)
+    assert limiter.hit(refund, tag).allowed
+    assert not limiter.hit(refund, tag).allowed
+
+    burst = RateLimit("burst", 5, 60)
+    allowed = sum(limiter.hit(burst, tag).allowed for _ in range(8))
+    assert allowed == 5, allowed
+    assert limiter.errors == 0
+    print(f"  {kind:<6} cooldown + refund + burst ok")
+
+
+def check_processes(kind: str, target: str, processes: int, hits: int) -> None:
+    limit = RateLimit("shared", 100, 600)
+    key = f"{kind}-{time.time_ns()}"
+    with Pool(processes) as pool:
+        allowed = sum(pool.map(_worker, [(kind, target, key, limit, hits)] * processes))
+    expected = limit.capacity * (processes if kind == "memory" else 1)
+    status = "ok" if allowed == expected else "MISMATCH"
+    print(f"  {kind:<6} {processes} processes x {hits} hits on one key → {allowed} allowed "
+          f"(capacity {limit.capacity}) {status}")
+
+
+def check_bounded() -> None:
+    backend = MemoryBackend(max_keys=1000)
+    limiter = RateLimiter(backend)
+    limit = RateLimit("flood", 1, 180)
+    for i in range(100_000):
+        limiter.hit(limit, str(i))
+    assert backend.stats()["keys"] == 1000
+    print(f"  memory 100000 distinct keys → {backend.stats()['keys']} kept, {backend.evictions} evicted")
+
+
+def throughput(kind: str, target: str, hits: int) -> None:
+    limiter = RateLimiter(make(kind, target))
+    limit = RateLimit("bench", 1, 180)
+    started = time.perf_counter()
+    for i in range(hits):
+        limiter.hit(limit, str(i % 5000))
+    elapsed = time.perf_counter() - started
+    print(f"  {kind:<6} {hits / elapsed:>9,.0f} hits/s ({elapsed / hits * 1e6:.0f} us/hit)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the rate limiter backends")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--hits", type=int, default=500, help="hits per process on the shared key")
+    parser.add_argument("--bench-hits", type=int, default=20_000)
+    parser.add_argument("--redis-url", help="real RESP server instead of the stand-in")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="ratelimit-")
+    targets = {
+        "memory": None,
+        "sqlite": os.path.join(workdir, "ratelimit.db"),
+        "redis": args.redis_url or start_stand_in(),
+    }
+
+    print("behaviour")
+    for kind, target in targets.items():
+        check_behaviour(kind, target)
+    check_bounded()
+
+    print("shared across processes")
+    for kind, target in targets.items():
+        check_processes(kind, target, args.processes, args.hits)
+
+    print("throughput (single thread)")
+    for kind, target in targets.items():
+        throughput(kind, target, args.bench_hits)
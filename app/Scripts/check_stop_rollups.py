@@ -0,0 +1,73 @@
+"""
+Check stop_trip_rollups (app/Services/stopService/trip_rollups.py) against a recount from journeys.
+
+    python app/Scripts/check_stop_rollups.py               # report, exit 1 if anything is off
+    python app/Scripts/check_stop_rollups.py --hours 24    # only the last day
+    python app/Scripts/check_stop_rollups.py --fix         # recount the whole window into the table
+
+The rollups only move in the same transaction as the journey they count, so a mismatch means
+something wrote journeys around the services (a manual UPDATE, a restore) - --fix is the way back.
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.models.Database import SessionLocal, engine
+from app.Services.stopService.trip_rollups import (
+    STOP_ROLLUP_HOURS, ensure_stop_rollups, expected_rollups, hour_bucket, rebuild_stop_rollups, stored_rollups,
+)
+
+SHOW = 20
+
+
+def mismatches(db, hours: int):
+    since = hour_bucket(datetime.now(timezone.utc) - timedelta(hours=hours))
+    expected = expected_rollups(db, since)
+    stored = stored_rollups(db, since)
+
+    bad = []
+    for key in sorted(set(expected) | set(stored)):
+        want = expected.get(key, (0, 0))
+        got = stored.get(key, (0, 0))
+        if want != got:
+            bad.append((key, want, got))
+    return bad, len(expected)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare stop_trip_rollups with journeys")
+    parser.add_argument("--hours", type=int, default=STOP_ROLLUP_HOURS)
+    parser.add_argument("--fix", action="store_true", help=f"rebuild the last {STOP_ROLLUP_HOURS}h from journeys")
+    args = parser.parse_args()
+
+    engine.echo = False
+    ensure_stop_rollups()
+    db = SessionLocal()
+    try:
+        if args.fix:
+            started = time.perf_counter()
+            written = rebuild_stop_rollups(db)
+            print(f"Rebuilt {written} stop/hour rollups in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        bad, checked = mismatches(db, args.hours)
+        print(f"Checked {checked} stop/hour buckets over the last {args.hours}h "
+              f"in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+    for (stop_id, hour), want, got in bad[:SHOW]:
+        print(f"  {stop_id} {hour:%Y-%m-%d %H:00}  total/active expected {want[0]}/{want[1]}, stored {got[0]}/{got[1]}")
+    if len(bad) > SHOW:
+        print(f"  ... and {len(bad) - SHOW} more")
+
+    if bad:
+        print(f"{len(bad)} buckets out of step - run with --fix")
+        sys.exit(1)
+    print("Consistent")
@@ -0,0 +1,111 @@
+"""
+Hammer single journeys from many threads at once and check exactly one transition wins.
+
+For every round a fresh STARTED journey gets --threads identical events released together
+(threading.Barrier), through JourneyEventHandler.add_event (one session each, like the router)
+and through the group commit writer. Exactly one caller may get the journey back,
+all the others must get a 409 - anything else is printed as a failure.
+tests/test_transitions.py runs the same races on sqlite under pytest; this is for other databases.
+
+    python app/Scripts/check_transitions.py
+    python app/Scripts/check_transitions.py --database-url postgresql://... --threads 64 --rounds 50
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+# ARRIVED twice, DELAYED twice, STOP_REACHED twice - and a mixed race where the order decides
+RACES = [
+    ["ARRIVED"],
+    ["DELAYED"],
+    ["STOP_REACHED"],
+    ["DELAYED", "ARRIVED", "STOP_REACHED"],
+]
+
+
+def race(journey_id: str, events, threads: int, send) -> Counter:
+    from fastapi import HTTPException
+
+    barrier = threading.Barrier(threads)
+
+    def tap(i):
+        event = events[i % len(events)]
+        barrier.wait()
+        try:
+            send(journey_id, event)
+            return f"{event} ok"
+        except HTTPException as e:
+            return str(e.status_code)
+        except Exception as e:
+            return type(e).__name__
+
+    with ThreadPoolExecutor(threads) as pool:
+        return Counter(pool.map(tap, range(threads)))
+
+
+def check(label: str, seed, threads: int, rounds: int, send) -> int:
+    failures = 0
+    for events in RACES:
+        totals = Counter()
+        for journey_id in seed(rounds):
+            outcome = race(journey_id, events, threads, send)
+            totals.update(outcome)
+            wins = sum(n for key, n in outcome.items() if key.endswith(" ok"))
+            others = sum(n for key, n in outcome.items() if not key.endswith(" ok") and key != "409")
+            # a mixed race can legitimately chain (DELAYED then ARRIVED then STOP_REACHED), one win per event type at most
+            max_wins = 1 if len(events) == 1 else len(events)
+            if not 1 <= wins <= max_wins or others or any(n > 1 for key, n in outcome.items() if key.endswith(" ok")):
+                failures += 1
+                print(f"    FAIL {events}: {dict(outcome)}")
+        print(f"  {label:<13} {'/'.join(events):<28} {rounds} rounds x {threads} threads → {dict(totals)}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check journey transitions are race-free")
+    parser.add_argument("--database-url", help="defaults to DATABASE_URL, or a temp sqlite file if that isn't set")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='transitions-')}/check.db")
+
+    from app.models.Database import Base, SessionLocal, engine
+    import app.models.Journey, app.models.JourneyEvent, app.models.Route, app.models.StopArrivalStats, app.models.StopTripRollup  # noqa: F401 (tables)
+    from app.Scripts.bench_group_commit import cleanup, seed
+    from app.Services.journeyService.eventHandler import JourneyEventHandler
+    from app.Services.journeyService.group_commit import GroupCommitWriter
+
+    engine.echo = False
+    Base.metadata.create_all(engine)
+
+    def direct(journey_id, event):
+        db = SessionLocal()
+        try:
+            JourneyEventHandler.add_event(journey_id=journey_id, event_type=event, db=db)
+        finally:
+            db.close()
+
+    writer = GroupCommitWriter()
+    failures = 0
+    try:
+        failures += check("direct", seed, args.threads, args.rounds, direct)
+        writer.start()
+        failures += check("group commit", seed, args.threads, args.rounds, writer.add_event)
+    finally:
+        writer.stop()
+        cleanup()
+
+    print("all races had exactly one winner per transition" if not failures else f"{failures} FAILED rounds")
+    sys.exit(1 if failures else 0)
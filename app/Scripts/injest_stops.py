@@ -1,48 +1,221 @@
+"""
+Load stops.csv into stops and the CIF stop patterns into route_stops.
+
+Both are streamed in chunks and upserted (ON CONFLICT on Postgres, INSERT OR REPLACE
+on SQLite), so re-running it is safe and a full reload takes seconds.
+
+route_stops comes from the parsed timetable: per route the longest outbound journey
+sets the order, stops only the other direction (or a short working) visits follow it.
+Routes that are in the CIF but not the routes table yet are added with the route id as name.
+route_stops the CIF no longer has (a stop dropped from a route, or a whole route) are deleted.
+stop_trip_rollups count starts against route_stops, so the last week is recounted afterwards.
+
+    python app/Scripts/injest_stops.py
+    python app/Scripts/injest_stops.py --csv app/Scripts/stops.csv --cif app/data/MPH_Metro_5_Jan_2026.cif
+    python app/Scripts/injest_stops.py --skip-route-stops
+"""
+
+import argparse
+import csv
 import sys
+import time
 from pathlib import Path
-import pandas as pd
+from typing import Dict, Iterator, List, Tuple
 
 project_root = Path(__file__).resolve().parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from app.models.Stop import Stop
-from app.models.Route import Route
-from app.models.RouteStop import RouteStop 
-from app.models.Database import engine, SessionLocal
-from app.models.base import Base
+from sqlalchemy import delete, insert, inspect, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.models.Database import Base, SessionLocal, engine
+from app.models.Route import Route, RouteStop, Stop
+from app.models.StopTripRollup import StopTripRollup
+from app.Scripts.injest_timetable import chunked
+from app.Services.stopService.trip_rollups import rebuild_stop_rollups
+from app.utils.cif_parser import iter_stop_times
+from app.utils.timetable_index import CIF_FILE
+
+BATCH_SIZE = 5_000
+STOPS_CSV = Path(__file__).parent / "stops.csv"
+
+
+def upsert(table, rows: List[dict], key: List[str], update: List[str], replace: bool = True) -> None:
+    """One statement per chunk. replace=False keeps whatever is already there."""
+    if not rows:
+        return
+    if engine.dialect.name == "postgresql":
+        stmt = pg_insert(table)
+        if replace:
+            stmt = stmt.on_conflict_do_update(index_elements=key, set_={c: stmt.excluded[c] for c in update})
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=key)
+    elif engine.dialect.name == "sqlite":
+        stmt = insert(table).prefix_with("OR REPLACE" if replace else "OR IGNORE")
+    else:
+        raise RuntimeError(f"No upsert for {engine.dialect.name}")
+
+    with engine.begin() as conn:
+        conn.execute(stmt, rows)
+
+
+def iter_stop_rows(csv_path: Path) -> Iterator[dict]:
+    """CSV rows → stops rows, skipping anything without an id or usable coordinates"""
+    skipped = 0
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            try:
+                stop = {
+                    "id": row["AtcoCode"].strip(),
+                    "name": row["CommonName"].strip(),
+                    "latitude": float(row["Latitude"]),
+                    "longitude": float(row["Longitude"]),
+                }
+            except (KeyError, TypeError, ValueError):
+                skipped += 1
+                continue
+            if not stop["id"] or not stop["name"]:
+                skipped += 1
+                continue
+            yield stop
+
+    if skipped:
+        print(f"  skipped {skipped} stop rows with missing id/name/coordinates")
+
+
+def load_stops(csv_path: Path, batch_size: int = BATCH_SIZE) -> int:
+    started = time.perf_counter()
+    total = 0
+
+    for chunk in chunked(iter_stop_rows(csv_path), batch_size):
+        # a repeated AtcoCode inside one statement upsets ON CONFLICT, last one wins
+        rows = list({row["id"]: row for row in chunk}.values())
+        upsert(Stop, rows, key=["id"], update=["name", "latitude", "longitude"])
+        total += len(rows)
+        print(f"  {total} stops...")
+
+    elapsed = time.perf_counter() - started
+    print(f"Upserted {total} stops in {elapsed:.2f}s ({total / elapsed if elapsed else 0:,.0f} rows/s)")
+    return total
+
+
+def route_patterns(cif_path: Path) -> Dict[str, List[Tuple[str, str]]]:
+    """
+    route_id → [(stop_id, direction)] in route order.
+    Longest journey per (route, direction) is its pattern; outbound first, then
+    whatever stops the inbound pattern adds. Journeys come out of the parser
+    one after the other, so only the current one is held.
+    """
+    longest: Dict[Tuple[str, str], List[str]] = {}
+    current_key, current_id, current = None, None, []
 
-def populate_stops():
- 
+    def close():
+        if current_key is not None and len(current) > len(longest.get(current_key, ())):
+            longest[current_key] = current
+
+    for row in iter_stop_times(cif_path):
+        if (row.journey_id, row.route_id) != current_id:
+            close()
+            current_key, current_id, current = (row.route_id, row.direction), (row.journey_id, row.route_id), []
+        current.append(row.stop_id)
+    close()
+
+    patterns: Dict[str, List[Tuple[str, str]]] = {}
+    for (route_id, direction), stop_ids in sorted(longest.items(), key=lambda item: (item[0][0], item[0][1] != "O")):
+        pattern = patterns.setdefault(route_id, [])
+        seen = {stop_id for stop_id, _ in pattern}
+        for stop_id in stop_ids:
+            if stop_id not in seen:  # (route_id, stop_id) is the key, a loop visit only counts once
+                seen.add(stop_id)
+                pattern.append((stop_id, direction))
+    return patterns
+
+
+def prune_route_stops(patterns: Dict[str, list], rows: List[dict]) -> int:
+    """
+    route_stops the CIF no longer has: stops a route stopped calling at, and every stop of a route
+    that dropped out of the timetable. The routes rows stay, old journeys point at them.
+    """
+    if not patterns:
+        print("  No routes in the CIF, not pruning route_stops")
+        return 0
+
+    current: Dict[str, List[str]] = {route_id: [] for route_id in patterns}
+    for row in rows:
+        current[row["route_id"]].append(row["stop_id"])
+
+    removed = 0
+    with engine.begin() as conn:
+        for route_id, stop_ids in current.items():
+            removed += conn.execute(
+                delete(RouteStop)
+                .where(RouteStop.route_id == route_id, RouteStop.stop_id.not_in(stop_ids))
+            ).rowcount
+        removed += conn.execute(
+            delete(RouteStop).where(RouteStop.route_id.not_in(list(patterns)))
+        ).rowcount
+    return removed
+
+
+def load_route_stops(cif_path: Path, batch_size: int = BATCH_SIZE) -> int:
+    started = time.perf_counter()
+    patterns = route_patterns(cif_path)
+    parsed = time.perf_counter()
+    print(f"  {len(patterns)} routes in {cif_path.name} ({parsed - started:.2f}s to parse)")
+
+    upsert(Route, [{"id": route_id, "name": route_id} for route_id in patterns], key=["id"], update=[], replace=False)
+
+    with engine.connect() as conn:
+        known_stops = set(conn.execute(select(Stop.id)).scalars())
+
+    rows, missing = [], 0
+    for route_id, pattern in patterns.items():
+        for sequence, (stop_id, direction) in enumerate(pattern, start=1):
+            if stop_id not in known_stops:
+                missing += 1
+                continue
+            rows.append({"route_id": route_id, "stop_id": stop_id, "sequence": sequence, "direction": direction})
+
+    total = 0
+    for chunk in chunked(rows, batch_size):
+        upsert(RouteStop, chunk, key=["route_id", "stop_id"], update=["sequence", "direction"])
+        total += len(chunk)
+        print(f"  {total} route stops...")
+
+    removed = prune_route_stops(patterns, rows)
+
+    elapsed = time.perf_counter() - parsed
+    print(f"Upserted {total} route stops in {elapsed:.2f}s ({total / elapsed if elapsed else 0:,.0f} rows/s), "
+          f"removed {removed} stale, skipped {missing} for stops not in the stops table")
+    return total
+
+
+def recount_stop_rollups() -> int:
+    """Journeys already started were counted at their routes' old stops - recount the window"""
+    if not inspect(engine).has_table(StopTripRollup.__tablename__):
+        return 0
     db = SessionLocal()
     try:
-        csv_path = Path(__file__).parent / "stops.csv"
-        print(f"Loading stops from: {csv_path}")
-        
-        stops_df = pd.read_csv(csv_path)
-        
-        stops_list = []
-        for _, row in stops_df.iterrows():
-            stop = Stop(
-                id=row['AtcoCode'],
-                name=row['CommonName'],
-                latitude=float(row['Latitude']),  
-                longitude=float(row['Longitude']),
-            )
-            stops_list.append(stop)
-        
-        # Bulk insert rather than inserting one by one
-        db.bulk_save_objects(stops_list)
-        db.commit()
-        
-        print(f"Added {len(stops_list)} stops!")
-        
-    except Exception as e:
-        db.rollback()
-        print(f"Error: {e}")
-        raise
+        written = rebuild_stop_rollups(db)
     finally:
         db.close()
+    print(f"Recounted {written} stop/hour rollups against the new route_stops")
+    return written
 
 
 if __name__ == "__main__":
-    populate_stops()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Upsert stops.csv into stops and CIF stop patterns into route_stops")
+    parser.add_argument("--csv", type=Path, default=STOPS_CSV)
+    parser.add_argument("--cif", type=Path, default=CIF_FILE)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--skip-stops", action="store_true")
+    parser.add_argument("--skip-route-stops", action="store_true")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine, tables=[Route.__table__, Stop.__table__, RouteStop.__table__])
+
+    if not args.skip_stops:
+        load_stops(args.csv, args.batch_size)
+    if not args.skip_route_stops:
+        load_route_stops(args.cif, args.batch_size)
+        recount_stop_rollups()
@@ -0,0 +1,165 @@
+"""
+Load the CIF timetable into scheduled_stop_times.
+
+Rows go in under a new (inactive) timetable version in chunks, COPY on Postgres,
+executemany everywhere else. Once everything is in, the active flag flips in a
+single transaction and the old version's rows are deleted afterwards, so the
+API never sees a half loaded timetable.
+
+    python app/Scripts/injest_timetable.py --cif app/data/MPH_Metro_5_Jan_2026.cif
+"""
+
+import argparse
+import csv
+import io
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import delete, insert, select, update
+
+from app.models.Database import Base, engine, SessionLocal
+from app.models.Timetable import ScheduledStopTime, TimetableVersion
+from app.utils.cif_parser import iter_stop_times
+from app.utils.timetable_index import CIF_FILE
+
+BATCH_SIZE = 20_000
+
+COLUMNS = [
+    "timetable_version", "stop_id", "route_id", "direction",
+    "weekday", "departure_minute", "valid_from", "valid_to",
+]
+
+
+def iter_weekday_rows(cif_path: Path, version: int):
+    """Explode each stop time's days mask into one row per weekday"""
+    for row in iter_stop_times(cif_path):
+        for weekday in range(7):
+            if row.days_mask & (1 << weekday):
+                yield (
+                    version, row.stop_id, row.route_id, row.direction,
+                    weekday, row.minute, row.valid_from, row.valid_to,
+                )
+
+
+def chunked(rows, size: int):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def copy_chunk(chunk) -> None:
+    """Postgres COPY straight from an in-memory CSV buffer"""
+    buf = io.StringIO()
+    csv.writer(buf).writerows(chunk)
+    buf.seek(0)
+
+    sql = f"COPY scheduled_stop_times ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            cursor.copy_expert(sql, buf)
+        else:  # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(buf.getvalue())
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def executemany_chunk(chunk) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            insert(ScheduledStopTime),
+            [dict(zip(COLUMNS, row)) for row in chunk],
+        )
+
+
+def load_timetable(cif_path: Path, batch_size: int = BATCH_SIZE) -> int:
+    Base.metadata.create_all(
+        engine, tables=[TimetableVersion.__table__, ScheduledStopTime.__table__]
+    )
+    # tables from before an index was added to the model - create_all only makes missing tables
+    for index in ScheduledStopTime.__table__.indexes:
+        index.create(engine, checkfirst=True)
+
+    db = SessionLocal()
+    try:
+        version = TimetableVersion(
+            source=cif_path.name,
+            loaded_at=datetime.now(timezone.utc),
+            is_active=False,
+        )
+        db.add(version)
+        db.commit()
+        version_id = version.id
+    finally:
+        db.close()
+
+    write_chunk = copy_chunk if engine.dialect.name == "postgresql" else executemany_chunk
+
+    started = time.perf_counter()
+    total = 0
+    try:
+        for chunk in chunked(iter_weekday_rows(cif_path, version_id), batch_size):
+            write_chunk(chunk)
+            total += len(chunk)
+            print(f"  {total} rows...")
+    except Exception:
+        # nothing points at this version yet, just bin it
+        with engine.begin() as conn:
+            conn.execute(delete(ScheduledStopTime).where(ScheduledStopTime.timetable_version == version_id))
+            conn.execute(delete(TimetableVersion).where(TimetableVersion.id == version_id))
+        raise
+
+    # the actual swap - one transaction, readers go from old to new version
+    with engine.begin() as conn:
+        conn.execute(
+            update(TimetableVersion)
+            .where(TimetableVersion.id == version_id)
+            .values(row_count=total)
+        )
+        conn.execute(update(TimetableVersion).values(is_active=(TimetableVersion.id == version_id)))
+
+    # clean up old versions in batches so we don't hold a giant delete lock
+    with engine.connect() as conn:
+        old_versions = conn.execute(
+            select(TimetableVersion.id).where(TimetableVersion.id != version_id)
+        ).scalars().all()
+
+    for old in old_versions:
+        while True:
+            with engine.begin() as conn:
+                ids = conn.execute(
+                    select(ScheduledStopTime.id)
+                    .where(ScheduledStopTime.timetable_version == old)
+                    .limit(batch_size)
+                ).scalars().all()
+                if not ids:
+                    conn.execute(delete(TimetableVersion).where(TimetableVersion.id == old))
+                    break
+                conn.execute(delete(ScheduledStopTime).where(ScheduledStopTime.id.in_(ids)))
+
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed if elapsed else 0
+    print(f"Loaded {total} scheduled stop times as version {version_id} in {elapsed:.1f}s ({rate:,.0f} rows/s)")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk load the CIF timetable into scheduled_stop_times")
+    parser.add_argument("--cif", type=Path, default=CIF_FILE)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    load_timetable(args.cif, args.batch_size)
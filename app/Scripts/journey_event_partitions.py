@@ -0,0 +1,111 @@
+"""
+Housekeeping for journey_events (app/Services/journeyService/event_log.py).
+
+    python app/Scripts/journey_event_partitions.py                    # table + partitions for the next few days
+    python app/Scripts/journey_event_partitions.py --keep-days 90     # + drop everything older than 90 days
+    python app/Scripts/journey_event_partitions.py --backfill         # + history inferred from existing journeys
+
+The API does the first one itself every JOURNEY_EVENT_PARTITION_REFRESH_SECONDS.
+--backfill is for journeys from before the log existed. Only the final status is known for
+those, so it's the same guess the old readers made: STARTED at created_at, ARRIVED at
+start_time, STOP_REACHED at end_time, DELAYED at created_at if that's where it ended up.
+Re-running it doesn't duplicate anything.
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import select, tuple_
+
+from app.models.Database import engine
+from app.models.Journey import Journey
+from app.models.JourneyEvent import JourneyEvent
+from app.Scripts.injest_stops import upsert
+from app.Services.journeyService.event_log import (
+    JOURNEY_EVENT_PARTITION_DAYS_AHEAD, drop_events_before, ensure_journey_events, is_partitioned, list_partitions,
+)
+
+CHUNK_SIZE = 5000
+
+
+def inferred_events(journey):
+    base = {"journey_id": journey.id, "route_id": journey.route_id, "stop_id": journey.end_stop_id}
+    yield {**base, "type": "STARTED", "ts": journey.created_at}
+    if journey.status == "DELAYED":
+        yield {**base, "type": "DELAYED", "ts": journey.created_at}
+    if journey.start_time is not None:
+        yield {**base, "type": "ARRIVED", "ts": journey.start_time}
+    if journey.end_time is not None:
+        yield {**base, "type": "STOP_REACHED", "ts": journey.end_time}
+
+
+def journey_pages():
+    """Oldest first, keyset paged so no read cursor stays open while the chunks are written"""
+    columns = (Journey.id, Journey.route_id, Journey.end_stop_id, Journey.status,
+               Journey.created_at, Journey.start_time, Journey.end_time)
+    last = None
+    while True:
+        stmt = select(*columns).order_by(Journey.created_at, Journey.id).limit(CHUNK_SIZE)
+        if last is not None:
+            stmt = stmt.where(tuple_(Journey.created_at, Journey.id) > last)
+        with engine.connect() as conn:
+            page = conn.execute(stmt).all()
+        if not page:
+            return
+        yield page
+        last = (page[-1].created_at, page[-1].id)
+
+
+def backfill() -> int:
+    written = 0
+    for page in journey_pages():
+        if written == 0 and is_partitioned():
+            # oldest page first, so the old days get partitions before their rows arrive
+            _partitions_from(page[0].created_at)
+        rows = [event for journey in page for event in inferred_events(journey)]
+        upsert(JourneyEvent.__table__, rows, key=["journey_id", "type", "ts"], update=[], replace=False)
+        written += len(rows)
+    return written
+
+
+def _partitions_from(earliest: datetime) -> None:
+    # ensure_journey_events only looks forward, reach back to the first journey for the backfill
+    if earliest.tzinfo is None:
+        earliest = earliest.replace(tzinfo=timezone.utc)
+    days_back = (datetime.now(timezone.utc) - earliest).days + 1
+    ensure_journey_events(days_ahead=JOURNEY_EVENT_PARTITION_DAYS_AHEAD, start_days_ago=days_back)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create, drop and backfill journey_events partitions")
+    parser.add_argument("--days-ahead", type=int, default=JOURNEY_EVENT_PARTITION_DAYS_AHEAD)
+    parser.add_argument("--keep-days", type=int, help="drop events older than this many days")
+    parser.add_argument("--backfill", action="store_true", help="infer events for journeys from before the log")
+    args = parser.parse_args()
+
+    engine.echo = False
+    created = ensure_journey_events(days_ahead=args.days_ahead)
+    print(f"{engine.url.render_as_string(hide_password=True)}: "
+          f"{'partitioned by day' if is_partitioned() else 'not partitioned'}, {len(created)} partitions created")
+
+    if args.backfill:
+        started = time.perf_counter()
+        written = backfill()
+        print(f"Backfilled {written} inferred events in {time.perf_counter() - started:.1f}s")
+
+    if args.keep_days is not None:
+        cutoff = datetime.now(timezone.utc).date() - timedelta(days=args.keep_days)
+        started = time.perf_counter()
+        dropped = drop_events_before(cutoff)
+        unit = "partitions dropped" if is_partitioned() else "rows deleted"
+        print(f"Before {cutoff.isoformat()}: {dropped} {unit} in {time.perf_counter() - started:.2f}s")
+
+    if is_partitioned():
+        days = list_partitions()
+        print(f"{len(days)} day partitions" + (f", {days[0].isoformat()} → {days[-1].isoformat()}" if days else ""))
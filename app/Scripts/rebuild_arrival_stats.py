@@ -0,0 +1,41 @@
+"""
+Backfill stop_arrival_stats from historical journeys.
+Safe to re-run - it wipes and rewrites the table in one transaction.
+
+    python app/Scripts/rebuild_arrival_stats.py
+
+run_rebuild is the shared bit for the other rebuild-a-table-from-journeys scripts (build_headway_profiles.py).
+"""
+
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.models.Database import Base, engine, SessionLocal
+from app.models.StopArrivalStats import StopArrivalStats
+from app.Services.Prediction.arrival_stats import rebuild_arrival_stats
+
+
+def run_rebuild(model, rebuild, what: str, **kwargs) -> None:
+    """Create the table if needed, run rebuild(db, **kwargs) (it commits) and report how many `what` it wrote"""
+    engine.echo = False
+    Base.metadata.create_all(engine, tables=[model.__table__])
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        written = rebuild(db, **kwargs)
+        print(f"Rebuilt {written} {what} in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    run_rebuild(StopArrivalStats, rebuild_arrival_stats, "route/stop arrival rings")
@@ -0,0 +1,177 @@
+# services/prediction/arrival_stats.py
+# keeps stop_arrival_stats up to date - the last N arrivals per route/stop
+# written in the same transaction as the ARRIVED event (upsert, so the first arrivals at a stop can race),
+# read with a primary key lookup
+
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from sqlalchemy import select, delete, desc, func, update
+from sqlalchemy.orm import Session
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.Database import Base, dialect_insert, engine
+from app.models.Journey import Journey
+from app.models.StopArrivalStats import StopArrivalStats
+
+ARRIVAL_RING_SIZE = int(os.getenv("ARRIVAL_RING_SIZE", "10"))
+
+
+def _ts(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _to_datetimes(arrivals: List[float], limit: int) -> List[datetime]:
+    return [datetime.fromtimestamp(ts, tz=timezone.utc) for ts in arrivals[:limit]]
+
+
+def _claim_stmt(route_id: str, stop_id: str, now: datetime):
+    # creates the row or, if it's there, locks it (ON CONFLICT DO UPDATE takes the row lock)
+    # and hands back the current ring - two first arrivals for a stop can't both INSERT
+    insert = dialect_insert()
+    stmt = insert(StopArrivalStats).values(route_id=route_id, stop_id=stop_id, arrivals=[], updated_at=now)
+    return (
+        stmt.on_conflict_do_update(
+            index_elements=["route_id", "stop_id"],
+            set_={"updated_at": stmt.excluded.updated_at},
+        )
+        .returning(StopArrivalStats.arrivals)
+    )
+
+
+def _push_stmt(route_id: str, stop_id: str, arrivals: Optional[List[float]], arrived_at: datetime, now: datetime):
+    ring = sorted([_ts(arrived_at)] + list(arrivals or []), reverse=True)[:ARRIVAL_RING_SIZE]
+    return (
+        update(StopArrivalStats)
+        .where(StopArrivalStats.route_id == route_id, StopArrivalStats.stop_id == stop_id)
+        .values(arrivals=ring, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def record_arrival(db: Session, route_id: str, stop_id: Optional[str], arrived_at: datetime) -> None:
+    """Push an arrival onto the ring. Caller commits (same transaction as the journey update)."""
+    if not stop_id:
+        return
+
+    now = datetime.now(timezone.utc)
+    arrivals = db.execute(_claim_stmt(route_id, stop_id, now)).scalar_one()
+    db.execute(_push_stmt(route_id, stop_id, arrivals, arrived_at, now))
+
+
+async def record_arrival_async(db: "AsyncSession", route_id: str, stop_id: Optional[str], arrived_at: datetime) -> None:
+    if not stop_id:
+        return
+
+    now = datetime.now(timezone.utc)
+    arrivals = (await db.execute(_claim_stmt(route_id, stop_id, now))).scalar_one()
+    await db.execute(_push_stmt(route_id, stop_id, arrivals, arrived_at, now))
+
+
+def ensure_arrival_stats() -> None:
+    """Startup: the table has to be there before the first ARRIVED (rebuild_arrival_stats.py fills it from history)"""
+    Base.metadata.create_all(engine, tables=[StopArrivalStats.__table__])
+
+
+def get_recent_arrivals(
+        db: Session,
+        route_id: str,
+        stop_id: str,
+        limit: int = ARRIVAL_RING_SIZE) -> List[datetime]:
+    """Newest first. Empty if nobody has reported an arrival here yet."""
+    stats = db.get(StopArrivalStats, (route_id, stop_id))
+    if stats is None or not stats.arrivals:
+        return []
+    return _to_datetimes(stats.arrivals, limit)
+
+
+async def get_recent_arrivals_async(
+        db: "AsyncSession",
+        route_id: str,
+        stop_id: str,
+        limit: int = ARRIVAL_RING_SIZE) -> List[datetime]:
+    stats = await db.get(StopArrivalStats, (route_id, stop_id))
+    if stats is None or not stats.arrivals:
+        return []
+    return _to_datetimes(stats.arrivals, limit)
+
+
+def _arrivals_for_stops_stmt(route_id: str, stop_ids: List[str]):
+    return (
+        select(StopArrivalStats.stop_id, StopArrivalStats.arrivals)
+        .where(
+            StopArrivalStats.route_id == route_id,
+            StopArrivalStats.stop_id.in_(stop_ids),
+        )
+    )
+
+
+def _arrivals_by_stop(rows, stop_ids: List[str], limit: int) -> Dict[str, List[datetime]]:
+    found = {row.stop_id: _to_datetimes(row.arrivals or [], limit) for row in rows}
+    return {stop_id: found.get(stop_id, []) for stop_id in stop_ids}
+
+
+def get_recent_arrivals_for_stops(
+        db: Session,
+        route_id: str,
+        stop_ids: List[str],
+        limit: int = ARRIVAL_RING_SIZE) -> Dict[str, List[datetime]]:
+    """Same thing for a list of stops on one route, single query"""
+    rows = db.execute(_arrivals_for_stops_stmt(route_id, stop_ids)).all()
+    return _arrivals_by_stop(rows, stop_ids, limit)
+
+
+async def get_recent_arrivals_for_stops_async(
+        db: "AsyncSession",
+        route_id: str,
+        stop_ids: List[str],
+        limit: int = ARRIVAL_RING_SIZE) -> Dict[str, List[datetime]]:
+    rows = (await db.execute(_arrivals_for_stops_stmt(route_id, stop_ids))).all()
+    return _arrivals_by_stop(rows, stop_ids, limit)
+
+
+def rebuild_arrival_stats(db: Session, ring_size: int = ARRIVAL_RING_SIZE) -> int:
+    """
+    Backfill from journeys. Anything that ever got an ARRIVED event has start_time set,
+    so take the newest ring_size of those per route/end stop. Returns rows written.
+    """
+    ranked = (
+        select(
+            Journey.route_id,
+            Journey.end_stop_id,
+            Journey.start_time,
+            func.row_number().over(
+                partition_by=(Journey.route_id, Journey.end_stop_id),
+                order_by=desc(Journey.start_time)
+            ).label("rn"),
+        )
+        .where(
+            Journey.start_time.is_not(None),
+            Journey.end_stop_id.is_not(None),
+        )
+        .subquery()
+    )
+
+    rows = db.execute(
+        select(ranked.c.route_id, ranked.c.end_stop_id, ranked.c.start_time)
+        .where(ranked.c.rn <= ring_size)
+        .order_by(ranked.c.route_id, ranked.c.end_stop_id, desc(ranked.c.start_time))
+    ).all()
+
+    grouped: Dict[Tuple[str, str], List[float]] = {}
+    for row in rows:
+        grouped.setdefault((row.route_id, row.end_stop_id), []).append(_ts(row.start_time))
+
+    now = datetime.now(timezone.utc)
+    db.execute(delete(StopArrivalStats))
+    db.add_all(
+        StopArrivalStats(route_id=route_id, stop_id=stop_id, arrivals=arrivals, updated_at=now)
+        for (route_id, stop_id), arrivals in grouped.items()
+    )
+    db.commit()
+    return len(grouped)
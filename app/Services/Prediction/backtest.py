@@ -0,0 +1,347 @@
+# services/prediction/backtest.py
+# replays historical journeys day by day and scores the prediction against what actually happened
+# shards are (route, day) so a process pool can chew through a year of history in parallel
+# predictors get what the live path gets: timetable, recent events and arrivals, the headway profile
+# as built from the weeks before the day, and the downstream ETA from the last upstream arrival
+
+import importlib
+import time as _time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone, timedelta
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.Services.Prediction.profiles import HEADWAY_PROFILE_LOOKBACK_DAYS, ProfileStore, compute_profiles
+from app.Services.Prediction.segments import DOWNSTREAM_TTL_MIN, SegmentMatrix
+
+DEFAULT_PREDICTOR = "app.Services.Prediction.logic:predict_bus_time"
+
+# mirrors the live data path (data.py)
+EVENT_WINDOW_MIN = 15
+EVENT_LIMIT = 5
+ARRIVAL_LIMIT = 10
+
+# history from before the shard's day that still matters (crowd average ignores anything older than 90 min)
+CONTEXT_HOURS = 3
+
+
+class JourneyRecord(NamedTuple):
+    route_id: str
+    stop_id: str          # end_stop_id, same key the prediction uses
+    created_ts: float
+    arrival_ts: float     # start_time (when ARRIVED was reported), NaN if never
+    status: str           # final status
+    start_stop_id: Optional[str] = None  # where that ARRIVED was, drives the downstream ETAs
+    planned_ts: float = float("nan")     # planned_start_time, the profile's lateness baseline
+
+
+class Shard(NamedTuple):
+    route_id: str
+    day: str              # YYYY-MM-DD (UTC)
+    records: List[JourneyRecord]  # the day plus CONTEXT_HOURS before it
+    day_start_ts: float
+
+
+class ShardResult(NamedTuple):
+    route_id: str
+    predictor: str
+    errors: np.ndarray    # predicted - actual, minutes
+    seconds: float        # time spent inside the predictor
+
+
+def _epoch(value) -> float:
+    if value is None:
+        return float("nan")
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def load_predictor(path: str) -> Callable:
+    """'package.module:function' → the function. Strings so they pickle into the workers."""
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def records_from_rows(rows: Iterable) -> List[JourneyRecord]:
+    """
+    Rows with route_id, end_stop_id, created_at, start_time, status (ORM rows, dicts via SimpleNamespace, ...),
+    and start_stop_id / planned_start_time when the source has them.
+    """
+    records = []
+    for row in rows:
+        if not row.end_stop_id or row.created_at is None:
+            continue
+        records.append(JourneyRecord(
+            route_id=row.route_id,
+            stop_id=row.end_stop_id,
+            created_ts=_epoch(row.created_at),
+            arrival_ts=_epoch(row.start_time),
+            status=row.status or "",
+            start_stop_id=getattr(row, "start_stop_id", None),
+            planned_ts=_epoch(getattr(row, "planned_start_time", None)),
+        ))
+    return records
+
+
+def make_shards(records: List[JourneyRecord]) -> List[Shard]:
+    """Group by (route, UTC day) and hand every shard the tail of the previous day as context"""
+    by_route: Dict[str, List[JourneyRecord]] = defaultdict(list)
+    for r in records:
+        by_route[r.route_id].append(r)
+
+    shards = []
+    for route_id, route_records in by_route.items():
+        route_records.sort(key=lambda r: r.created_ts)
+        created = np.array([r.created_ts for r in route_records])
+
+        days = sorted({int(ts // 86400) for ts in created})
+        for day in days:
+            day_start = day * 86400.0
+            lo = int(np.searchsorted(created, day_start - CONTEXT_HOURS * 3600))
+            hi = int(np.searchsorted(created, day_start + 86400))
+            shards.append(Shard(
+                route_id=route_id,
+                day=datetime.fromtimestamp(day_start, tz=timezone.utc).date().isoformat(),
+                records=route_records[lo:hi],
+                day_start_ts=day_start,
+            ))
+    return shards
+
+
+class RouteHistory(NamedTuple):
+    """Every arrival on one route, sorted by time - what the headway profiles get built from"""
+    stop_ids: List[str]
+    stop_idx: np.ndarray
+    arrived_ts: np.ndarray
+    planned_ts: np.ndarray
+
+
+def route_histories(records: List[JourneyRecord]) -> Dict[str, RouteHistory]:
+    by_route: Dict[str, List[JourneyRecord]] = defaultdict(list)
+    for r in records:
+        if not np.isnan(r.arrival_ts):
+            by_route[r.route_id].append(r)
+
+    histories = {}
+    for route_id, route_records in by_route.items():
+        route_records.sort(key=lambda r: r.arrival_ts)
+        stops: Dict[str, int] = {}
+        stop_idx = np.array([stops.setdefault(r.stop_id, len(stops)) for r in route_records], dtype=np.int64)
+        histories[route_id] = RouteHistory(
+            stop_ids=list(stops),
+            stop_idx=stop_idx,
+            arrived_ts=np.array([r.arrival_ts for r in route_records]),
+            planned_ts=np.array([r.planned_ts for r in route_records]),
+        )
+    return histories
+
+
+# set once per worker process (_init_worker), not shipped with every shard
+_histories: Dict[str, RouteHistory] = {}
+_matrices: Dict[str, SegmentMatrix] = {}
+
+
+def _init_worker(histories: Dict[str, RouteHistory], matrices: Dict[str, SegmentMatrix]) -> None:
+    global _histories, _matrices
+    _histories, _matrices = histories, matrices
+
+
+def shard_profiles(route_id: str, day_start_ts: float, lookback_days: int) -> ProfileStore:
+    """
+    What refresh_headway_profiles would have had loaded on the day: built from the route's arrivals
+    in the lookback_days before it, nothing from the day itself
+    """
+    history = _histories.get(route_id)
+    if history is None or not lookback_days:
+        return ProfileStore.empty()
+
+    lo, hi = np.searchsorted(history.arrived_ts, [day_start_ts - lookback_days * 86400, day_start_ts])
+    headway, lateness, samples = compute_profiles(
+        history.stop_idx[lo:hi], history.arrived_ts[lo:hi], history.planned_ts[lo:hi], len(history.stop_ids))
+    rows = {(route_id, stop_id): i for i, stop_id in enumerate(history.stop_ids)}
+    return ProfileStore(rows, headway, lateness, samples)
+
+
+class _Upstream:
+    """The shard's ARRIVED reports in time order, for segments.downstream_eta as it was at any moment"""
+
+    def __init__(self, records: List[JourneyRecord], matrix: Optional[SegmentMatrix]):
+        self.matrix = matrix
+        reports = sorted(
+            (r.arrival_ts, matrix.position[r.start_stop_id])
+            for r in records
+            if matrix is not None and not np.isnan(r.arrival_ts) and r.start_stop_id in matrix.position
+        )
+        self.arrived = np.array([ts for ts, _ in reports])
+        self.position = [k for _, k in reports]
+
+    def eta(self, stop_id: str, now_ts: float) -> Optional[datetime]:
+        if self.matrix is None:
+            return None
+        i = int(np.searchsorted(self.arrived, now_ts, side="right")) - 1
+        if i < 0 or now_ts - self.arrived[i] > DOWNSTREAM_TTL_MIN * 60:
+            return None
+
+        k, pos = self.position[i], self.matrix.position.get(stop_id)
+        if pos is None or pos <= k:
+            return None
+        cum = self.matrix.cum_minutes
+        return datetime.fromtimestamp(float(self.arrived[i] + (cum[pos] - cum[k]) * 60), tz=timezone.utc)
+
+
+class _StopHistory:
+    """One stop's journeys in a shard, sorted so each replay step is a couple of bisects"""
+
+    def __init__(self, records: List[JourneyRecord]):
+        self.records = sorted(records, key=lambda r: r.created_ts)
+        self.created = np.array([r.created_ts for r in self.records])
+        self.arrivals = np.sort(np.array([r.arrival_ts for r in records if not np.isnan(r.arrival_ts)]))
+
+    def inputs_at(self, now_ts: float) -> Tuple[List[dict], List[datetime]]:
+        """
+        What get_recent_user_events / get_user_journeys would have returned at now_ts.
+        Status history isn't stored, so a journey counts as ARRIVED from its start_time on,
+        DELAYED if that's where it ended up, and STARTED otherwise.
+        """
+        lo = int(np.searchsorted(self.created, now_ts - EVENT_WINDOW_MIN * 60, side="left"))
+        hi = int(np.searchsorted(self.created, now_ts, side="right"))
+        recent = self.records[max(lo, hi - EVENT_LIMIT):hi][::-1]
+
+        events = []
+        for r in recent:
+            if not np.isnan(r.arrival_ts) and r.arrival_ts <= now_ts:
+                events.append({"type": "ARRIVED", "time": datetime.fromtimestamp(r.arrival_ts, tz=timezone.utc)})
+            elif r.status == "DELAYED":
+                events.append({"type": "DELAYED", "time": datetime.fromtimestamp(r.created_ts, tz=timezone.utc)})
+
+        hi = int(np.searchsorted(self.arrivals, now_ts, side="right"))
+        past = self.arrivals[max(0, hi - ARRIVAL_LIMIT):hi][::-1]
+
+        return events, [datetime.fromtimestamp(float(ts), tz=timezone.utc) for ts in past]
+
+
+def run_shard(
+        shard: Shard,
+        predictors: List[str],
+        horizon_min: float,
+        use_timetable: bool,
+        profile_days: int = HEADWAY_PROFILE_LOOKBACK_DAYS) -> List[ShardResult]:
+    """
+    For every arrival reported during the day: step back horizon_min, ask each predictor,
+    compare with the first arrival at that stop after the simulated now.
+    """
+    funcs = [load_predictor(p) for p in predictors]
+    errors: Dict[str, List[float]] = {p: [] for p in predictors}
+    spent: Dict[str, float] = {p: 0.0 for p in predictors}
+
+    if use_timetable:
+        from app.utils.fetch_time import get_closest_scheduled_time_to_now
+
+    by_stop: Dict[str, List[JourneyRecord]] = defaultdict(list)
+    for r in shard.records:
+        by_stop[r.stop_id].append(r)
+
+    profiles = shard_profiles(shard.route_id, shard.day_start_ts, profile_days)
+    upstream = _Upstream(shard.records, _matrices.get(shard.route_id))
+
+    day_end = shard.day_start_ts + 86400
+    for stop_id, stop_records in by_stop.items():
+        history = _StopHistory(stop_records)
+        arrivals = history.arrivals
+
+        for anchor in arrivals[(arrivals >= shard.day_start_ts) & (arrivals < day_end)]:
+            now_ts = float(anchor) - horizon_min * 60
+            next_idx = np.searchsorted(arrivals, now_ts, side="right")
+            if next_idx == len(arrivals):
+                continue  # nothing after the simulated now (horizon <= 0 on the last arrival)
+            actual_ts = float(arrivals[next_idx])
+            now = datetime.fromtimestamp(now_ts, tz=timezone.utc)
+
+            events, past = history.inputs_at(now_ts)
+
+            static_time, is_tomorrow = None, False
+            if use_timetable:
+                static_time, _, is_tomorrow = get_closest_scheduled_time_to_now(shard.route_id, stop_id, now)
+
+            profile = profiles.lookup(shard.route_id, stop_id, now)
+            downstream = upstream.eta(stop_id, now_ts)
+
+            for path, func in zip(predictors, funcs):
+                started = _time.perf_counter()
+                predicted, _ = func(
+                    static_time=static_time,
+                    static_is_tomorrow=is_tomorrow,
+                    user_events=events,
+                    past_arrivals=past,
+                    now=now,
+                    profile=profile,
+                    downstream_eta=downstream,
+                )
+                spent[path] += _time.perf_counter() - started
+                if predicted is not None:
+                    errors[path].append((predicted.timestamp() - actual_ts) / 60)
+
+    return [
+        ShardResult(shard.route_id, p, np.array(errors[p], dtype=np.float32), spent[p])
+        for p in predictors
+    ]
+
+
+def _run_shard_star(args):
+    return run_shard(*args)
+
+
+def run_backtest(
+        records: List[JourneyRecord],
+        predictors: Optional[List[str]] = None,
+        horizon_min: float = 10.0,
+        workers: Optional[int] = None,
+        use_timetable: bool = True,
+        profile_days: int = HEADWAY_PROFILE_LOOKBACK_DAYS,
+        matrices: Optional[Dict[str, SegmentMatrix]] = None) -> Dict[str, Dict[str, dict]]:
+    """
+    Returns {predictor: {route_id: {count, mae_min, p90_abs_min, bias_min, us_per_call}}}.
+    workers=1 runs inline (handy for debugging a predictor).
+    profile_days=0 leaves the headway profiles out, no matrices leaves the downstream ETAs out.
+    """
+    predictors = predictors or [DEFAULT_PREDICTOR]
+    shards = make_shards(records)
+    jobs = [(shard, predictors, horizon_min, use_timetable, profile_days) for shard in shards]
+    context = (route_histories(records) if profile_days else {}, matrices or {})
+
+    if workers == 1:
+        _init_worker(*context)
+        results = map(_run_shard_star, jobs)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=context)
+        results = pool.map(_run_shard_star, jobs, chunksize=max(1, len(jobs) // 64))
+
+    merged: Dict[Tuple[str, str], List[np.ndarray]] = defaultdict(list)
+    spent: Dict[Tuple[str, str], float] = defaultdict(float)
+    try:
+        for shard_results in results:
+            for r in shard_results:
+                merged[(r.predictor, r.route_id)].append(r.errors)
+                spent[(r.predictor, r.route_id)] += r.seconds
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    report: Dict[str, Dict[str, dict]] = defaultdict(dict)
+    for (predictor, route_id), chunks in merged.items():
+        errors = np.concatenate(chunks) if chunks else np.empty(0, np.float32)
+        if not len(errors):
+            continue
+        abs_err = np.abs(errors)
+        report[predictor][route_id] = {
+            "count": int(len(errors)),
+            "mae_min": round(float(abs_err.mean()), 2),
+            "p90_abs_min": round(float(np.percentile(abs_err, 90)), 2),
+            "bias_min": round(float(errors.mean()), 2),
+            "us_per_call": round(spent[(predictor, route_id)] / len(errors) * 1e6, 1),
+        }
+    return dict(report)
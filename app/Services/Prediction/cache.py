@@ -0,0 +1,138 @@
+# services/prediction/cache.py
+# small LRU + TTL cache for prediction results
+# inputs for a (route, stop) only change when a journey event lands, so the
+# event handler drops the affected keys and everything else just expires
+
+import os
+import time as _time
+from collections import OrderedDict
+from datetime import datetime, time
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "5000"))
+PREDICTION_CACHE_TTL_SECONDS = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "30"))
+PREDICTION_CACHE_BUCKET_SECONDS = int(os.getenv("PREDICTION_CACHE_BUCKET_SECONDS", "60"))
+
+
+class PredictionCache:
+    """
+    Keys are (route_id, stop_id, time bucket, static_time). Per process only -
+    with several workers the event handler's invalidations reach the others over the
+    live relay (LIVE_FANOUT=postgres), without it they catch up when their entries expire.
+
+    A reader that misses takes generation() for the pair before it reads the
+    database and hands it to put(); an invalidate() in between bumps the
+    generation, so the result computed from pre-event rows is dropped instead
+    of being cached for a full TTL.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._by_pair: Dict[Tuple[str, str], Set[Hashable]] = {}
+        self._generations: Dict[Tuple[str, str], int] = {}
+        self._lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    def _drop(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+        pair = key[:2]
+        keys = self._by_pair.get(pair)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_pair[pair]
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= _time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def generation(self, route_id: str, stop_id: Optional[str]) -> int:
+        with self._lock:
+            return self._generations.get((route_id, stop_id), 0)
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        with self._lock:
+            if generation is not None and self._generations.get(key[:2], 0) != generation:
+                self.stale_puts += 1
+                return
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._entries[key] = (_time.monotonic() + self.ttl_seconds, value)
+            self._by_pair.setdefault(key[:2], set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate(self, route_id: str, stop_id: Optional[str]) -> int:
+        """Drop every bucket for this route/stop. Returns how many entries went."""
+        with self._lock:
+            pair = (route_id, stop_id)
+            self._generations[pair] = self._generations.get(pair, 0) + 1
+            keys = self._by_pair.pop(pair, None)
+            if not keys:
+                return 0
+            for key in keys:
+                self._entries.pop(key, None)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_pair.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_puts": self.stale_puts,
+            }
+
+
+prediction_cache = PredictionCache(
+    max_entries=PREDICTION_CACHE_SIZE,
+    ttl_seconds=PREDICTION_CACHE_TTL_SECONDS,
+)
+
+
+def prediction_key(
+        route_id: str,
+        stop_id: Optional[str],
+        static_time: Optional[time],
+        now: datetime) -> Tuple:
+    bucket = int(now.timestamp() // PREDICTION_CACHE_BUCKET_SECONDS)
+    return (route_id, stop_id, bucket, static_time)
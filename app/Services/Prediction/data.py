@@ -2,14 +2,23 @@
 # pulls user events, past arrivals and scheduled time
 # feeds into the prediction logic
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, TYPE_CHECKING
 from datetime import datetime, timezone, timedelta
 
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, func
 from sqlalchemy.orm import Session
 
-from app.models.Journey import Journey
-from app.utils.fetch_time import fetch_scheduled_time  # CIF fallback
+if TYPE_CHECKING:  # only the async path needs greenlet, scripts import this too
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.JourneyEvent import JourneyEvent
+from app.utils.fetch_time import TIMETABLE_SOURCE, fetch_scheduled_time  # CIF fallback
+from app.Services.Prediction.arrival_stats import (
+    get_recent_arrivals,
+    get_recent_arrivals_async,
+    get_recent_arrivals_for_stops,
+    get_recent_arrivals_for_stops_async,
+)
 
 
 
@@ -18,49 +27,31 @@ def get_db_session() -> Session:
     return Session()
 
 
-def get_recent_user_events(
-    route_id: str,
-    stop_id: str,
-    last_minutes: int = 15,
-    db: Session = None) -> List[Dict]: 
-    """
-    Grab recent user events (ARRIVED/DELAYED) for the last N minutes.
-    Also tacks on the scheduled time if we can find it.
-    """
-    if db is None:
-        db = get_db_session()
+# what the prediction counts as a user event, STARTED/STOP_REACHED are in the log too
+_PREDICTION_EVENTS = ("ARRIVED", "DELAYED")
 
-    cutoff = datetime.now(timezone.utc) - timedelta(minutes=last_minutes)
 
-    stmt = (
-        select(Journey)
+def _recent_events_stmt(route_id: str, stop_id: str, last_minutes: int):
+    # backwards range scan on ix_journey_events_stop_ts, and on postgres only today's
+    # (and maybe yesterday's) partition gets looked at
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=last_minutes)
+    return (
+        select(JourneyEvent.type, JourneyEvent.ts)
         .where(
-            Journey.route_id == route_id,
-            Journey.end_stop_id == stop_id,
-            Journey.created_at >= cutoff
+            JourneyEvent.route_id == route_id,
+            JourneyEvent.stop_id == stop_id,
+            JourneyEvent.ts >= cutoff,
+            JourneyEvent.type.in_(_PREDICTION_EVENTS),
         )
-        .order_by(desc(Journey.created_at))
+        .order_by(desc(JourneyEvent.ts))
         .limit(5)
     )
 
-    journeys = db.execute(stmt).scalars().all()
 
-    events = []
+def _events_from_rows(rows, scheduled) -> List[Dict]:
+    # each event at the time it happened - Journey only had created_at/start_time to go on
+    events = [{"type": row.type, "time": row.ts} for row in rows]
 
-    for journey in journeys:
-        if journey.status == "ARRIVED":
-            events.append({
-                "type": "ARRIVED",
-                "time": journey.start_time or journey.created_at,
-            })
-        elif journey.status == "DELAYED":
-            events.append({
-                "type": "DELAYED",
-                "time": journey.created_at,
-            })
-
-    # Try to add scheduled time (from CIF)
-    scheduled = fetch_scheduled_time(route_id, stop_id)
     if scheduled:
         events.append({
             "type": "SCHEDULED",
@@ -74,43 +65,142 @@ def get_recent_user_events(
             "source": "no_timetable"
         })
 
+    return events
+
+
+def get_recent_user_events(
+    route_id: str,
+    stop_id: str,
+    last_minutes: int = 15,
+    db: Session = None) -> List[Dict]: 
+    """
+    Grab recent user events (ARRIVED/DELAYED) for the last N minutes from journey_events.
+    Also tacks on the scheduled time if we can find it.
+    """
+    if db is None:
+        db = get_db_session()
+
+    rows = db.execute(_recent_events_stmt(route_id, stop_id, last_minutes)).all()
+
+    # Try to add scheduled time (from CIF)
+    scheduled = fetch_scheduled_time(route_id, stop_id, db=db)
+    events = _events_from_rows(rows, scheduled)
+
     # print(f"Found {len(events)} events for {route_id} at {stop_id}")
     return events
 
 
+async def get_recent_user_events_async(
+    route_id: str,
+    stop_id: str,
+    last_minutes: int = 15,
+    db: "AsyncSession" = None) -> List[Dict]:
+    """get_recent_user_events on an AsyncSession"""
+    rows = (await db.execute(_recent_events_stmt(route_id, stop_id, last_minutes))).all()
+
+    if TIMETABLE_SOURCE == "db":
+        # timetable queries are sync code, run them on the async connection
+        scheduled = await db.run_sync(lambda session: fetch_scheduled_time(route_id, stop_id, db=session))
+    else:
+        scheduled = fetch_scheduled_time(route_id, stop_id)
+    return _events_from_rows(rows, scheduled)
+
+
 def get_user_journeys(
     route_id: str,
     stop_id: str,
     limit: int = 10,
     db: Session = None) -> List[datetime]:
     """
-    Get arrival times from recent completed user journeys.
+    Get arrival times from recent user reported arrivals.
     Used for crowd-based average ETA.
+    Reads the stop_arrival_stats ring (one primary key lookup), which the
+    ARRIVED handler keeps up to date - see arrival_stats.py.
     """
     if db is None:
         db = get_db_session()
 
-    now = datetime.now(timezone.utc)
+    arrivals = get_recent_arrivals(db, route_id, stop_id, limit=limit)
 
-    stmt = (
-        select(Journey)
+    # print(f"Found {len(arrivals)} past arrivals for {route_id}/{stop_id}")
+    return arrivals
+
+
+async def get_user_journeys_async(
+    route_id: str,
+    stop_id: str,
+    limit: int = 10,
+    db: "AsyncSession" = None) -> List[datetime]:
+    return await get_recent_arrivals_async(db, route_id, stop_id, limit=limit)
+
+
+def _route_events_stmt(route_id: str, stop_ids: List[str], last_minutes: int, event_limit: int):
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=last_minutes)
+
+    ranked = (
+        select(
+            JourneyEvent.stop_id,
+            JourneyEvent.type,
+            JourneyEvent.ts,
+            # newest events inside the recent window, per stop
+            func.row_number().over(
+                partition_by=JourneyEvent.stop_id,
+                order_by=desc(JourneyEvent.ts)
+            ).label("rn"),
+        )
         .where(
-            Journey.route_id == route_id,
-            Journey.end_stop_id == stop_id,
-            Journey.status == "ARRIVED",
-            Journey.created_at <= now
+            JourneyEvent.route_id == route_id,
+            JourneyEvent.stop_id.in_(stop_ids),
+            JourneyEvent.ts >= cutoff,
+            JourneyEvent.type.in_(_PREDICTION_EVENTS),
         )
-        .order_by(desc(Journey.created_at))
-        .limit(limit)
+        .subquery()
     )
 
-    journeys = db.execute(stmt).scalars().all()
+    return (
+        select(ranked)
+        .where(ranked.c.rn <= event_limit)
+        .order_by(ranked.c.stop_id, desc(ranked.c.ts))
+    )
 
-    arrivals = []
-    for j in journeys:
-        arrival = j.start_time or j.created_at
-        if arrival:  # just in case
-            arrivals.append(arrival)
 
-    # print(f"Found {len(arrivals)} past arrivals for {route_id}/{stop_id}")
-    return arrivals
\ No newline at end of file
+def _group_route_events(rows, stop_ids: List[str], arrivals: Dict[str, List[datetime]]):
+    result = {stop_id: ([], arrivals[stop_id]) for stop_id in stop_ids}
+
+    for row in rows:
+        result[row.stop_id][0].append({"type": row.type, "time": row.ts})
+
+    return result
+
+
+def get_route_journeys_batch(
+    route_id: str,
+    stop_ids: List[str],
+    last_minutes: int = 15,
+    event_limit: int = 5,
+    arrival_limit: int = 10,
+    db: Session = None) -> Dict[str, Tuple[List[Dict], List[datetime]]]:
+    """
+    Same data as get_recent_user_events + get_user_journeys but for every stop
+    on a route in one windowed query (+ one arrival stats read) instead of two
+    queries per stop.
+    Returns {stop_id: (events, arrivals)}.
+    """
+    if db is None:
+        db = get_db_session()
+
+    stmt = _route_events_stmt(route_id, stop_ids, last_minutes, event_limit)
+    arrivals = get_recent_arrivals_for_stops(db, route_id, stop_ids, limit=arrival_limit)
+    return _group_route_events(db.execute(stmt), stop_ids, arrivals)
+
+
+async def get_route_journeys_batch_async(
+    route_id: str,
+    stop_ids: List[str],
+    last_minutes: int = 15,
+    event_limit: int = 5,
+    arrival_limit: int = 10,
+    db: "AsyncSession" = None) -> Dict[str, Tuple[List[Dict], List[datetime]]]:
+    stmt = _route_events_stmt(route_id, stop_ids, last_minutes, event_limit)
+    arrivals = await get_recent_arrivals_for_stops_async(db, route_id, stop_ids, limit=arrival_limit)
+    return _group_route_events(await db.execute(stmt), stop_ids, arrivals)
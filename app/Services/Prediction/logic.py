@@ -8,6 +8,8 @@ from typing import List, Optional
 from sqlalchemy.orm import Session
 
 from app.Services.Prediction.data import get_user_journeys, get_recent_user_events
+from app.Services.Prediction.profiles import ProfileSignal, lookup_profile
+from app.Services.Prediction.segments import downstream_eta as lookup_downstream_eta
 
 
 def weighted_average(times: List[datetime]) -> Optional[datetime]:
@@ -55,10 +57,15 @@ def predict_bus_time(
     static_is_tomorrow: bool = False,
     user_events: List[dict] = None,
     past_arrivals: List[datetime] = None,
-    now: Optional[datetime] = None) -> tuple[Optional[datetime], float]:
+    now: Optional[datetime] = None,
+    profile: Optional[ProfileSignal] = None,
+    downstream_eta: Optional[datetime] = None) -> tuple[Optional[datetime], float]:
     """
     Main prediction logic - combines timetable + crowd history + recent events
     tries hard not to tell people "bus in -3 min" when it's already gone
+    profile = what this route/stop usually does in this weekday/15 min slot (see profiles.py)
+    downstream_eta = bus was reported at an earlier stop, plus segment travel times (see segments.py)
+    vectorized.py has the same steps over arrays - change both
     """
     if now is None:
         now = datetime.now(timezone.utc)
@@ -73,6 +80,7 @@ def predict_bus_time(
     confidence = 0.25
 
     # 1. Recent ARRIVED reports
+    age_min = None
     arrived = [e["time"] for e in user_events if e["type"] == "ARRIVED"]
     if arrived:
         latest_arr = max(arrived, key=lambda t: t.timestamp() if hasattr(t, 'timestamp') else t)
@@ -93,6 +101,14 @@ def predict_bus_time(
         else:
             latest_arr = None  # too old, ignore
 
+    # 1b. Bus reported further up the route → ride the segment times down to here
+    if downstream_eta is not None and confidence < 0.75:
+        if downstream_eta.tzinfo is None:
+            downstream_eta = downstream_eta.replace(tzinfo=timezone.utc)
+        if downstream_eta >= now - timedelta(minutes=1):
+            pred_time = downstream_eta
+            confidence = 0.75
+
     #  2. Crowd historical average (recent arrivals only) 
     crowd_avg = weighted_average(past_arrivals)
     if crowd_avg:
@@ -112,15 +128,25 @@ def predict_bus_time(
         )
 
         # if we saw recent departure → push timetable forward more
-        if 'age_min' in locals() and 5 < age_min <= 20:
+        if age_min is not None and 5 < age_min <= 20:
             extra = min(12, max(0, age_min - 4))
             sched += timedelta(minutes=extra)
             sched_conf = max(0.45, sched_conf - 0.08)
 
+        # buses in this slot usually run this late → shift the timetable by it
+        if profile is not None and profile.lateness_min is not None:
+            sched += timedelta(minutes=min(15.0, max(-5.0, profile.lateness_min)))
+            sched_conf = min(0.65, sched_conf + 0.05)
+
         if sched_conf > confidence:
             pred_time = sched
             confidence = sched_conf
 
+    # 3b. No timetable, nothing live → half the usual headway is the expected wait
+    elif profile is not None and profile.headway_min is not None and confidence < 0.35:
+        pred_time = now + timedelta(minutes=profile.headway_min / 2)
+        confidence = 0.35
+
     # 4. Delay reports → add buffer only if prediction looks sane 
     delays = sum(1 for e in user_events if e["type"] == "DELAYED")
     if delays >= 1 and (pred_time - now).total_seconds() / 60 < 35:
@@ -168,5 +194,7 @@ def get_bus_prediction(
         static_is_tomorrow=static_is_tomorrow,
         user_events=events,
         past_arrivals=past_times,
-        now=now
+        now=now,
+        profile=lookup_profile(route_id, stop_id, now),
+        downstream_eta=lookup_downstream_eta(route_id, stop_id, now)
     )
\ No newline at end of file
@@ -0,0 +1,238 @@
+# services/prediction/profiles.py
+# headway + lateness profile per route/stop for every weekday / 15 minute slot
+# built from historical arrivals with numpy, looked up in O(1) on the prediction path
+
+import os
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select, delete
+from sqlalchemy.orm import Session
+
+from app.models.Database import Base, SessionLocal, engine
+from app.models.HeadwayProfile import HeadwayProfile
+from app.models.Journey import Journey
+from app.utils.logger.logger import get_logger
+
+logger = get_logger(__name__)
+
+BUCKET_MINUTES = 15
+BUCKETS_PER_DAY = 24 * 60 // BUCKET_MINUTES
+SLOTS = 7 * BUCKETS_PER_DAY
+
+# gaps longer than this are service gaps (overnight etc), not headways
+MAX_HEADWAY_MIN = 120
+LATENESS_CLIP_MIN = (-30.0, 90.0)
+
+# below this many arrivals in a slot the profile is noise
+MIN_PROFILE_SAMPLES = int(os.getenv("MIN_PROFILE_SAMPLES", "3"))
+
+# set on one worker (or run Scripts/build_headway_profiles.py from cron), the rest just reload
+HEADWAY_PROFILE_BUILD = os.getenv("HEADWAY_PROFILE_BUILD", "0") == "1"
+HEADWAY_PROFILE_REFRESH_SECONDS = int(os.getenv("HEADWAY_PROFILE_REFRESH_SECONDS", "900"))
+# 8 weeks = 8 samples per weekday slot, older timetables only blur the profile
+HEADWAY_PROFILE_LOOKBACK_DAYS = int(os.getenv("HEADWAY_PROFILE_LOOKBACK_DAYS", "56"))
+PROFILE_BUILD_CHUNK = 10_000
+
+
+class ProfileSignal(NamedTuple):
+    headway_min: Optional[float]
+    lateness_min: Optional[float]
+    samples: int
+
+
+def slot_of(when: datetime) -> int:
+    """Monday 00:00-00:15 → 0 ... Sunday 23:45 → 671"""
+    return when.weekday() * BUCKETS_PER_DAY + (when.hour * 60 + when.minute) // BUCKET_MINUTES
+
+
+def _slots_of(ts: np.ndarray) -> np.ndarray:
+    """Vectorised slot_of for UTC epoch seconds (1970-01-01 was a Thursday)"""
+    days = np.floor_divide(ts, 86400).astype(np.int64)
+    weekday = (days + 3) % 7
+    minute_of_day = (np.floor_divide(ts, 60).astype(np.int64)) % (24 * 60)
+    return weekday * BUCKETS_PER_DAY + minute_of_day // BUCKET_MINUTES
+
+
+def _epoch(values) -> np.ndarray:
+    out = np.full(len(values), np.nan)
+    for i, value in enumerate(values):
+        if value is not None:
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            out[i] = value.timestamp()
+    return out
+
+
+def compute_profiles(
+        pair_idx: np.ndarray,
+        arrived_ts: np.ndarray,
+        planned_ts: np.ndarray,
+        n_pairs: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pure numpy part. Inputs are parallel arrays (one entry per arrival).
+    Returns (headway, lateness, samples), each shaped (n_pairs, SLOTS).
+    """
+    size = n_pairs * SLOTS
+
+    order = np.lexsort((arrived_ts, pair_idx))
+    pair_idx = pair_idx[order]
+    arrived_ts = arrived_ts[order]
+    planned_ts = planned_ts[order]
+
+    flat = pair_idx * SLOTS + _slots_of(arrived_ts)
+    samples = np.bincount(flat, minlength=size)
+
+    # headway: gap to the previous arrival at the same route/stop, credited to the later one
+    gaps = np.diff(arrived_ts) / 60.0
+    same_pair = pair_idx[1:] == pair_idx[:-1]
+    ok = same_pair & (gaps > 0) & (gaps <= MAX_HEADWAY_MIN)
+    hw_sum = np.bincount(flat[1:][ok], weights=gaps[ok], minlength=size)
+    hw_cnt = np.bincount(flat[1:][ok], minlength=size)
+
+    # lateness: actual arrival vs the planned time the journey was started with
+    late = np.clip((arrived_ts - planned_ts) / 60.0, *LATENESS_CLIP_MIN)
+    has_plan = ~np.isnan(late)
+    late_sum = np.bincount(flat[has_plan], weights=late[has_plan], minlength=size)
+    late_cnt = np.bincount(flat[has_plan], minlength=size)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        headway = np.where(hw_cnt > 0, hw_sum / hw_cnt, np.nan)
+        lateness = np.where(late_cnt > 0, late_sum / late_cnt, np.nan)
+
+    return (
+        headway.astype(np.float32).reshape(n_pairs, SLOTS),
+        lateness.astype(np.float32).reshape(n_pairs, SLOTS),
+        np.minimum(samples, np.iinfo(np.uint16).max).astype(np.uint16).reshape(n_pairs, SLOTS),
+    )
+
+
+def _arrival_chunks(db: Session, since: datetime):
+    """(route_id, stop_id, arrived, planned) rows in chunks, streamed rather than loaded in one go"""
+    result = db.execute(
+        select(Journey.route_id, Journey.end_stop_id, Journey.start_time, Journey.planned_start_time)
+        .where(
+            Journey.created_at >= since,
+            Journey.start_time.is_not(None),
+            Journey.end_stop_id.is_not(None),
+        )
+        .execution_options(yield_per=PROFILE_BUILD_CHUNK)
+    )
+    yield from result.partitions()
+
+
+def build_headway_profiles(db: Session, lookback_days: int = HEADWAY_PROFILE_LOOKBACK_DAYS) -> int:
+    """
+    Rebuild headway_profiles from the journeys of the last lookback_days that got an ARRIVED.
+    Only the numpy columns are kept per arrival. Returns route/stop pairs written.
+    """
+    since = datetime.now(timezone.utc) - timedelta(days=lookback_days)
+
+    pairs: Dict[Tuple[str, str], int] = {}
+    idx_parts, arrived_parts, planned_parts = [], [], []
+    for chunk in _arrival_chunks(db, since):
+        idx_parts.append(np.fromiter(
+            (pairs.setdefault((r.route_id, r.end_stop_id), len(pairs)) for r in chunk),
+            dtype=np.int64,
+            count=len(chunk),
+        ))
+        arrived_parts.append(_epoch([r.start_time for r in chunk]))
+        planned_parts.append(_epoch([r.planned_start_time for r in chunk]))
+
+    pair_idx = np.concatenate(idx_parts) if idx_parts else np.empty(0, np.int64)
+    arrived_ts = np.concatenate(arrived_parts) if arrived_parts else np.empty(0)
+    planned_ts = np.concatenate(planned_parts) if planned_parts else np.empty(0)
+
+    headway, lateness, samples = compute_profiles(pair_idx, arrived_ts, planned_ts, len(pairs))
+
+    now = datetime.now(timezone.utc)
+    db.execute(delete(HeadwayProfile))
+    db.add_all(
+        HeadwayProfile(
+            route_id=route_id,
+            stop_id=stop_id,
+            headway=headway[i].astype("<f4").tobytes(),
+            lateness=lateness[i].astype("<f4").tobytes(),
+            samples=samples[i].astype("<u2").tobytes(),
+            built_at=now,
+        )
+        for (route_id, stop_id), i in pairs.items()
+    )
+    db.commit()
+
+    logger.info(f"Headway profiles built for {len(pairs)} route/stop pairs from {len(pair_idx)} arrivals")
+    return len(pairs)
+
+
+class ProfileStore:
+    """All profiles in three dense 2D arrays + a dict from (route, stop) to row"""
+
+    def __init__(self, rows: Dict[Tuple[str, str], int], headway: np.ndarray, lateness: np.ndarray, samples: np.ndarray):
+        self.rows = rows
+        self.headway = headway
+        self.lateness = lateness
+        self.samples = samples
+
+    @classmethod
+    def empty(cls) -> "ProfileStore":
+        return cls({}, np.empty((0, SLOTS), np.float32), np.empty((0, SLOTS), np.float32), np.empty((0, SLOTS), np.uint16))
+
+    @classmethod
+    def from_db(cls, db: Session) -> "ProfileStore":
+        profiles = db.execute(select(HeadwayProfile)).scalars().all()
+        if not profiles:
+            return cls.empty()
+
+        rows = {(p.route_id, p.stop_id): i for i, p in enumerate(profiles)}
+        headway = np.vstack([np.frombuffer(p.headway, dtype="<f4") for p in profiles])
+        lateness = np.vstack([np.frombuffer(p.lateness, dtype="<f4") for p in profiles])
+        samples = np.vstack([np.frombuffer(p.samples, dtype="<u2") for p in profiles])
+        return cls(rows, headway, lateness, samples)
+
+    def lookup(self, route_id: str, stop_id: Optional[str], when: datetime) -> Optional[ProfileSignal]:
+        row = self.rows.get((route_id, stop_id))
+        if row is None:
+            return None
+
+        slot = slot_of(when)
+        samples = int(self.samples[row, slot])
+        if samples < MIN_PROFILE_SAMPLES:
+            return None
+
+        headway = float(self.headway[row, slot])
+        lateness = float(self.lateness[row, slot])
+        return ProfileSignal(
+            headway_min=None if np.isnan(headway) else headway,
+            lateness_min=None if np.isnan(lateness) else lateness,
+            samples=samples,
+        )
+
+
+def ensure_headway_profiles() -> None:
+    """Startup: an empty table just means no profiles yet, a missing one fails every refresh"""
+    Base.metadata.create_all(engine, tables=[HeadwayProfile.__table__])
+
+
+_store = ProfileStore.empty()
+_build_lock = Lock()
+
+
+def lookup_profile(route_id: str, stop_id: Optional[str], when: datetime) -> Optional[ProfileSignal]:
+    """O(1) - dict hit + two array reads. None when we don't know enough about the slot."""
+    return _store.lookup(route_id, stop_id, when)
+
+
+def refresh_headway_profiles() -> None:
+    """Background job: (re)build if this worker is the builder, then swap in what's in the table"""
+    global _store
+
+    with _build_lock:
+        db = SessionLocal()
+        try:
+            if HEADWAY_PROFILE_BUILD:
+                build_headway_profiles(db)
+            _store = ProfileStore.from_db(db)
+        finally:
+            db.close()
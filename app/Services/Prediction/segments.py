@@ -0,0 +1,227 @@
+# services/prediction/segments.py
+# per route travel time between stops, from completed journeys
+# a fresh ARRIVED at stop k gives ETAs for every stop after it with one cumsum slice
+# the downstream ETAs live in each process - the event handler broadcasts every arrival
+# over the live relay (LIVE_FANOUT=postgres) so the other workers apply it too, without
+# the relay only the worker that took the report has them
+
+import os
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.Database import SessionLocal
+from app.models.Journey import Journey
+from app.models.Route import RouteStop
+from app.utils.logger.logger import get_logger
+
+logger = get_logger(__name__)
+
+SEGMENT_REFRESH_SECONDS = int(os.getenv("SEGMENT_REFRESH_SECONDS", "600"))
+SEGMENT_HISTORY_DAYS = int(os.getenv("SEGMENT_HISTORY_DAYS", "28"))
+
+# used for segments nobody has ridden yet when the route has no data at all
+DEFAULT_SEGMENT_MIN = 2.0
+MAX_JOURNEY_MIN = 180
+
+# how long one arrival keeps driving downstream ETAs
+DOWNSTREAM_TTL_MIN = 45
+
+
+class SegmentMatrix:
+    """
+    Stops of one route in sequence order + cumulative minutes from the first stop.
+    travel(i, j) = cum[j] - cum[i], the full n x n matrix is just the outer difference.
+    """
+
+    def __init__(self, stop_ids: List[str], cum_minutes: np.ndarray):
+        self.stop_ids = stop_ids
+        self.position = {stop_id: i for i, stop_id in enumerate(stop_ids)}
+        self.cum_minutes = cum_minutes
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self.cum_minutes[None, :] - self.cum_minutes[:, None]
+
+    @property
+    def total_minutes(self) -> float:
+        return float(self.cum_minutes[-1]) if len(self.cum_minutes) else 0.0
+
+    @classmethod
+    def from_journeys(
+            cls,
+            stop_ids: List[str],
+            start_pos: np.ndarray,
+            end_pos: np.ndarray,
+            minutes: np.ndarray) -> "SegmentMatrix":
+        """
+        Each journey covers segments start..end-1, its time is spread evenly over them.
+        Difference arrays + cumsum so it's O(journeys + stops) whatever the journey lengths.
+        """
+        n = len(stop_ids)
+        segments = max(n - 1, 0)
+
+        ok = (end_pos > start_pos) & (minutes > 0) & (minutes <= MAX_JOURNEY_MIN)
+        start_pos, end_pos, minutes = start_pos[ok], end_pos[ok], minutes[ok]
+        rate = minutes / (end_pos - start_pos)
+
+        sum_diff = np.zeros(n)
+        cnt_diff = np.zeros(n)
+        np.add.at(sum_diff, start_pos, rate)
+        np.add.at(sum_diff, end_pos, -rate)
+        np.add.at(cnt_diff, start_pos, 1)
+        np.add.at(cnt_diff, end_pos, -1)
+
+        seg_sum = np.cumsum(sum_diff)[:segments]
+        seg_cnt = np.cumsum(cnt_diff)[:segments]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            seg = np.where(seg_cnt > 0.5, seg_sum / seg_cnt, np.nan)
+
+        known = seg[~np.isnan(seg)]
+        fill = float(np.median(known)) if len(known) else DEFAULT_SEGMENT_MIN
+        seg = np.where(np.isnan(seg), fill, seg)
+
+        return cls(stop_ids, np.concatenate(([0.0], np.cumsum(seg))))
+
+
+def _epoch(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def build_segment_matrices(db: Session) -> Dict[str, SegmentMatrix]:
+    """Two queries: every route's stops, and recent completed journeys"""
+    route_stops: Dict[str, List[str]] = {}
+    for row in db.execute(
+            select(RouteStop.route_id, RouteStop.stop_id)
+            .order_by(RouteStop.route_id, RouteStop.sequence)):
+        route_stops.setdefault(row.route_id, []).append(row.stop_id)
+
+    since = datetime.now(timezone.utc) - timedelta(days=SEGMENT_HISTORY_DAYS)
+    journeys: Dict[str, List[Tuple[str, str, float]]] = {}
+    for row in db.execute(
+            select(Journey.route_id, Journey.start_stop_id, Journey.end_stop_id, Journey.start_time, Journey.end_time)
+            .where(
+                Journey.status == "STOP_REACHED",
+                Journey.start_time.is_not(None),
+                Journey.end_time.is_not(None),
+                Journey.created_at >= since,
+            )):
+        minutes = (_epoch(row.end_time) - _epoch(row.start_time)) / 60
+        journeys.setdefault(row.route_id, []).append((row.start_stop_id, row.end_stop_id, minutes))
+
+    matrices = {}
+    for route_id, stop_ids in route_stops.items():
+        position = {stop_id: i for i, stop_id in enumerate(stop_ids)}
+        rows = [
+            (position[a], position[b], m)
+            for a, b, m in journeys.get(route_id, [])
+            if a in position and b in position
+        ]
+        data = np.array(rows, dtype=float).reshape(-1, 3)
+        matrices[route_id] = SegmentMatrix.from_journeys(
+            stop_ids,
+            data[:, 0].astype(np.int64),
+            data[:, 1].astype(np.int64),
+            data[:, 2],
+        )
+
+    logger.info(f"Segment matrices built for {len(matrices)} routes")
+    return matrices
+
+
+_matrices: Dict[str, SegmentMatrix] = {}
+_built = False
+
+# route_id → (matrix used, position of the reporting stop, arrival epoch, eta epochs for every stop)
+_downstream: Dict[str, Tuple[SegmentMatrix, int, float, np.ndarray]] = {}
+_lock = Lock()
+
+
+def refresh_segment_matrices() -> None:
+    """Background job - rebuild and swap"""
+    global _matrices, _built
+
+    db = SessionLocal()
+    try:
+        _matrices = build_segment_matrices(db)
+        _built = True
+    finally:
+        db.close()
+
+
+def get_segment_matrix(route_id: str) -> Optional[SegmentMatrix]:
+    return _matrices.get(route_id)
+
+
+def longest_route_minutes() -> float:
+    """End to end minutes of the longest built route, 0 before the first refresh"""
+    return max((m.total_minutes for m in _matrices.values()), default=0.0)
+
+
+def segment_matrices_built() -> bool:
+    """False until the first refresh went through (no matrix then means "not built yet", not "no such route")"""
+    return _built
+
+
+def propagate_arrival(route_id: str, stop_id: str, arrived_at: datetime) -> List[str]:
+    """
+    Bus seen at stop k → ETA for k+1..n is arrived_at + (cum[j] - cum[k]).
+    Kept per process, the newest arrival per route wins - so a report relayed from another
+    worker can land late or twice and every worker still ends up the same. Returns the downstream stop ids.
+    """
+    matrix = _matrices.get(route_id)
+    if matrix is None or stop_id not in matrix.position:
+        return []
+
+    k = matrix.position[stop_id]
+    arrived_ts = _epoch(arrived_at)
+    etas = arrived_ts + (matrix.cum_minutes - matrix.cum_minutes[k]) * 60
+
+    with _lock:
+        current = _downstream.get(route_id)
+        if current is None or current[2] <= arrived_ts:
+            _downstream[route_id] = (matrix, k, arrived_ts, etas)
+
+    return matrix.stop_ids[k + 1:]
+
+
+def _fresh(route_id: str, now: datetime) -> Optional[Tuple[SegmentMatrix, int, float, np.ndarray]]:
+    entry = _downstream.get(route_id)
+    if entry is None:
+        return None
+    if now.timestamp() - entry[2] > DOWNSTREAM_TTL_MIN * 60:
+        return None
+    return entry
+
+
+def downstream_eta(route_id: str, stop_id: Optional[str], now: datetime) -> Optional[datetime]:
+    """ETA at this stop from the latest upstream arrival on the route, if there is a usable one"""
+    entry = _fresh(route_id, now)
+    if entry is None:
+        return None
+
+    matrix, k, _, etas = entry
+    pos = matrix.position.get(stop_id)
+    if pos is None or pos <= k:
+        return None
+    return datetime.fromtimestamp(float(etas[pos]), tz=timezone.utc)
+
+
+def downstream_etas_for_route(route_id: str, now: datetime) -> Dict[str, datetime]:
+    """Every downstream ETA on the route at once (for the route-wide predictions)"""
+    entry = _fresh(route_id, now)
+    if entry is None:
+        return {}
+
+    matrix, k, _, etas = entry
+    return {
+        stop_id: datetime.fromtimestamp(float(eta), tz=timezone.utc)
+        for stop_id, eta in zip(matrix.stop_ids[k + 1:], etas[k + 1:])
+    }
@@ -1,9 +1,24 @@
 
 from datetime import datetime, time, timezone
-from .data import get_recent_user_events, get_user_journeys
+from typing import List, TYPE_CHECKING
+from .data import (
+    get_recent_user_events, get_user_journeys, get_route_journeys_batch,
+    get_recent_user_events_async, get_user_journeys_async, get_route_journeys_batch_async,
+)
 from .logic import predict_bus_time
+from .cache import prediction_cache, prediction_key
+from .profiles import lookup_profile
+from .segments import downstream_eta, downstream_etas_for_route
+from .vectorized import pack_queries, predict_bus_times
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.Route import RouteStop, Stop
+from app.utils.fetch_time import TIMETABLE_SOURCE, get_next_departures_for_stops
+
 def _prediction_source(journeys, events, static_time):
     if events:
         return "live"
@@ -21,6 +36,13 @@ def get_prediction(
     
     now = datetime.now(timezone.utc)
 
+    # same route/stop/minute bucket → same answer until an event invalidates it
+    key = prediction_key(route_id, stop_id, static_time, now)
+    cached = prediction_cache.get(key)
+    if cached is not None:
+        return cached
+    generation = prediction_cache.generation(route_id, stop_id)
+
     journey_times = get_user_journeys(
         db=db,
         route_id=route_id,
@@ -38,13 +60,125 @@ def get_prediction(
         static_time=static_time,
         user_events=events,
         past_arrivals=journey_times,
-        now=datetime.now(timezone.utc))
-    
+        now=datetime.now(timezone.utc),
+        profile=lookup_profile(route_id, stop_id, now),
+        downstream_eta=downstream_eta(route_id, stop_id, now))
+
+    prediction_cache.put(key, (predicted_time, confidence), generation)
+    return predicted_time, confidence
+
+
+async def get_prediction_async(
+        route_id: str,
+        stop_id: str,
+        static_time: datetime,
+        db: "AsyncSession") -> tuple:
+    """get_prediction on an AsyncSession, same cache"""
+    now = datetime.now(timezone.utc)
+
+    key = prediction_key(route_id, stop_id, static_time, now)
+    cached = prediction_cache.get(key)
+    if cached is not None:
+        return cached
+    generation = prediction_cache.generation(route_id, stop_id)
+
+    journey_times = await get_user_journeys_async(db=db, route_id=route_id, stop_id=stop_id, limit=10)
+    events = await get_recent_user_events_async(db=db, route_id=route_id, stop_id=stop_id)
+
+    predicted_time, confidence = predict_bus_time(
+        static_time=static_time,
+        user_events=events,
+        past_arrivals=journey_times,
+        now=now,
+        profile=lookup_profile(route_id, stop_id, now),
+        downstream_eta=downstream_eta(route_id, stop_id, now))
+
+    prediction_cache.put(key, (predicted_time, confidence), generation)
     return predicted_time, confidence
                                                   
    
 
 
+def _route_stops_stmt(route_id: str):
+    return (
+        select(RouteStop.stop_id, RouteStop.sequence, Stop.name)
+        .join(Stop, Stop.id == RouteStop.stop_id)
+        .where(RouteStop.route_id == route_id)
+        .order_by(RouteStop.sequence)
+    )
+
+
+def _score_route(route_id: str, stops, history, schedules, now: datetime) -> List[dict]:
+    downstream = downstream_etas_for_route(route_id, now)
+
+    queries = []
+    for stop in stops:
+        events, journey_times = history[stop.stop_id]
+        static_time, _, is_tomorrow = schedules[stop.stop_id]
+        queries.append({
+            "static_time": static_time,
+            "static_is_tomorrow": is_tomorrow,
+            "user_events": events,
+            "past_arrivals": journey_times,
+            "now": now,
+            "profile": lookup_profile(route_id, stop.stop_id, now),
+            "downstream_eta": downstream.get(stop.stop_id),
+        })
+
+    # whole route in one array pass (same answers as predict_bus_time)
+    predicted, confidence = predict_bus_times(**pack_queries(queries))
+
+    results = []
+    for stop, query, pred_ts, conf in zip(stops, queries, predicted, confidence):
+        predicted_time = datetime.fromtimestamp(float(pred_ts), tz=timezone.utc)
+        results.append({
+            "stop_id": stop.stop_id,
+            "name": stop.name,
+            "sequence": stop.sequence,
+            "predicted_arrival": predicted_time.isoformat(),
+            "minutes_until": int((predicted_time - now).total_seconds() // 60),
+            "confidence": round(float(conf), 2),
+            "source": _prediction_source(query["past_arrivals"], query["user_events"], query["static_time"]),
+        })
+
+    return results
+
+
+def get_route_predictions(route_id: str, db: Session) -> List[dict]:
+    """
+    ETA + confidence for every stop on a route, in route_stops sequence order.
+    Two queries total (stops + one windowed journeys query) instead of two per stop.
+    """
+    now = datetime.now(timezone.utc)
+
+    stops = db.execute(_route_stops_stmt(route_id)).all()
+    if not stops:
+        return []
+
+    stop_ids = [s.stop_id for s in stops]
+    history = get_route_journeys_batch(route_id=route_id, stop_ids=stop_ids, db=db)
+    schedules = get_next_departures_for_stops(route_id, stop_ids, reference_time=now, db=db)
+    return _score_route(route_id, stops, history, schedules, now)
+
+
+async def get_route_predictions_async(route_id: str, db: "AsyncSession") -> List[dict]:
+    """get_route_predictions on an AsyncSession"""
+    now = datetime.now(timezone.utc)
+
+    stops = (await db.execute(_route_stops_stmt(route_id))).all()
+    if not stops:
+        return []
+
+    stop_ids = [s.stop_id for s in stops]
+    history = await get_route_journeys_batch_async(route_id=route_id, stop_ids=stop_ids, db=db)
+    if TIMETABLE_SOURCE == "db":
+        schedules = await db.run_sync(
+            lambda session: get_next_departures_for_stops(route_id, stop_ids, reference_time=now, db=session))
+    else:
+        schedules = get_next_departures_for_stops(route_id, stop_ids, reference_time=now)
+    return _score_route(route_id, stops, history, schedules, now)
+
+
 def return_prediction(
         route_id: str,
         stop_id: str):
@@ -0,0 +1,191 @@
+# services/prediction/vectorized.py
+# predict_bus_time over arrays - many (route, stop) queries in one go
+# same steps as logic.py, every "if" turned into a mask. keep the two in sync!
+# check with Scripts/bench_vectorized_prediction.py after touching either
+
+from datetime import datetime, time, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+EVENT_OTHER = 0
+EVENT_ARRIVED = 1
+EVENT_DELAYED = 2
+
+_EVENT_CODES = {"ARRIVED": EVENT_ARRIVED, "DELAYED": EVENT_DELAYED}
+
+# weighted_average only looks at the newest 10
+CROWD_WINDOW = 10
+
+
+def _epoch(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _segments(offsets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """CSR offsets → (query index, position inside its query) for every flat element"""
+    lengths = np.diff(offsets)
+    seg = np.repeat(np.arange(len(lengths)), lengths)
+    pos = np.arange(offsets[-1]) - offsets[:-1][seg]
+    return seg, pos
+
+
+def pack_queries(queries: Iterable[dict]) -> Dict[str, np.ndarray]:
+    """
+    predict_bus_time kwargs (one dict per query) → the arrays predict_bus_times takes.
+    Events and past arrivals become CSR style: flat values + offsets, query i owns [off[i], off[i+1]).
+    """
+    now_ts: List[float] = []
+    event_offsets, event_ts, event_type = [0], [], []
+    arrival_offsets, arrival_ts = [0], []
+    sched_minute, sched_tomorrow = [], []
+    lateness, headway, downstream = [], [], []
+
+    for q in queries:
+        now = q.get("now") or datetime.now(timezone.utc)
+        now_ts.append(_epoch(now))
+
+        for e in q.get("user_events") or []:
+            event_ts.append(_epoch(e["time"]))
+            event_type.append(_EVENT_CODES.get(e["type"], EVENT_OTHER))
+        event_offsets.append(len(event_ts))
+
+        arrival_ts.extend(_epoch(t) for t in q.get("past_arrivals") or [])
+        arrival_offsets.append(len(arrival_ts))
+
+        static_time: Optional[time] = q.get("static_time")
+        if static_time is not None:
+            sched_minute.append(
+                static_time.hour * 60 + static_time.minute
+                + (static_time.second + static_time.microsecond / 1e6) / 60
+            )
+        else:
+            sched_minute.append(np.nan)
+        sched_tomorrow.append(bool(q.get("static_is_tomorrow")))
+
+        profile = q.get("profile")
+        lateness.append(np.nan if profile is None or profile.lateness_min is None else profile.lateness_min)
+        headway.append(np.nan if profile is None or profile.headway_min is None else profile.headway_min)
+
+        eta = q.get("downstream_eta")
+        downstream.append(np.nan if eta is None else _epoch(eta))
+
+    return {
+        "now_ts": np.array(now_ts, dtype=np.float64),
+        "event_offsets": np.array(event_offsets, dtype=np.int64),
+        "event_ts": np.array(event_ts, dtype=np.float64),
+        "event_type": np.array(event_type, dtype=np.int8),
+        "arrival_offsets": np.array(arrival_offsets, dtype=np.int64),
+        "arrival_ts": np.array(arrival_ts, dtype=np.float64),
+        "sched_minute": np.array(sched_minute, dtype=np.float64),
+        "sched_tomorrow": np.array(sched_tomorrow, dtype=bool),
+        "lateness_min": np.array(lateness, dtype=np.float64),
+        "headway_min": np.array(headway, dtype=np.float64),
+        "downstream_ts": np.array(downstream, dtype=np.float64),
+    }
+
+
+def predict_bus_times(
+        now_ts: np.ndarray,
+        event_offsets: np.ndarray,
+        event_ts: np.ndarray,
+        event_type: np.ndarray,
+        arrival_offsets: np.ndarray,
+        arrival_ts: np.ndarray,
+        sched_minute: np.ndarray,
+        sched_tomorrow: np.ndarray,
+        lateness_min: np.ndarray,
+        headway_min: np.ndarray,
+        downstream_ts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Array version of logic.predict_bus_time. Times are UTC epoch seconds, NaN = not there.
+    sched_minute is the timetable time as minutes after midnight (UTC day of now).
+    arrival_ts is newest first per query, like past_arrivals.
+    Returns (predicted epoch seconds, confidence), one per query.
+    """
+    n = len(now_ts)
+    now = now_ts
+
+    # per query reductions over the CSR events
+    ev_seg, _ = _segments(event_offsets)
+    is_arr = event_type == EVENT_ARRIVED
+    latest = np.full(n, -np.inf)
+    np.maximum.at(latest, ev_seg[is_arr], event_ts[is_arr])
+    has_arr = np.isfinite(latest)
+    delays = np.bincount(ev_seg[event_type == EVENT_DELAYED], minlength=n)
+
+    with np.errstate(invalid="ignore"):
+        age = np.where(has_arr, (now - latest) / 60, np.nan)
+
+    pred = now + 12 * 60
+    conf = np.full(n, 0.25)
+
+    # 1. recent ARRIVED (<= 2.5 min returns straight away, applied at the very end)
+    early = has_arr & (age <= 2.5)
+    fresh = has_arr & (age <= 5)
+    pred = np.where(fresh, latest + 60, pred)
+    conf = np.where(fresh, 0.88, conf)
+
+    # 1b. downstream ETA
+    ok = ~np.isnan(downstream_ts) & (conf < 0.75)
+    ok[ok] &= downstream_ts[ok] >= now[ok] - 60
+    pred = np.where(ok, downstream_ts, pred)
+    conf = np.where(ok, 0.75, conf)
+
+    # 2. crowd weighted average, newest 10 weighted 10..1
+    ar_seg, ar_pos = _segments(arrival_offsets)
+    keep = ar_pos < CROWD_WINDOW
+    used = np.minimum(np.diff(arrival_offsets), CROWD_WINDOW)
+    weights = (used[ar_seg] - ar_pos)[keep].astype(np.float64)
+    w_sum = np.bincount(ar_seg[keep], weights=weights, minlength=n)
+    wt_sum = np.bincount(ar_seg[keep], weights=weights * arrival_ts[keep], minlength=n)
+    has_crowd = w_sum > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        crowd = np.where(has_crowd, wt_sum / w_sum, np.nan)
+        ok = has_crowd & ((now - crowd) / 60 < 90) & (conf < 0.60)
+    pred = np.where(ok, crowd, pred)
+    conf = np.where(ok, 0.60, conf)
+
+    # 3. timetable (adjust_timetable_time with max_drift_min=18)
+    has_sched = ~np.isnan(sched_minute)
+    day_start = np.floor(now / 86400) * 86400
+    sched = day_start + sched_tomorrow * 86400.0 + sched_minute * 60
+    with np.errstate(invalid="ignore"):
+        missed = sched < now
+        drift = np.minimum((now - sched) / 60, 18)
+    sched = np.where(missed, now + (drift + 2) * 60, sched)
+    sched_conf = np.where(missed, np.maximum(0.25, 0.55 - (drift / 18) * 0.3), 0.55)
+
+    with np.errstate(invalid="ignore"):
+        left = has_arr & (age > 5) & (age <= 20)
+    sched = np.where(left, sched + np.minimum(12, np.maximum(0, age - 4)) * 60, sched)
+    sched_conf = np.where(left, np.maximum(0.45, sched_conf - 0.08), sched_conf)
+
+    has_late = ~np.isnan(lateness_min)
+    sched = np.where(has_late, sched + np.clip(lateness_min, -5.0, 15.0) * 60, sched)
+    sched_conf = np.where(has_late, np.minimum(0.65, sched_conf + 0.05), sched_conf)
+
+    ok = has_sched & (sched_conf > conf)
+    pred = np.where(ok, sched, pred)
+    conf = np.where(ok, sched_conf, conf)
+
+    # 3b. no timetable → half the headway
+    ok = ~has_sched & ~np.isnan(headway_min) & (conf < 0.35)
+    pred = np.where(ok, now + headway_min / 2 * 60, pred)
+    conf = np.where(ok, 0.35, conf)
+
+    # 4. delay reports
+    ok = (delays >= 1) & ((pred - now) / 60 < 35)
+    pred = np.where(ok, pred + (4 + delays * 3.5) * 60, pred)
+    conf = np.where(ok, np.minimum(0.90, conf + 0.12), conf)
+
+    # safety net
+    pred = np.where(pred < now, now + 120, np.where((pred - now) / 60 < 1.5, now + 150, pred))
+    conf = np.clip(conf, 0.18, 0.94)
+
+    pred = np.where(early, latest + 60, pred)
+    conf = np.where(early, 0.88, conf)
+
+    return pred, conf
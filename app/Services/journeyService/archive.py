@@ -0,0 +1,80 @@
+# services/journeyService/archive.py
+# the cold half of journey retention (retention.py does the moving): zstd Parquet on local disk,
+# one directory per UTC day so a reader only opens the days it asks for
+#
+#   {JOURNEY_ARCHIVE_DIR}/journeys/day=2026-09-01/part-<first id>.parquet
+#   {JOURNEY_ARCHIVE_DIR}/journey_events/day=2026-09-01/part-<first key>.parquet
+#
+# nothing in here touches the database, so the backtester / notebooks can read history
+# with only pyarrow installed (it's optional, the API runs without it)
+
+import os
+from datetime import date
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+JOURNEY_ARCHIVE_DIR = os.getenv("JOURNEY_ARCHIVE_DIR", "archive")
+
+KINDS = ("journeys", "journey_events")
+
+
+def pyarrow_or_raise():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("The journey archive needs pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def day_folder(archive_dir: str, kind: str, day: date) -> Path:
+    return Path(archive_dir) / kind / f"day={day.isoformat()}"
+
+
+def archived_days(kind: str = "journeys", archive_dir: str = JOURNEY_ARCHIVE_DIR) -> List[date]:
+    folder = Path(archive_dir) / kind
+    if not folder.is_dir():
+        return []
+    days = []
+    for child in folder.iterdir():
+        if child.is_dir() and child.name.startswith("day="):
+            days.append(date.fromisoformat(child.name[len("day="):]))
+    return sorted(days)
+
+
+def iter_archive(
+        kind: str = "journeys",
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        columns: Optional[List[str]] = None,
+        archive_dir: str = JOURNEY_ARCHIVE_DIR) -> Iterator:
+    """
+    pyarrow RecordBatches for the archived days in [since, until), oldest day first.
+    Only the day folders in range are opened and only `columns` are read, so a backtest
+    over a month of a year's archive reads a month.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {', '.join(KINDS)}, not {kind!r}")
+    pa = pyarrow_or_raise()
+
+    for day in archived_days(kind, archive_dir):
+        if (since and day < since) or (until and day >= until):
+            continue
+        for path in sorted(day_folder(archive_dir, kind, day).glob("part-*.parquet")):
+            yield from pa.parquet.ParquetFile(path).iter_batches(columns=columns)
+
+
+def read_archive(
+        kind: str = "journeys",
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        columns: Optional[List[str]] = None,
+        archive_dir: str = JOURNEY_ARCHIVE_DIR):
+    """iter_archive as one pyarrow Table (no columns at all if nothing's archived in the range)"""
+    pa = pyarrow_or_raise()
+    batches = list(iter_archive(kind, since, until, columns, archive_dir))
+    return pa.Table.from_batches(batches) if batches else pa.table({})
+
+
+def archive_parts(kind: str = "journeys", archive_dir: str = JOURNEY_ARCHIVE_DIR) -> List[Path]:
+    return sorted((Path(archive_dir) / kind).glob("day=*/part-*.parquet"))
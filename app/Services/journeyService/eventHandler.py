@@ -1,85 +1,211 @@
 #TODO Separate into own folder with one main service handler, and separate files for each event type
 
+import asyncio
+import json
 from datetime import datetime, timezone
 from uuid import UUID
+from typing import FrozenSet, NamedTuple, NoReturn, Optional, TYPE_CHECKING
 from fastapi import HTTPException
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
 from app.utils.logger import logger
-from app.models.Journey import Journey
+from app.models.Journey import ACTIVE_STATUSES, Journey
 from app.schemas.journey import JourneyEventType
 
-from app.Services.Prediction.service import predict_bus_time
+from app.models.Database import SessionLocal
+from app.Services.Prediction.service import get_prediction
+from app.Services.Prediction.cache import prediction_cache
+from app.Services.Prediction.arrival_stats import record_arrival, record_arrival_async
+from app.Services.journeyService.event_log import record_event
+from app.Services.journeyService.route_status import route_key, route_status, status_flight
+from app.Services.stopService.trip_rollups import record_finish, record_finish_async
+from app.Services.Prediction.segments import propagate_arrival, downstream_etas_for_route
+from app.utils.fetch_time import get_closest_scheduled_time_to_now
+from app.utils.pubsub import hub
 
 logger = logger.get_logger()
 
 
+class Transition(NamedTuple):
+    allowed: FrozenSet[str]   # statuses the event is allowed from
+    message: str              # 409 detail when it isn't
+    stamp: Optional[str]      # timestamp column set to now, if any
+
+
+TRANSITIONS = {
+    JourneyEventType.EVENT_TYPE_ARRIVED: Transition(
+        frozenset({JourneyEventType.EVENT_TYPE_STARTED, JourneyEventType.EVENT_TYPE_DELAYED}),
+        "Cannot mark as ARRIVED from status: {status}",
+        "start_time",
+    ),
+    JourneyEventType.EVENT_TYPE_DELAYED: Transition(
+        frozenset({JourneyEventType.EVENT_TYPE_STARTED}),
+        "Cannot mark as DELAYED from status: {status}",
+        None,
+    ),
+    JourneyEventType.EVENT_TYPE_STOP_REACHED: Transition(
+        frozenset(ACTIVE_STATUSES),
+        "Cannot mark stop reached, journey is already finished ({status})",
+        "end_time",
+    ),
+}
+
+
 class JourneyEventHandler:
     @staticmethod
-    def arrived(journey_id: UUID, db: Session) -> Journey:
-        """Set user active journey status to arrived"""
-        allowed = {"STARTED", "DELAYED"}
-        journey = db.get(Journey, str(journey_id))
+    def _transition_stmt(journey_id: UUID, event_type: str):
+        """
+        The check and the write in one statement: only matches if the journey is still in an
+        allowed status, so of two taps racing on the same journey exactly one gets a row back
+        """
+        transition = TRANSITIONS[event_type]
+        values = {"status": event_type}
+        if transition.stamp:
+            values[transition.stamp] = datetime.now(timezone.utc)
+
+        return (
+            update(Journey)
+            .where(Journey.id == str(journey_id), Journey.status.in_(transition.allowed))
+            .values(**values)
+            .returning(Journey)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def _status_stmt(journey_id: UUID):
+        return select(Journey.status).where(Journey.id == str(journey_id))
 
-        if not journey:
+    @staticmethod
+    def _missed(journey_id: UUID, event_type: str, row) -> NoReturn:
+        """Slow path, the UPDATE matched nothing: gone (404) or not in an allowed status (409)"""
+        if row is None:
             logger.warning(f"Journey not found: {journey_id}")
             raise HTTPException(404, f"Journey {journey_id} not found")
+        raise HTTPException(409, TRANSITIONS[event_type].message.format(status=row.status))
 
-        if journey.status not in allowed:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Cannot mark as ARRIVED from status: {journey.status}"
-            )
-        
-        journey.start_time = datetime.now(timezone.utc)
-        journey.status = JourneyEventType.EVENT_TYPE_ARRIVED
-        db.commit()
-        db.refresh(journey)
-        return journey
-    
+    @staticmethod
+    def _log(db, journey: Journey, event_type: str) -> None:
+        """History row for the transition, at the same timestamp the journey got stamped with"""
+        stamp = TRANSITIONS[event_type].stamp
+        record_event(db, journey, event_type, getattr(journey, stamp) if stamp else None)
 
     @staticmethod
-    def delayed(journey_id: UUID, db: Session) -> Journey:
-        """Set user active journey status to DELAYED"""
-        allowed = {JourneyEventType.EVENT_TYPE_STARTED}
-        journey = db.get(Journey, str(journey_id))
-        
-        if not journey:
-            raise HTTPException(404, f"Journey {journey_id} not found")
+    def _apply(change: dict) -> None:
+        """What an event changes in this process - run here, and on every other worker via the live relay"""
+        prediction_cache.invalidate(change["route_id"], change["stop_id"])
+        status_flight.forget(route_key(change["route_id"]))
+        if change["arrived_at"] is not None:
+            # bus is at the boarding stop now → every stop after it gets a fresh ETA
+            arrived_at = datetime.fromisoformat(change["arrived_at"])
+            for stop_id in propagate_arrival(change["route_id"], change["start_stop_id"], arrived_at):
+                prediction_cache.invalidate(change["route_id"], stop_id)
 
-        if journey.status not in allowed:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Cannot mark as DELAYED from status: {journey.status}"
-            )
+    @staticmethod
+    def _after_commit(journey: Journey, event_type: str) -> None:
+        arrived = event_type == JourneyEventType.EVENT_TYPE_ARRIVED
+        change = {
+            "route_id": journey.route_id,
+            "stop_id": journey.end_stop_id,
+            "start_stop_id": journey.start_stop_id,
+            "arrived_at": journey.start_time.isoformat() if arrived else None,
+        }
+        JourneyEventHandler._apply(change)
+        hub.broadcast("journey_event", change)
 
-        journey.status = JourneyEventType.EVENT_TYPE_DELAYED
-       
+        downstream = {}
+        if arrived:
+            downstream = downstream_etas_for_route(journey.route_id, datetime.now(timezone.utc))
+
+        JourneyEventHandler._publish(journey, event_type, downstream)
+
+    @staticmethod
+    def _publish(journey: Journey, event_type: str, downstream: dict) -> None:
+        """
+        Push to live subscribers (routers/live.py). Needs a few queries, so an async caller
+        hands it to the threadpool instead of running them on the loop.
+        """
+        if not hub.bound:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            JourneyEventHandler._push(journey, event_type, downstream)
+        else:
+            loop.run_in_executor(None, JourneyEventHandler._push, journey, event_type, downstream)
+
+    @staticmethod
+    def _push(journey: Journey, event_type: str, downstream: dict) -> None:
+        """
+        The /journeys/status/{route_id} answer plus the journey's prediction, worked out again
+        now that the event has invalidated the cached one. Encoded once here, not per subscriber.
+        """
+        db = SessionLocal()
+        try:
+            payload = route_status(journey.route_id, db)
+            predicted_arrival, confidence = None, None
+            if journey.end_stop_id:
+                static_time, _, _ = get_closest_scheduled_time_to_now(journey.route_id, journey.end_stop_id, db=db)
+                predicted_arrival, confidence = get_prediction(journey.route_id, journey.end_stop_id, static_time, db)
+        except Exception as e:
+            logger.error(f"Live update for journey {journey.id} not sent: {e}")
+            return
+        finally:
+            db.close()
+
+        payload.update({
+            "journey_id": str(journey.id),
+            "event": event_type,
+            "stop_id": journey.end_stop_id,
+            "predicted_arrival": predicted_arrival.isoformat() if predicted_arrival else None,
+            "confidence": round(confidence, 2) if confidence is not None else None,
+            "downstream_etas": {stop_id: eta.isoformat() for stop_id, eta in downstream.items()},
+            "at": datetime.now(timezone.utc).isoformat(),
+        })
+        topics = [f"route:{journey.route_id}"]
+        topics += [f"stop:{stop_id}" for stop_id in {journey.end_stop_id, journey.start_stop_id, *downstream} if stop_id]
+
+        hub.publish(topics, json.dumps(payload))
+
+    @staticmethod
+    def _handle(journey_id: UUID, event_type: str, db: Session) -> Journey:
+        journey = db.execute(JourneyEventHandler._transition_stmt(journey_id, event_type)).scalars().first()
+        if journey is None:
+            row = db.execute(JourneyEventHandler._status_stmt(journey_id)).first()
+            db.rollback()
+            JourneyEventHandler._missed(journey_id, event_type, row)
+
+        JourneyEventHandler._log(db, journey, event_type)
+        if event_type not in ACTIVE_STATUSES:
+            # out of the active set → one fewer active trip at every stop on the route
+            record_finish(db, journey)
+        if event_type == JourneyEventType.EVENT_TYPE_ARRIVED:
+            # crowd average input, committed together with the status change
+            record_arrival(db, journey.route_id, journey.end_stop_id, journey.start_time)
+        # RETURNING already gave us the row - detached so the commit doesn't expire it into another SELECT
+        db.expunge(journey)
         db.commit()
-        db.refresh(journey)
+
+        JourneyEventHandler._after_commit(journey, event_type)
         return journey
-    
 
     @staticmethod
-    def stop_reached(journey_id: UUID, db: Session) -> Journey:
-        allowed = {JourneyEventType.EVENT_TYPE_STARTED, JourneyEventType.EVENT_TYPE_DELAYED, JourneyEventType.EVENT_TYPE_ARRIVED}
-        journey = db.get(Journey, str(journey_id))
+    def arrived(journey_id: UUID, db: Session) -> Journey:
+        """Set user active journey status to arrived"""
+        return JourneyEventHandler._handle(journey_id, JourneyEventType.EVENT_TYPE_ARRIVED, db)
 
-        if not journey:
-            raise HTTPException(404, f"Journey {journey_id} not found")
+    @staticmethod
+    def delayed(journey_id: UUID, db: Session) -> Journey:
+        """Set user active journey status to DELAYED"""
+        return JourneyEventHandler._handle(journey_id, JourneyEventType.EVENT_TYPE_DELAYED, db)
 
-        if journey.status not in allowed:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Cannot mark stop reached, journey is already finished ({journey.status})"
-            )
+    @staticmethod
+    def stop_reached(journey_id: UUID, db: Session) -> Journey:
+        return JourneyEventHandler._handle(journey_id, JourneyEventType.EVENT_TYPE_STOP_REACHED, db)
 
-        journey.status = JourneyEventType.EVENT_TYPE_STOP_REACHED
-        journey.end_time = datetime.now(timezone.utc)
-        db.commit()
-        db.refresh(journey)
-        return journey
- 
     @staticmethod
     def add_event(
         journey_id: UUID,event_type: JourneyEventType, db: Session) -> Journey:
@@ -94,4 +220,33 @@ class JourneyEventHandler:
         if handler is None:
             logger.warning(f"Unsupported event type received: {event_type}")
             raise HTTPException(400, f"Unsupported event type: {event_type}")
-        return handler(journey_id, db)
\ No newline at end of file
+        return handler(journey_id, db)
+
+    @staticmethod
+    async def add_event_async(
+        journey_id: UUID, event_type: JourneyEventType, db: "AsyncSession") -> Journey:
+        """add_event on an AsyncSession (DB_MODE=async)"""
+        if event_type not in TRANSITIONS:
+            logger.warning(f"Unsupported event type received: {event_type}")
+            raise HTTPException(400, f"Unsupported event type: {event_type}")
+
+        result = await db.execute(JourneyEventHandler._transition_stmt(journey_id, event_type))
+        journey = result.scalars().first()
+        if journey is None:
+            row = (await db.execute(JourneyEventHandler._status_stmt(journey_id))).first()
+            await db.rollback()
+            JourneyEventHandler._missed(journey_id, event_type, row)
+
+        JourneyEventHandler._log(db, journey, event_type)
+        if event_type not in ACTIVE_STATUSES:
+            await record_finish_async(db, journey)
+        if event_type == JourneyEventType.EVENT_TYPE_ARRIVED:
+            await record_arrival_async(db, journey.route_id, journey.end_stop_id, journey.start_time)
+        db.expunge(journey)
+        await db.commit()
+
+        JourneyEventHandler._after_commit(journey, event_type)
+        return journey
+
+
+hub.on("journey_event", JourneyEventHandler._apply)
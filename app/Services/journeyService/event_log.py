@@ -0,0 +1,140 @@
+# services/journeyService/event_log.py
+# journey_events - the append-only history behind Journey.status
+# every transition inserts one row in the same transaction as the status update, nothing updates or deletes rows
+# postgres: range partitioned by day, one table per day + a default catch-all, so retention is a DROP TABLE
+# anything else (sqlite in dev): one plain table, old rows go with a DELETE
+
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import delete, text
+from sqlalchemy.engine import Connection
+
+from app.models.Database import Base, engine
+from app.models.Journey import Journey
+from app.models.JourneyEvent import JourneyEvent
+from app.utils.logger.logger import get_logger
+
+logger = get_logger(__name__)
+
+# partitions are made this many days ahead, so the default partition normally stays empty
+JOURNEY_EVENT_PARTITION_DAYS_AHEAD = int(os.getenv("JOURNEY_EVENT_PARTITION_DAYS_AHEAD", "3"))
+JOURNEY_EVENT_PARTITION_REFRESH_SECONDS = int(os.getenv("JOURNEY_EVENT_PARTITION_REFRESH_SECONDS", str(6 * 3600)))
+
+TABLE = JourneyEvent.__tablename__
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+
+def record_event(db, journey: Journey, event_type: str, ts: Optional[datetime] = None) -> None:
+    """Queue the insert on db (Session or AsyncSession). Caller commits, same transaction as the journey update."""
+    db.add(JourneyEvent(
+        journey_id=str(journey.id),
+        type=event_type,
+        ts=ts or datetime.now(timezone.utc),
+        route_id=journey.route_id,
+        stop_id=journey.end_stop_id,
+    ))
+
+
+def is_partitioned(bind=None) -> bool:
+    return (bind or engine).dialect.name == "postgresql"
+
+
+def partition_name(day: date) -> str:
+    return f"{TABLE}_{day:%Y%m%d}"
+
+
+def _day_of(name: str) -> Optional[date]:
+    try:
+        return datetime.strptime(name[len(TABLE) + 1:], "%Y%m%d").date()
+    except ValueError:
+        return None  # the default partition
+
+
+def _run(bind, job):
+    """job(conn) in one transaction, on an Engine or an already open Connection"""
+    if isinstance(bind, Connection):
+        return job(bind)
+    with bind.begin() as conn:
+        return job(conn)
+
+
+def list_partitions(bind=None) -> List[date]:
+    """Days that have their own partition, oldest first. Empty when not partitioned."""
+    bind = bind or engine
+    if not is_partitioned(bind):
+        return []
+
+    rows = _run(bind, lambda conn: conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table"
+    ), {"table": TABLE}).scalars().all())
+    return sorted(day for day in map(_day_of, rows) if day is not None)
+
+
+def ensure_journey_events(
+        days_ahead: int = JOURNEY_EVENT_PARTITION_DAYS_AHEAD,
+        start_days_ago: int = 0,
+        bind=None) -> List[date]:
+    """
+    Create the table if it's missing and, on postgres, the day partitions from today - start_days_ago
+    to today + days_ahead. Safe to call repeatedly (startup + the periodic job). Returns the days created.
+    """
+    bind = bind or engine
+    Base.metadata.create_all(bind, tables=[JourneyEvent.__table__])
+    if not is_partitioned(bind):
+        return []
+
+    today = datetime.now(timezone.utc).date()
+    existing = set(list_partitions(bind))
+    created = []
+
+    _run(bind, lambda conn: conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT")))
+
+    for offset in range(-start_days_ago, days_ahead + 1):
+        day = today + timedelta(days=offset)
+        if day in existing:
+            continue
+        try:
+            _run(bind, lambda conn: conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(day)} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')")))
+            created.append(day)
+        except Exception as e:
+            # rows for that day already landed in the default partition - they stay there
+            # (still read and dropped fine), the next day gets its own partition as usual
+            logger.error(f"Could not create {partition_name(day)}: {e}")
+
+    if created:
+        logger.info(f"Created journey_events partitions: {', '.join(d.isoformat() for d in created)}")
+    return created
+
+
+def drop_events_before(day: date, bind=None) -> int:
+    """
+    Everything with ts before `day` goes.
+    Partitioned: each whole day partition is a DROP TABLE, whatever is old in the default
+    partition gets deleted. Returns partitions dropped.
+    Not partitioned: one DELETE. Returns rows deleted.
+    """
+    bind = bind or engine
+    cutoff = datetime.combine(day, time.min)
+
+    if not is_partitioned(bind):
+        return _run(bind, lambda conn: conn.execute(delete(JourneyEvent).where(JourneyEvent.ts < cutoff)).rowcount)
+
+    old = [d for d in list_partitions(bind) if d < day]
+
+    def drop(conn):
+        for d in old:
+            conn.execute(text(f"DROP TABLE IF EXISTS {partition_name(d)}"))
+        conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE ts < :cutoff"), {"cutoff": cutoff})
+
+    _run(bind, drop)
+    if old:
+        logger.info(f"Dropped journey_events partitions before {day.isoformat()}: {len(old)}")
+    return len(old)
@@ -0,0 +1,238 @@
+# services/journeyService/group_commit.py
+# optional group commit for journey events (EVENT_GROUP_COMMIT=1)
+# request threads queue (journey_id, event) and wait on a future, one writer thread takes
+# whatever is queued (up to max_batch, waiting at most max_wait_ms for more), applies
+# the events with the same conditional UPDATEs as the direct path, and commits them together
+# → one transaction / one fsync per batch instead of per tap
+
+import asyncio
+import os
+import queue
+import threading
+import time as _time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import List, NamedTuple, Optional, Union
+from uuid import UUID
+
+from fastapi import HTTPException
+
+from app.models.Database import SessionLocal
+from app.models.Journey import ACTIVE_STATUSES, Journey
+from app.schemas.journey import JourneyEventType
+from app.Services.journeyService.eventHandler import JourneyEventHandler, TRANSITIONS
+from app.Services.Prediction.arrival_stats import record_arrival
+from app.Services.stopService.trip_rollups import record_finish
+from app.utils.logger.logger import get_logger
+
+logger = get_logger(__name__)
+
+EVENT_GROUP_COMMIT = os.getenv("EVENT_GROUP_COMMIT", "0").lower() in ("1", "true", "yes")
+EVENT_GROUP_COMMIT_MAX_BATCH = int(os.getenv("EVENT_GROUP_COMMIT_MAX_BATCH", "64"))
+EVENT_GROUP_COMMIT_WAIT_MS = float(os.getenv("EVENT_GROUP_COMMIT_WAIT_MS", "2"))
+# how long a request waits on its batch before giving up with a 503
+EVENT_GROUP_COMMIT_TIMEOUT_SECONDS = float(os.getenv("EVENT_GROUP_COMMIT_TIMEOUT_SECONDS", "10"))
+
+_STOP = object()
+
+
+class _Pending(NamedTuple):
+    journey_id: UUID
+    event_type: str
+    future: Future
+
+
+class GroupCommitWriter:
+    """
+    Each caller gets its own outcome: the updated Journey, the 404/409 its transition
+    check raised, or the DB error for its own event. If a batch commit fails the batch
+    is rolled back and replayed one event per transaction, so one bad row only fails its own caller.
+    """
+
+    def __init__(self, max_batch: int = EVENT_GROUP_COMMIT_MAX_BATCH, max_wait_ms: float = EVENT_GROUP_COMMIT_WAIT_MS):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+        self.batches = 0
+        self.events = 0
+        self.rejected = 0
+        self.replayed_batches = 0
+        self.largest_batch = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name="event-group-commit", daemon=True)
+        self._thread.start()
+        logger.info(f"Event group commit on: batches of up to {self.max_batch}, {self.max_wait * 1000:.1f}ms wait")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Whatever is already queued still gets written"""
+        if not self.running:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, journey_id: UUID, event_type: str) -> Future:
+        future = Future()
+        self._queue.put(_Pending(journey_id, event_type, future))
+        return future
+
+    # on timeout the queued event is cancelled before the 503 goes out (_flush skips cancelled ones),
+    # so a 503 always means "not written" and a retry can't 409 on an event that landed anyway.
+    # if the writer already took it, cancel() fails and the caller waits for that batch instead
+
+    def add_event(self, journey_id: UUID, event_type: str) -> Journey:
+        """Same contract as JourneyEventHandler.add_event, for the sync router"""
+        _supported(event_type)
+        future = self.submit(journey_id, event_type)
+        try:
+            journey = future.result(EVENT_GROUP_COMMIT_TIMEOUT_SECONDS)
+        except FutureTimeout:
+            if future.cancel():
+                raise HTTPException(503, "Event queue is backed up, try again in a moment")
+            journey = future.result()
+
+        JourneyEventHandler._after_commit(journey, event_type)
+        return journey
+
+    async def add_event_async(self, journey_id: UUID, event_type: str) -> Journey:
+        _supported(event_type)
+        future = self.submit(journey_id, event_type)
+        waiter = asyncio.wrap_future(future)
+        try:
+            # shield: a timeout must not cancel the waiter, that would cancel the event whatever state it's in
+            journey = await asyncio.wait_for(asyncio.shield(waiter), EVENT_GROUP_COMMIT_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            if future.cancel():
+                raise HTTPException(503, "Event queue is backed up, try again in a moment")
+            journey = await waiter
+
+        JourneyEventHandler._after_commit(journey, event_type)
+        return journey
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+
+            batch = [first]
+            deadline = _time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - _time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+
+        # stop() was called - anything that slipped in behind the sentinel
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        if leftover:
+            self._flush(leftover)
+
+    def _flush(self, batch: List[_Pending]) -> None:
+        batch = [p for p in batch if p.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        try:
+            outcomes = self._write(batch)
+        except Exception as e:
+            logger.warning(f"Group commit of {len(batch)} events failed ({e}), replaying one by one")
+            self.replayed_batches += 1
+            outcomes = []
+            for pending in batch:
+                try:
+                    outcomes.extend(self._write([pending]))
+                except Exception as single_error:
+                    outcomes.append(single_error)
+
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        for pending, outcome in zip(batch, outcomes):
+            if isinstance(outcome, BaseException):
+                self.rejected += 1
+                pending.future.set_exception(outcome)
+            else:
+                self.events += 1
+                pending.future.set_result(outcome)
+
+    def _write(self, batch: List[_Pending]) -> List[Union[Journey, BaseException]]:
+        """One transaction. Transition failures are per event outcomes, DB errors raise for the whole batch."""
+        db = SessionLocal()
+        try:
+            outcomes: List[Union[Journey, BaseException]] = []
+            for pending in batch:
+                # same conditional UPDATE ... RETURNING as the direct path. inside one transaction a
+                # second event for the same journey sees the first one's status
+                journey = db.execute(
+                    JourneyEventHandler._transition_stmt(pending.journey_id, pending.event_type)
+                ).scalars().first()
+                if journey is None:
+                    row = db.execute(JourneyEventHandler._status_stmt(pending.journey_id)).first()
+                    try:
+                        JourneyEventHandler._missed(pending.journey_id, pending.event_type, row)
+                    except HTTPException as e:
+                        outcomes.append(e)
+                    continue
+
+                JourneyEventHandler._log(db, journey, pending.event_type)
+                if pending.event_type not in ACTIVE_STATUSES:
+                    record_finish(db, journey)
+                if pending.event_type == JourneyEventType.EVENT_TYPE_ARRIVED:
+                    record_arrival(db, journey.route_id, journey.end_stop_id, journey.start_time)
+                # each caller keeps its own snapshot, unaffected by later events or the commit
+                db.expunge(journey)
+                outcomes.append(journey)
+
+            db.commit()
+            return outcomes
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "events": self.events,
+            "rejected": self.rejected,
+            "replayed_batches": self.replayed_batches,
+            "largest_batch": self.largest_batch,
+            "avg_batch": round((self.events + self.rejected) / self.batches, 2) if self.batches else None,
+        }
+
+
+def _supported(event_type: str) -> None:
+    if event_type not in TRANSITIONS:
+        logger.warning(f"Unsupported event type received: {event_type}")
+        raise HTTPException(400, f"Unsupported event type: {event_type}")
+
+
+group_writer = GroupCommitWriter()
@@ -3,24 +3,77 @@
 # Still a bit scrappy but works in prod
 
 from uuid import uuid4, UUID
+from typing import TYPE_CHECKING
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone, timedelta
-from pathlib import Path
 
 from app.models.Route import Route, Stop
-from app.models.Journey import Journey
+from app.models.Journey import Journey, active_filter
 from app.schemas.journey import StartJourney, JourneyEventType
 
 # Grab the timetable helper we actually have
-from app.utils.fetch_time import get_closest_scheduled_time_to_now
+from app.utils.fetch_time import TIMETABLE_SOURCE, get_closest_scheduled_time_to_now
 
-from app.Services.Prediction.service import get_prediction
+from app.Services.Prediction.service import get_prediction, get_prediction_async
+from app.Services.journeyService.event_log import record_event
+from app.Services.stopService.trip_rollups import record_start, record_start_async
 
 
 class JourneyService:
     """Service for creating and querying journeys."""
 
+    @staticmethod
+    def _requested_start(data: StartJourney) -> datetime:
+        # starting point time. User input or now
+        planned = data.planned_start_time or datetime.now(timezone.utc)
+        if planned.tzinfo is None:
+            planned = planned.replace(tzinfo=timezone.utc)
+        return planned
+
+    @staticmethod
+    def _snap_to_timetable(planned: datetime, scheduled_time, is_tomorrow: bool) -> tuple[datetime, str]:
+        """Push the start to the timetable time if that's later"""
+        official_start_str = planned.isoformat()
+
+        if scheduled_time:
+            sched_dt = datetime.combine(planned.date(), scheduled_time, tzinfo=timezone.utc)
+            if is_tomorrow:
+                sched_dt += timedelta(days=1)
+
+            if sched_dt > planned:
+                planned = sched_dt
+                official_start_str = planned.isoformat()
+                # print(f"Used timetable time instead: {planned.strftime('%H:%M')}")
+            # else:
+            #     print("Timetable time already passed, keeping user time")
+
+        return planned, official_start_str
+
+    @staticmethod
+    def _new_journey(data: StartJourney, route: Route, planned: datetime, official_start_str: str, predicted_arrival) -> Journey:
+        return Journey(
+            id=str(uuid4()),
+            route_id=data.route_id,
+            start_stop_id=data.start_stop_id,
+            end_stop_id=data.end_stop_id,
+            planned_start_time=planned,
+            start_time=None,
+            status=JourneyEventType.EVENT_TYPE_STARTED,
+            created_at=datetime.now(timezone.utc),
+            predicted_status="PENDING",  # will get updated later hopefully
+            predicted_arrival=predicted_arrival,
+            official_start_time=official_start_str,
+            official_end_time=(
+                route.official_timetable.get("end_time")
+                if hasattr(route, "official_timetable") and route.official_timetable
+                else None
+            ),
+        )
+
     @staticmethod
     def start_journey(data: StartJourney, db: Session) -> Journey:
         """Start off a new journey, try to get real timetable time, predict arrival based on recent journey data and events."""
@@ -41,38 +94,17 @@ class JourneyService:
             if not end_stop:
                 raise HTTPException(404, detail=f"End stop {data.end_stop_id} not found")
 
-        # starting point time. User input or now
-        planned = data.planned_start_time or datetime.now(timezone.utc)
-        if planned.tzinfo is None:
-            planned = planned.replace(tzinfo=timezone.utc)
-
-        official_start_str = planned.isoformat()
+        planned = JourneyService._requested_start(data)
 
         # Try to get actual next bus time from CIF
-        scheduled_time = None
-        is_tomorrow = False
-        minutes_until = None
-
-        cif_path = Path("app/data/MPH_Metro_5_Jan_2026.cif")
-        if cif_path.exists():
-            # print("Found CIF - checking scheduled time...")
-            scheduled_time, minutes_until, is_tomorrow = get_closest_scheduled_time_to_now(
-                route_id=data.route_id,
-                stop_id=data.start_stop_id,
-                reference_time=planned,
-            )
-
-            if scheduled_time:
-                sched_dt = datetime.combine(planned.date(), scheduled_time, tzinfo=timezone.utc)
-                if is_tomorrow:
-                    sched_dt += timedelta(days=1)
-
-                if sched_dt > planned:
-                    planned = sched_dt
-                    official_start_str = planned.isoformat()
-                    # print(f"Used timetable time instead: {planned.strftime('%H:%M')}")
-                # else:
-                #     print("Timetable time already passed, keeping user time")
+        # index is built at startup, returns (None, None, False) if there's no timetable loaded
+        scheduled_time, minutes_until, is_tomorrow = get_closest_scheduled_time_to_now(
+            route_id=data.route_id,
+            stop_id=data.start_stop_id,
+            reference_time=planned,
+            db=db,
+        )
+        planned, official_start_str = JourneyService._snap_to_timetable(planned, scheduled_time, is_tomorrow)
 
         # Get prediction, pass what we have
         predicted_arrival, confidence = get_prediction(
@@ -82,32 +114,57 @@ class JourneyService:
             static_time=scheduled_time )
 
         # Add the journey
-        journey = Journey(
-            id=str(uuid4()),
-            route_id=data.route_id,
-            start_stop_id=data.start_stop_id,
-            end_stop_id=data.end_stop_id,
-            planned_start_time=planned,
-            start_time=None,
-            status=JourneyEventType.EVENT_TYPE_STARTED,
-            created_at=datetime.now(timezone.utc),
-            predicted_status="PENDING",  # will get updated later hopefully
-            predicted_arrival=predicted_arrival,
-            official_start_time=official_start_str,
-            official_end_time=(
-                route.official_timetable.get("end_time")
-                if hasattr(route, "official_timetable") and route.official_timetable
-                else None
-            ),
-        )
+        journey = JourneyService._new_journey(data, route, planned, official_start_str, predicted_arrival)
 
         db.add(journey)
+        record_event(db, journey, JourneyEventType.EVENT_TYPE_STARTED, journey.created_at)
+        record_start(db, journey)
         db.commit()
         db.refresh(journey)
 
         # print(f"New journey {journey.id} started - predicted at {predicted_arrival}")
         return journey
 
+    @staticmethod
+    async def start_journey_async(data: StartJourney, db: "AsyncSession") -> Journey:
+        """start_journey on an AsyncSession (DB_MODE=async)"""
+        route = await db.get(Route, data.route_id)
+        if not route:
+            raise HTTPException(404, detail=f"Route {data.route_id} not found")
+
+        if not await db.get(Stop, data.start_stop_id):
+            raise HTTPException(404, detail=f"Start stop {data.start_stop_id} not found")
+
+        if data.end_stop_id and not await db.get(Stop, data.end_stop_id):
+            raise HTTPException(404, detail=f"End stop {data.end_stop_id} not found")
+
+        planned = JourneyService._requested_start(data)
+
+        if TIMETABLE_SOURCE == "db":
+            # timetable queries are sync code, run them on the async connection
+            scheduled_time, _, is_tomorrow = await db.run_sync(
+                lambda session: get_closest_scheduled_time_to_now(
+                    data.route_id, data.start_stop_id, planned, db=session))
+        else:
+            scheduled_time, _, is_tomorrow = get_closest_scheduled_time_to_now(
+                data.route_id, data.start_stop_id, planned)
+        planned, official_start_str = JourneyService._snap_to_timetable(planned, scheduled_time, is_tomorrow)
+
+        predicted_arrival, confidence = await get_prediction_async(
+            db=db,
+            route_id=data.route_id,
+            stop_id=data.end_stop_id,
+            static_time=scheduled_time)
+
+        journey = JourneyService._new_journey(data, route, planned, official_start_str, predicted_arrival)
+
+        db.add(journey)
+        record_event(db, journey, JourneyEventType.EVENT_TYPE_STARTED, journey.created_at)
+        await record_start_async(db, journey)
+        await db.commit()
+        await db.refresh(journey)
+        return journey
+
     @staticmethod
     def get_active_journey(journey_id: UUID, db: Session) -> Journey:
         """Find a journey that's still going (no end time)."""
@@ -115,11 +172,7 @@ class JourneyService:
             db.query(Journey)
             .filter(
                 Journey.id == journey_id,
-                Journey.status.in_([
-                    JourneyEventType.EVENT_TYPE_STARTED,
-                    JourneyEventType.EVENT_TYPE_DELAYED,
-                    JourneyEventType.EVENT_TYPE_ARRIVED,
-                ]),
+                active_filter(),
                 Journey.end_time.is_(None),
             )
             .one_or_none()
@@ -0,0 +1,124 @@
+# services/journeyService/reaper.py
+# journeys people start and never finish would sit in STARTED/DELAYED/ARRIVED forever,
+# so every few minutes anything in flight for longer than its route could plausibly take goes to EXPIRED.
+# route limit = slack for waiting at the stop + factor x end to end ride time from the segment matrix
+# (segments.py), JOURNEY_EXPIRY_DEFAULT_MINUTES for routes without one. Nothing is expired before the
+# matrices are first built, or a long route could be cut short by the default right after startup.
+# each batch is one conditional UPDATE ... RETURNING, so a STOP_REACHED racing the reaper still wins
+# or gets a clean 409, and it's safe with every worker running it
+
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select, update
+
+from app.models.Database import SessionLocal, engine
+from app.models.Journey import Journey, active_filter
+from app.schemas.journey import JourneyEventType
+from app.Services.journeyService.event_log import record_event
+from app.Services.Prediction.segments import MAX_JOURNEY_MIN, get_segment_matrix, longest_route_minutes, segment_matrices_built
+from app.Services.stopService.trip_rollups import record_finishes
+from app.utils.logger.logger import get_logger
+
+logger = get_logger(__name__)
+
+JOURNEY_REAPER_INTERVAL_SECONDS = int(os.getenv("JOURNEY_REAPER_INTERVAL_SECONDS", "300"))
+JOURNEY_REAPER_BATCH = int(os.getenv("JOURNEY_REAPER_BATCH", "1000"))
+JOURNEY_EXPIRY_DEFAULT_MINUTES = float(os.getenv("JOURNEY_EXPIRY_DEFAULT_MINUTES", "240"))
+JOURNEY_EXPIRY_SLACK_MINUTES = float(os.getenv("JOURNEY_EXPIRY_SLACK_MINUTES", "60"))
+JOURNEY_EXPIRY_FACTOR = float(os.getenv("JOURNEY_EXPIRY_FACTOR", "2.0"))
+
+_index_checked = False
+
+
+def max_journey_minutes(route_id: str) -> float:
+    matrix = get_segment_matrix(route_id)
+    if matrix is None or matrix.total_minutes <= 0:
+        return JOURNEY_EXPIRY_DEFAULT_MINUTES
+    return JOURNEY_EXPIRY_SLACK_MINUTES + JOURNEY_EXPIRY_FACTOR * matrix.total_minutes
+
+
+def longest_journey_minutes() -> float:
+    """
+    How long anything can stay in flight before the reaper expires it, over every route.
+    Outside the API (no matrices built) a route is taken to be MAX_JOURNEY_MIN end to end.
+    """
+    route = max(longest_route_minutes(), MAX_JOURNEY_MIN)
+    return max(JOURNEY_EXPIRY_DEFAULT_MINUTES, JOURNEY_EXPIRY_SLACK_MINUTES + JOURNEY_EXPIRY_FACTOR * route)
+
+
+def _ensure_active_index() -> None:
+    # journeys tables made before ix_journeys_active was in the model - create_all won't add it
+    global _index_checked
+    if _index_checked:
+        return
+    for index in Journey.__table__.indexes:
+        if index.name == "ix_journeys_active":
+            index.create(engine, checkfirst=True)
+    _index_checked = True
+
+
+def _expire_batch(db, route_id: str, cutoff: datetime, batch_size: int) -> int:
+    # the clock starts at the planned start, a journey planned for later today isn't stale yet
+    stale = (
+        select(Journey.id)
+        .where(
+            Journey.route_id == route_id,
+            active_filter(),
+            Journey.created_at < cutoff,
+            func.coalesce(Journey.planned_start_time, Journey.created_at) < cutoff,
+        )
+        .limit(batch_size)
+    )
+    expired = db.execute(
+        update(Journey)
+        .where(Journey.id.in_(stale), active_filter())
+        .values(status=JourneyEventType.EVENT_TYPE_EXPIRED)
+        .returning(Journey.id, Journey.route_id, Journey.end_stop_id, Journey.created_at)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    now = datetime.now(timezone.utc)
+    for journey in expired:
+        record_event(db, journey, JourneyEventType.EVENT_TYPE_EXPIRED, now)
+    record_finishes(db, expired)
+    db.commit()
+    return len(expired)
+
+
+def reap_stale_journeys(batch_size: int = JOURNEY_REAPER_BATCH) -> int:
+    """Background job. Returns how many journeys got expired."""
+    if not segment_matrices_built():
+        logger.info("Segment matrices not built yet, reaper skips this round")
+        return 0
+    _ensure_active_index()
+    now = datetime.now(timezone.utc)
+    total = 0
+
+    db = SessionLocal()
+    try:
+        # oldest in-flight journey per route, straight off the partial index
+        oldest = db.execute(
+            select(Journey.route_id, func.min(Journey.created_at))
+            .where(active_filter())
+            .group_by(Journey.route_id)
+        ).all()
+
+        for route_id, first_created in oldest:
+            cutoff = now - timedelta(minutes=max_journey_minutes(route_id))
+            if first_created.replace(tzinfo=first_created.tzinfo or timezone.utc) >= cutoff:
+                continue
+            while True:
+                expired = _expire_batch(db, route_id, cutoff, batch_size)
+                total += expired
+                if expired < batch_size:
+                    break
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    if total:
+        logger.info(f"Expired {total} stale journeys")
+    return total
@@ -0,0 +1,161 @@
+# services/journeyService/retention.py
+# hot/cold retention: journeys (and their journey_events) older than JOURNEY_RETENTION_DAYS go to
+# the Parquet archive (layout + readers in archive.py), then out of the hot tables.
+# only finished journeys (STOP_REACHED / EXPIRED) are moved - one still in flight stays until the reaper
+# gets to it, and the window can't be shorter than the reaper's longest journey limit.
+# journeys are written + deleted a batch at a time (short transactions, readers aren't blocked),
+# events are written in one pass and then dropped by day (see event_log.drop_events_before).
+# part names come from the batch's first key, so a run that died between writing and deleting
+# rewrites the same file on the next run instead of duplicating rows.
+
+import math
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List
+
+from sqlalchemy import Boolean, DateTime, Float, Integer, delete, select
+
+from app.models.Database import engine
+from app.models.Journey import Journey, active_filter
+from app.models.JourneyEvent import JourneyEvent
+from app.Services.journeyService.archive import JOURNEY_ARCHIVE_DIR, day_folder, pyarrow_or_raise
+from app.Services.journeyService.event_log import drop_events_before
+from app.Services.journeyService.reaper import JOURNEY_REAPER_INTERVAL_SECONDS, longest_journey_minutes
+from app.utils.logger.logger import get_logger
+
+logger = get_logger(__name__)
+
+JOURNEY_RETENTION_DAYS = int(os.getenv("JOURNEY_RETENTION_DAYS", "30"))
+JOURNEY_ARCHIVE_BATCH = int(os.getenv("JOURNEY_ARCHIVE_BATCH", "5000"))
+# 0 = the API doesn't run it, use app/Scripts/archive_journeys.py from cron instead
+JOURNEY_ARCHIVE_INTERVAL_SECONDS = int(os.getenv("JOURNEY_ARCHIVE_INTERVAL_SECONDS", "0"))
+
+TABLES = {
+    "journeys": Journey.__table__,
+    "journey_events": JourneyEvent.__table__,
+}
+
+
+def _arrow_schema(table):
+    pa = pyarrow_or_raise()
+    fields = []
+    for column in table.columns:
+        if isinstance(column.type, DateTime):
+            # naive datetimes in the db are UTC
+            kind = pa.timestamp("us", tz="UTC")
+        elif isinstance(column.type, Boolean):
+            kind = pa.bool_()
+        elif isinstance(column.type, Integer):
+            kind = pa.int64()
+        elif isinstance(column.type, Float):
+            kind = pa.float64()
+        else:
+            kind = pa.string()
+        fields.append(pa.field(column.name, kind))
+    return pa.schema(fields)
+
+
+def _day(value: datetime) -> date:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def _write_parts(kind: str, rows: List[dict], time_column: str, key: List[str], archive_dir: str) -> int:
+    """One part file per day the rows fall on. Returns bytes written."""
+    pa = pyarrow_or_raise()
+    schema = _arrow_schema(TABLES[kind])
+
+    by_day: Dict[date, List[dict]] = {}
+    for row in rows:
+        by_day.setdefault(_day(row[time_column]), []).append(row)
+
+    written = 0
+    for day, day_rows in by_day.items():
+        folder = day_folder(archive_dir, kind, day)
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / f"part-{'-'.join(str(day_rows[0][k]) for k in key)}.parquet"
+
+        # rename into place so a reader never sees half a file
+        tmp = path.with_name(path.name + ".tmp")
+        pa.parquet.write_table(pa.Table.from_pylist(day_rows, schema=schema), tmp, compression="zstd")
+        os.replace(tmp, path)
+        written += path.stat().st_size
+    return written
+
+
+def ensure_journey_indexes() -> None:
+    """
+    journeys tables made before an index was in the model don't have it and create_all won't add it.
+    Run at startup - the stop rollups read the partial hour off ix_journeys_created_at whether or
+    not this job is on.
+    """
+    for index in Journey.__table__.indexes:
+        index.create(engine, checkfirst=True)
+
+
+def min_retention_days() -> int:
+    """Whole days after which the reaper has expired anything left in flight (its longest limit + one round)"""
+    minutes = longest_journey_minutes() + JOURNEY_REAPER_INTERVAL_SECONDS / 60
+    return max(math.ceil(minutes / (24 * 60)), 1)
+
+
+def archive_journeys(cutoff: datetime, archive_dir: str = JOURNEY_ARCHIVE_DIR, batch_size: int = JOURNEY_ARCHIVE_BATCH) -> dict:
+    """Finished journeys created before cutoff: write a batch, delete that batch, repeat"""
+    ensure_journey_indexes()
+    table = Journey.__table__
+    moved, size = 0, 0
+
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(table)
+                .where(table.c.created_at < cutoff, ~active_filter())
+                .order_by(table.c.created_at, table.c.id)
+                .limit(batch_size)
+            ).mappings().all()
+        if not rows:
+            break
+
+        size += _write_parts("journeys", [dict(r) for r in rows], "created_at", ["id"], archive_dir)
+        with engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.id.in_([r["id"] for r in rows])))
+        moved += len(rows)
+
+    return {"rows": moved, "bytes": size}
+
+
+def archive_journey_events(before: date, archive_dir: str = JOURNEY_ARCHIVE_DIR, batch_size: int = JOURNEY_ARCHIVE_BATCH) -> dict:
+    """Events before the day `before`, streamed out in ts order, then dropped in one go"""
+    table = JourneyEvent.__table__
+    cutoff = datetime.combine(before, time.min)
+    moved, size = 0, 0
+
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(
+            select(table)
+            .where(table.c.ts < cutoff)
+            .order_by(table.c.ts, table.c.journey_id, table.c.type)
+        ).mappings()
+        for rows in result.partitions():
+            size += _write_parts("journey_events", [dict(r) for r in rows], "ts", ["journey_id", "type"], archive_dir)
+            moved += len(rows)
+
+    dropped = drop_events_before(before)
+    return {"rows": moved, "bytes": size, "dropped": dropped}
+
+
+def run_retention(retention_days: int = JOURNEY_RETENTION_DAYS, archive_dir: str = JOURNEY_ARCHIVE_DIR) -> dict:
+    """Everything from before the start of the day retention_days ago → archive_dir. Whole days only."""
+    if retention_days < min_retention_days():
+        raise ValueError(f"Retention of {retention_days} days is shorter than a journey can be in flight "
+                         f"(at least {min_retention_days()} days)")
+    before = datetime.now(timezone.utc).date() - timedelta(days=retention_days)
+    cutoff = datetime.combine(before, time.min, tzinfo=timezone.utc)
+
+    journeys = archive_journeys(cutoff, archive_dir)
+    events = archive_journey_events(before, archive_dir)
+    if journeys["rows"] or events["rows"]:
+        logger.info(f"Archived {journeys['rows']} journeys and {events['rows']} journey events "
+                    f"from before {before.isoformat()} to {archive_dir}")
+    return {"before": before.isoformat(), "journeys": journeys, "journey_events": events}
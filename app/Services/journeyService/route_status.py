@@ -0,0 +1,63 @@
+# services/journeyService/route_status.py
+# what GET /journeys/status/{route_id} answers - the live push (eventHandler._publish) is built
+# from the same function, so a subscriber gets what a poll right after the event would
+
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import desc
+from sqlalchemy.orm import Session
+
+from app.models.Journey import Journey
+from app.models.Route import Route
+from app.utils.singleflight import SingleFlight
+
+# riders watching the same route all hit these within the same second
+# identical requests share one DB run and the answer is reused for a couple of seconds
+STATUS_CACHE_SECONDS = min(5.0, max(1.0, float(os.getenv("STATUS_CACHE_SECONDS", "2"))))
+status_flight = SingleFlight(ttl_seconds=STATUS_CACHE_SECONDS)
+
+
+def minutes_left(pred: Optional[str]) -> Optional[int]:
+    if not pred:
+        return None
+    try:
+        dt = datetime.fromisoformat(pred.replace("Z", "+00:00"))
+        delta = dt - datetime.now(timezone.utc)
+        mins = int(delta.total_seconds() // 60)
+        return max(mins, 0) if mins > -60 else None  # don't show old arrivals
+    except:
+        return None
+
+
+def route_key(route_id: str) -> tuple:
+    return ("route", route_id)
+
+
+def route_status(route_id: str, db: Session) -> dict:
+    route = db.query(Route).filter(Route.id == route_id).first()
+    if not route:
+        raise HTTPException(404, "Route not found")
+
+    latest_j = (
+        db.query(Journey)
+        .filter(Journey.route_id == route_id)
+        .order_by(desc(Journey.created_at))
+        .first()
+    )
+
+    return {
+        "route_id": route_id,
+        "route_name": route.name or route_id,
+        "current_status": latest_j.status if latest_j else None,
+        "minutes_remaining": minutes_left(latest_j.predicted_arrival) if latest_j else None,
+        "last_seen": latest_j.created_at.isoformat() if latest_j else None,
+        "total_journeys_today": db.query(Journey)
+            .filter(
+                Journey.route_id == route_id,
+                Journey.created_at >= datetime.now(timezone.utc).date()
+            )
+            .count()
+    }
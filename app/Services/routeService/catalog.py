@@ -0,0 +1,160 @@
+# services/routeService/catalog.py
+# route list (GET /route/routes) and stops per route (GET /route/{id}/stops) as ready-to-send payloads
+# the route list is one window query for id, name, direction, first stop lat/lon
+# rebuilt after a commit touches routes / route_stops / stops, or after the TTL (ingest scripts run in other processes)
+
+import os
+from typing import List, Optional
+
+from pydantic import TypeAdapter
+from sqlalchemy import and_, event, func, select
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.Route import Route, RouteStop, Stop
+from app.schemas.route import RouteOut, StopsPerRoute
+from app.utils.http_cache import PayloadCache, StaticPayload, RESPONSE_CACHE_ENTRIES, RESPONSE_CACHE_MAX_BYTES
+from app.utils.logger.logger import get_logger
+
+logger = get_logger(__name__)
+
+ROUTE_CATALOG_TTL_SECONDS = float(os.getenv("ROUTE_CATALOG_TTL_SECONDS", "300"))
+
+_routes_json = TypeAdapter(List[RouteOut])
+_stops_json = TypeAdapter(List[StopsPerRoute])
+
+# bumped on every commit that touches routes / route_stops / stops; part of every cache key,
+# so a change makes the old payloads unreachable, and a build racing with it lands under the old key
+_version = 0
+
+route_payloads = PayloadCache(RESPONSE_CACHE_ENTRIES, RESPONSE_CACHE_MAX_BYTES, ROUTE_CATALOG_TTL_SECONDS)
+
+
+def invalidate_route_data() -> None:
+    global _version
+    _version += 1
+
+
+def route_data_version() -> int:
+    return _version
+
+
+def build_catalog(db: Session) -> Optional[bytes]:
+    """First stop per route = row_number() over the route's stops by sequence, all in one query"""
+    ranked = (
+        select(
+            RouteStop.route_id,
+            Stop.latitude,
+            Stop.longitude,
+            func.row_number().over(
+                partition_by=RouteStop.route_id,
+                order_by=RouteStop.sequence
+            ).label("rn"),
+        )
+        .join(Stop, Stop.id == RouteStop.stop_id)
+        .subquery()
+    )
+
+    rows = db.execute(
+        select(Route.id, Route.name, Route.direction, ranked.c.latitude, ranked.c.longitude)
+        .outerjoin(ranked, and_(ranked.c.route_id == Route.id, ranked.c.rn == 1))
+        .order_by(Route.name)
+    ).all()
+
+    if not rows:
+        return None
+
+    logger.info(f"Route catalog built: {len(rows)} routes")
+    return _routes_json.dump_json([
+        RouteOut(
+            id=row.id,
+            name=row.name,
+            direction=row.direction,
+            first_stop_lat=row.latitude,
+            first_stop_lon=row.longitude,
+        )
+        for row in rows
+    ])
+
+
+def build_route_stops(route_id: str, db: Session) -> Optional[bytes]:
+    """Ordered stops for one route, skipping the junk ones"""
+    stops = (
+        db.query(RouteStop)
+        .options(joinedload(RouteStop.stop))
+        .filter(RouteStop.route_id == route_id)
+        .order_by(RouteStop.sequence)
+        .all()
+    )
+
+    if not stops:
+        return None
+
+    result = []
+    seen_seq = set()
+
+    for rs in stops:
+        if not rs.stop:
+            logger.warning(f"Missing stop object - {rs.stop_id}")
+            continue
+
+        name = (rs.stop.name or "???").strip()
+
+        if not name or name == "Unknown Stop":
+            logger.warning(f"Skipping bad stop {rs.stop_id} name='{name}'")
+            continue
+
+        if rs.sequence in seen_seq:
+            logger.warning(f"Duplicate seq {rs.sequence} on {route_id} - keeping anyway")
+        seen_seq.add(rs.sequence)
+
+        result.append(StopsPerRoute(
+            id=rs.stop_id,
+            name=name,
+            sequence=rs.sequence,
+            direction=rs.direction or "N/A",
+            latitude=rs.stop.latitude,     # for frotend
+            longitude=rs.stop.longitude    # for frontend
+        ))
+
+    logger.debug(f"Route {route_id} - {len(result)} valid stops")
+    return _stops_json.dump_json(result)
+
+
+def catalog_payload(db: Session) -> Optional[StaticPayload]:
+    return route_payloads.get_or_build(("routes", _version), lambda: build_catalog(db))
+
+
+def route_stops_payload(route_id: str, db: Session) -> Optional[StaticPayload]:
+    return route_payloads.get_or_build(("stops", route_id, _version), lambda: build_route_stops(route_id, db))
+
+
+# ORM hooks - note the change on flush, act on commit so the rebuild sees the new rows
+_CATALOG_MODELS = (Route, RouteStop, Stop)
+
+
+@event.listens_for(Session, "after_flush")
+def _note_catalog_change(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, _CATALOG_MODELS):
+            session.info["route_catalog_dirty"] = True
+            return
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_bulk_catalog_change(state):
+    # session.execute(insert(RouteStop), [...]) style writes never show up in a flush
+    if state.is_insert or state.is_update or state.is_delete:
+        mapper = state.bind_mapper
+        if mapper is not None and mapper.class_ in _CATALOG_MODELS:
+            state.session.info["route_catalog_dirty"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_catalog(session):
+    if session.info.pop("route_catalog_dirty", False):
+        invalidate_route_data()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_catalog_change(session):
+    session.info.pop("route_catalog_dirty", None)
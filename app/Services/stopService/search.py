@@ -0,0 +1,223 @@
+# services/stopService/search.py
+# stop name search for GET /stops/search ("Custom House Square", "station st", "royal hosp")
+# built off the same stop list as the nearby grid, so it's rebuilt whenever that is
+# everything is integer arrays: names are interned once, a trigram's posting list is a slice of one int32 array
+
+import os
+import re
+import sys
+from bisect import bisect_left
+from threading import Lock
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.Services.stopService.spatial import StopIndex, get_stop_index, haversine_m
+from app.utils.logger.logger import get_logger
+
+logger = get_logger(__name__)
+
+# trigram similarity (0..1) - below this a name only shows up if a word/prefix rule matched it
+STOP_SEARCH_MIN_SIMILARITY = float(os.getenv("STOP_SEARCH_MIN_SIMILARITY", "0.3"))
+# with a point supplied a stop this far away scores half of the same match next door
+STOP_SEARCH_DISTANCE_SCALE_M = float(os.getenv("STOP_SEARCH_DISTANCE_SCALE_M", "5000"))
+# best N distinct names go on to distance ranking ("road" matches a third of the network otherwise)
+STOP_SEARCH_CANDIDATES = int(os.getenv("STOP_SEARCH_CANDIDATES", "200"))
+
+# on top of the similarity (0..1)
+WORD_PREFIX_BONUS = 0.5   # every query word starts a word of the name
+NAME_PREFIX_BONUS = 0.5   # the whole name starts with the query
+EXACT_BONUS = 1.0
+MAX_SCORE = 1.0 + WORD_PREFIX_BONUS + NAME_PREFIX_BONUS + EXACT_BONUS
+
+# same on both sides (index + query) so "Lisburn Rd" finds "Lisburn Road" and the other way round
+# "st" is left alone, it's Saint as often as Street (the word prefix rule covers "station st")
+_ABBREVIATIONS = {"rd": "road", "ave": "avenue", "av": "avenue", "sq": "square", "xrds": "crossroads"}
+
+_DROP = str.maketrans("", "", "'`")
+_SPLIT = re.compile(r"[^a-z0-9]+")
+_TOP = "\uffff"
+
+
+def normalize(text: str) -> str:
+    """'Templemore Ave [N'ards Road]' → 'templemore avenue nards road'"""
+    words = _SPLIT.split(text.lower().translate(_DROP))
+    return " ".join(_ABBREVIATIONS.get(w, w) for w in words if w)
+
+
+def _word_trigrams(word: str) -> Set[str]:
+    padded = "  " + word + " "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigrams(normalized: str) -> Set[str]:
+    """pg_trgm style, each word padded with two spaces in front and one behind"""
+    grams = set()
+    for word in normalized.split():
+        grams |= _word_trigrams(word)
+    return grams
+
+
+class StopSearchIndex:
+    """
+    names: distinct normalised names, sorted, so a name id range is a name prefix range.
+    gram_offsets / gram_postings: CSR, trigram slot → name ids.
+    words / word_names: every (word, name id), sorted, so a word prefix is a bisect range.
+    name_offsets / name_stops: CSR, name id → positions in the StopIndex arrays.
+    """
+
+    def __init__(self, stops: StopIndex):
+        self.stops = stops
+
+        normalized = [normalize(name or "") for name in stops.names]
+        self.names: List[str] = sorted({sys.intern(name) for name in normalized})
+        name_id = {name: i for i, name in enumerate(self.names)}
+
+        stop_name = np.array([name_id[name] for name in normalized], dtype=np.int32)
+        order = np.argsort(stop_name, kind="stable")
+        self.name_stops = order.astype(np.int32)
+        self.name_offsets = np.searchsorted(stop_name[order], np.arange(len(self.names) + 1)).astype(np.int32)
+
+        # "road" is in half the names, so trigram slots are worked out once per distinct word
+        self.grams: Dict[str, int] = {}
+        word_slots: Dict[str, Set[int]] = {}
+        gram_slots, gram_counts, words = [], [], []
+
+        for i, name in enumerate(self.names):
+            slots = set()
+            for word in name.split():
+                if word not in word_slots:
+                    word_slots[word] = {self.grams.setdefault(gram, len(self.grams)) for gram in _word_trigrams(word)}
+                slots |= word_slots[word]
+                words.append((sys.intern(word), i))
+            gram_slots.extend(slots)
+            gram_counts.append(len(slots))
+
+        self.gram_counts = np.array(gram_counts, dtype=np.int32)
+        gram_slots = np.array(gram_slots, dtype=np.int32)
+        gram_names = np.repeat(np.arange(len(self.names), dtype=np.int32), self.gram_counts)
+        order = np.lexsort((gram_names, gram_slots))
+        self.gram_postings = gram_names[order]
+        self.gram_offsets = np.searchsorted(gram_slots[order], np.arange(len(self.grams) + 1)).astype(np.int32)
+
+        words = sorted(set(words))
+        self.words: List[str] = [word for word, _ in words]
+        self.word_names = np.array([i for _, i in words], dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _scores(self, query: str) -> np.ndarray:
+        """Match quality for every distinct name, 0 to MAX_SCORE"""
+        n = len(self.names)
+
+        grams = trigrams(query)
+        offsets, postings = self.gram_offsets, self.gram_postings
+        slots = [self.grams[gram] for gram in grams if gram in self.grams]
+        if slots:
+            hits = np.concatenate([postings[offsets[s]:offsets[s + 1]] for s in slots])
+            shared = np.bincount(hits, minlength=n).astype(np.float32)
+            # half how much of the query the name covers (typos, partial words),
+            # half jaccard so a short name that is all query beats a long one that merely contains it
+            score = shared / (len(grams) + self.gram_counts - shared)
+            score += shared / len(grams)
+            score *= 0.5
+        else:
+            score = np.zeros(n, dtype=np.float32)
+
+        # names where every query word starts one of their words
+        matched = np.ones(n, dtype=bool)
+        for word in query.split():
+            lo, hi = bisect_left(self.words, word), bisect_left(self.words, word + _TOP)
+            has_word = np.zeros(n, dtype=bool)
+            has_word[self.word_names[lo:hi]] = True
+            matched &= has_word
+        score[matched] += WORD_PREFIX_BONUS
+
+        lo, hi = bisect_left(self.names, query), bisect_left(self.names, query + _TOP)
+        score[lo:hi] += NAME_PREFIX_BONUS
+        if lo < n and self.names[lo] == query:
+            score[lo] += EXACT_BONUS
+
+        return score
+
+    def search(
+            self,
+            q: str,
+            limit: int,
+            lat: Optional[float] = None,
+            lon: Optional[float] = None) -> List[dict]:
+        """Best matches first. With lat/lon a closer stop can outrank a slightly better name."""
+        query = normalize(q)
+        if not query:
+            return []
+
+        score = self._scores(query)
+        names = np.flatnonzero(score >= STOP_SEARCH_MIN_SIMILARITY)
+        if not len(names):
+            return []
+        # without a point the best `limit` names already hold the best `limit` stops
+        keep = STOP_SEARCH_CANDIDATES if lat is not None else limit
+        if len(names) > keep:
+            names = names[np.argpartition(-score[names], keep - 1)[:keep]]
+
+        # name ids → every stop carrying that name (both sides of the road usually)
+        starts = self.name_offsets[names]
+        counts = self.name_offsets[names + 1] - starts
+        firsts = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        idx = self.name_stops[firsts + np.arange(counts.sum())]
+        match = np.repeat(score[names], counts) / MAX_SCORE
+
+        dist = None
+        rank = match
+        if lat is not None and lon is not None:
+            dist = haversine_m(lat, lon, self.stops.lat[idx], self.stops.lon[idx])
+            rank = match / (1.0 + dist / STOP_SEARCH_DISTANCE_SCALE_M)
+
+        if len(idx) > limit:
+            top = np.argpartition(-rank, limit - 1)[:limit]
+        else:
+            top = np.arange(len(idx))
+        # ties (same name, no point) in a stable order
+        top = top[np.lexsort((idx[top], -rank[top]))]
+
+        results = []
+        for i in top.tolist():
+            stop = int(idx[i])
+            result = {
+                "id": self.stops.ids[stop],
+                "name": self.stops.names[stop],
+                "latitude": float(self.stops.lat[stop]),
+                "longitude": float(self.stops.lon[stop]),
+                "score": round(float(match[i]), 3),
+            }
+            if dist is not None:
+                result["distance_m"] = round(float(dist[i]), 1)
+            results.append(result)
+        return results
+
+
+_index: Optional[StopSearchIndex] = None
+_lock = Lock()
+
+
+def load_search_index(stops: StopIndex) -> StopSearchIndex:
+    global _index
+    index = StopSearchIndex(stops)
+    _index = index
+    logger.info(f"Stop search index: {len(index)} names, {len(index.grams)} trigrams, {len(index.gram_postings)} postings")
+    return index
+
+
+def get_search_index(db: Session) -> StopSearchIndex:
+    """Follows the stop grid - a rebuilt grid (route data changed / TTL) means a rebuilt search index"""
+    stops = get_stop_index(db)
+    index = _index
+    if index is not None and index.stops is stops:
+        return index
+
+    with _lock:
+        if _index is not None and _index.stops is stops:
+            return _index
+        return load_search_index(stops)
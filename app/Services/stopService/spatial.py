@@ -0,0 +1,170 @@
+# services/stopService/spatial.py
+# "stops near me" without shipping 17k stops to the client
+# uniform lat/lon grid over numpy arrays: a query only looks at the handful of cells
+# around the point, then haversine on those candidates and a partial sort for the k nearest
+
+import os
+import time as _time
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.Database import SessionLocal
+from app.models.Route import RouteStop, Stop
+from app.Services.routeService.catalog import route_data_version
+from app.utils.logger.logger import get_logger
+
+logger = get_logger(__name__)
+
+EARTH_RADIUS_M = 6371008.8
+METRES_PER_DEG_LAT = 111320.0
+
+# ~550m of latitude, a 500m search touches 9 to 12 cells
+CELL_DEG = float(os.getenv("STOP_GRID_CELL_DEG", "0.005"))
+STOP_INDEX_TTL_SECONDS = float(os.getenv("STOP_INDEX_TTL_SECONDS", "3600"))
+
+
+def haversine_m(lat1: float, lon1: float, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    lat1, lon1 = np.radians(lat1), np.radians(lon1)
+    lat2, lon2 = np.radians(lat2), np.radians(lon2)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class StopIndex:
+    """
+    Stops sorted by grid cell, so each cell is a contiguous slice of the arrays.
+    cells maps (row, col) → (start, end) into them.
+    """
+
+    def __init__(self, ids: List[str], names: List[str], lat: np.ndarray, lon: np.ndarray, on_route: np.ndarray):
+        rows = np.floor(lat / CELL_DEG).astype(np.int64)
+        cols = np.floor(lon / CELL_DEG).astype(np.int64)
+        order = np.lexsort((cols, rows))
+
+        self.ids = [ids[i] for i in order]
+        self.names = [names[i] for i in order]
+        self.lat = lat[order]
+        self.lon = lon[order]
+        self.on_route = on_route[order]
+
+        rows, cols = rows[order], cols[order]
+        self.cells: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        if len(order):
+            starts = np.flatnonzero(np.r_[True, (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])])
+            ends = np.r_[starts[1:], len(order)]
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                self.cells[(int(rows[start]), int(cols[start]))] = (start, end)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_db(cls, db: Session) -> "StopIndex":
+        stops = db.execute(select(Stop.id, Stop.name, Stop.latitude, Stop.longitude)).all()
+        served = set(db.execute(select(RouteStop.stop_id).distinct()).scalars())
+
+        return cls(
+            ids=[s.id for s in stops],
+            names=[s.name for s in stops],
+            lat=np.array([s.latitude for s in stops], dtype=np.float64),
+            lon=np.array([s.longitude for s in stops], dtype=np.float64),
+            on_route=np.array([s.id in served for s in stops], dtype=bool),
+        )
+
+    def _candidates(self, lat: float, lon: float, radius_m: float) -> np.ndarray:
+        dlat = radius_m / METRES_PER_DEG_LAT
+        dlon = radius_m / (METRES_PER_DEG_LAT * max(np.cos(np.radians(lat)), 1e-6))
+
+        row_lo, row_hi = int(np.floor((lat - dlat) / CELL_DEG)), int(np.floor((lat + dlat) / CELL_DEG))
+        col_lo, col_hi = int(np.floor((lon - dlon) / CELL_DEG)), int(np.floor((lon + dlon) / CELL_DEG))
+
+        slices = []
+        for row in range(row_lo, row_hi + 1):
+            for col in range(col_lo, col_hi + 1):
+                span = self.cells.get((row, col))
+                if span is not None:
+                    slices.append(np.arange(*span))
+        return np.concatenate(slices) if slices else np.empty(0, dtype=np.int64)
+
+    def nearby(
+            self,
+            lat: float,
+            lon: float,
+            radius_m: float,
+            limit: int,
+            on_route_only: bool = False) -> List[dict]:
+        """k nearest stops within radius_m, closest first"""
+        idx = self._candidates(lat, lon, radius_m)
+        if on_route_only and len(idx):
+            idx = idx[self.on_route[idx]]
+        if not len(idx):
+            return []
+
+        dist = haversine_m(lat, lon, self.lat[idx], self.lon[idx])
+        inside = dist <= radius_m
+        idx, dist = idx[inside], dist[inside]
+
+        if len(idx) > limit:
+            top = np.argpartition(dist, limit - 1)[:limit]
+            idx, dist = idx[top], dist[top]
+        order = np.argsort(dist)
+
+        return [
+            {
+                "id": self.ids[i],
+                "name": self.names[i],
+                "latitude": float(self.lat[i]),
+                "longitude": float(self.lon[i]),
+                "distance_m": round(float(d), 1),
+            }
+            for i, d in zip(idx[order].tolist(), dist[order].tolist())
+        ]
+
+
+_index: Optional[StopIndex] = None
+_built_version = -1
+_built_at = 0.0
+_lock = Lock()
+
+
+def load_stop_index(db: Optional[Session] = None) -> StopIndex:
+    """Startup + whenever stops/route_stops changed. Builds off to the side then swaps."""
+    global _index, _built_version, _built_at
+
+    own_session = db is None
+    if own_session:
+        db = SessionLocal()
+    try:
+        version = route_data_version()
+        started = _time.perf_counter()
+        index = StopIndex.from_db(db)
+    finally:
+        if own_session:
+            db.close()
+
+    _index, _built_version, _built_at = index, version, _time.monotonic()
+    logger.info(f"Stop index: {len(index)} stops in {len(index.cells)} cells, built in {_time.perf_counter() - started:.2f}s")
+    return index
+
+
+def _fresh() -> bool:
+    return (
+        _index is not None
+        and _built_version == route_data_version()
+        and _time.monotonic() - _built_at < STOP_INDEX_TTL_SECONDS
+    )
+
+
+def get_stop_index(db: Session) -> StopIndex:
+    """Rebuilt after a commit touches stops / route_stops (same hooks as the route catalog) or the TTL"""
+    if _fresh():
+        return _index
+
+    with _lock:
+        if _fresh():
+            return _index
+        return load_stop_index(db)
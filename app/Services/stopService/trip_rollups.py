@@ -0,0 +1,211 @@
+# services/stopService/trip_rollups.py
+# stop_trip_rollups: per stop, per hour a journey was started in, how many and how many are still active
+#   start                   → +1 total, +1 active for every stop on the route (one INSERT ... SELECT ... ON CONFLICT)
+#   STOP_REACHED / EXPIRED  → -1 active in the hour the journey was started in
+# written in the same transaction as the journey, so a rolled back start / event never counts.
+# a start counts against route_stops as they are then - after route_stops change the window has to be
+# rebuilt (injest_stops.py does) or journeys started before keep counting at their old stops.
+# /journeys/status/stop sums whole hours from here and counts the one partial hour at the
+# start of the window from journeys (an hour's worth of rows, on ix_journeys_created_at).
+
+import os
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Tuple, TYPE_CHECKING
+
+from sqlalchemy import DateTime, and_, case, delete, func, insert, inspect, literal, select, text, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.Database import SessionLocal, dialect_insert, engine
+from app.models.Journey import ACTIVE_STATUSES, Journey, active_filter
+from app.models.Route import RouteStop
+from app.models.StopTripRollup import StopTripRollup
+from app.utils.logger.logger import get_logger
+
+logger = get_logger(__name__)
+
+# the longest window /journeys/status/stop takes, older hours get pruned
+STOP_ROLLUP_HOURS = 168
+STOP_ROLLUP_PRUNE_SECONDS = int(os.getenv("STOP_ROLLUP_PRUNE_SECONDS", "3600"))
+# pg_advisory_xact_lock key, one worker creates + counts the table at startup
+_ENSURE_LOCK_KEY = 0x726F6C6C
+
+Key = Tuple[str, datetime]  # (stop_id, hour)
+
+
+def hour_bucket(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _start_stmt(route_id: str, hour: datetime):
+    upsert = dialect_insert()
+
+    # stop_id order so concurrent starts on overlapping routes lock rows in the same order
+    stops = (
+        select(RouteStop.stop_id, literal(hour, DateTime), literal(1), literal(1))
+        .where(RouteStop.route_id == route_id)
+        .order_by(RouteStop.stop_id)
+    )
+    stmt = upsert(StopTripRollup).from_select(["stop_id", "hour", "total", "active"], stops)
+    return stmt.on_conflict_do_update(
+        index_elements=["stop_id", "hour"],
+        set_={
+            "total": StopTripRollup.total + stmt.excluded.total,
+            "active": StopTripRollup.active + stmt.excluded.active,
+        },
+    )
+
+
+def _finish_stmt(route_id: str, hour: datetime, count: int = 1):
+    return (
+        update(StopTripRollup)
+        .where(
+            StopTripRollup.hour == hour,
+            StopTripRollup.stop_id.in_(select(RouteStop.stop_id).where(RouteStop.route_id == route_id)),
+        )
+        .values(active=StopTripRollup.active - count)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def record_start(db: Session, journey: Journey) -> None:
+    """Caller commits, same transaction as the new journey"""
+    db.execute(_start_stmt(journey.route_id, hour_bucket(journey.created_at)))
+
+
+async def record_start_async(db: "AsyncSession", journey: Journey) -> None:
+    await db.execute(_start_stmt(journey.route_id, hour_bucket(journey.created_at)))
+
+
+def record_finish(db: Session, journey: Journey) -> None:
+    """Journey left the active set (STOP_REACHED, EXPIRED). Caller commits."""
+    db.execute(_finish_stmt(journey.route_id, hour_bucket(journey.created_at)))
+
+
+async def record_finish_async(db: "AsyncSession", journey: Journey) -> None:
+    await db.execute(_finish_stmt(journey.route_id, hour_bucket(journey.created_at)))
+
+
+def record_finishes(db: Session, journeys: Iterable) -> None:
+    """Many at once (the reaper) - one UPDATE per route/hour rather than per journey"""
+    grouped = Counter((j.route_id, hour_bucket(j.created_at)) for j in journeys)
+    for (route_id, hour), count in sorted(grouped.items()):
+        db.execute(_finish_stmt(route_id, hour, count))
+
+
+def stop_trip_counts(db: Session, stop_id: str, since: datetime) -> Tuple[int, int]:
+    """(total, active) journeys through stop_id started at or after since"""
+    first_full = hour_bucket(since) + timedelta(hours=1)
+
+    total, active = db.execute(
+        select(func.coalesce(func.sum(StopTripRollup.total), 0), func.coalesce(func.sum(StopTripRollup.active), 0))
+        .where(StopTripRollup.stop_id == stop_id, StopTripRollup.hour >= first_full)
+    ).one()
+
+    # the partial hour the window starts in, straight from journeys
+    edge_total, edge_active = db.execute(
+        select(
+            func.count(Journey.id),
+            func.coalesce(func.sum(case((active_filter(), 1), else_=0)), 0),
+        )
+        .join(RouteStop, and_(RouteStop.route_id == Journey.route_id, RouteStop.stop_id == stop_id))
+        .where(Journey.created_at >= since, Journey.created_at < first_full)
+    ).one()
+
+    return int(total) + int(edge_total), int(active) + int(edge_active)
+
+
+def expected_rollups(db: Session, since: datetime) -> Dict[Key, Tuple[int, int]]:
+    """What the rollups should say for every hour from hour_bucket(since), counted from journeys"""
+    route_stops: Dict[str, list] = {}
+    for row in db.execute(select(RouteStop.route_id, RouteStop.stop_id)):
+        route_stops.setdefault(row.route_id, []).append(row.stop_id)
+
+    per_route: Counter = Counter()
+    per_route_active: Counter = Counter()
+    for row in db.execute(
+            select(Journey.route_id, Journey.created_at, Journey.status)
+            .where(Journey.created_at >= hour_bucket(since))):
+        key = (row.route_id, hour_bucket(row.created_at))
+        per_route[key] += 1
+        if row.status in ACTIVE_STATUSES:
+            per_route_active[key] += 1
+
+    expected: Dict[Key, Tuple[int, int]] = {}
+    for (route_id, hour), total in per_route.items():
+        for stop_id in route_stops.get(route_id, []):
+            t, a = expected.get((stop_id, hour), (0, 0))
+            expected[(stop_id, hour)] = (t + total, a + per_route_active[(route_id, hour)])
+    return expected
+
+
+def stored_rollups(db: Session, since: datetime) -> Dict[Key, Tuple[int, int]]:
+    rows = db.execute(select(StopTripRollup).where(StopTripRollup.hour >= hour_bucket(since))).scalars()
+    return {(r.stop_id, hour_bucket(r.hour)): (r.total, r.active) for r in rows}
+
+
+def _lock_rollups(db: Session) -> None:
+    """
+    Until the caller commits, starts and finishes wait on their upsert/update instead of landing
+    between the recount and the DELETE. On sqlite the DELETE itself takes the database's write lock.
+    """
+    if engine.dialect.name == "postgresql":
+        db.execute(text(f"LOCK TABLE {StopTripRollup.__tablename__} IN EXCLUSIVE MODE"))
+
+
+def rebuild_stop_rollups(db: Session, hours: int = STOP_ROLLUP_HOURS) -> int:
+    """
+    Recount the last `hours` from journeys and replace those rollups. Returns rows written.
+    Writers are locked out first so a journey is either in the recount or adds its own +1 after.
+    """
+    since = hour_bucket(datetime.now(timezone.utc) - timedelta(hours=hours))
+
+    _lock_rollups(db)
+    db.execute(delete(StopTripRollup).where(StopTripRollup.hour >= since))
+    expected = expected_rollups(db, since)
+    if expected:
+        db.execute(insert(StopTripRollup), [
+            {"stop_id": stop_id, "hour": hour, "total": total, "active": active}
+            for (stop_id, hour), (total, active) in expected.items()
+        ])
+    db.commit()
+    return len(expected)
+
+
+def ensure_stop_rollups() -> None:
+    """Startup: a brand new table gets the last week counted in, otherwise the counts would start from zero"""
+    if inspect(engine).has_table(StopTripRollup.__tablename__):
+        return
+
+    db = SessionLocal()
+    try:
+        if engine.dialect.name == "postgresql":
+            # workers starting together queue here, the first creates + counts in one transaction
+            # and the rest find the table once it commits
+            db.execute(select(func.pg_advisory_xact_lock(_ENSURE_LOCK_KEY)))
+        if inspect(db.connection()).has_table(StopTripRollup.__tablename__):
+            db.rollback()
+            return
+        try:
+            StopTripRollup.__table__.create(db.connection())
+        except OperationalError:
+            # sqlite: another worker created it since the check, and counts it in
+            db.rollback()
+            return
+        written = rebuild_stop_rollups(db)
+        logger.info(f"stop_trip_rollups created, {written} rows counted in from journeys")
+    finally:
+        db.close()
+
+
+def prune_stop_rollups() -> int:
+    """Background job - hours nobody can ask for any more"""
+    cutoff = hour_bucket(datetime.now(timezone.utc) - timedelta(hours=STOP_ROLLUP_HOURS + 1))
+    with engine.begin() as conn:
+        return conn.execute(delete(StopTripRollup).where(StopTripRollup.hour < cutoff)).rowcount
@@ -0,0 +1,60 @@
+"""Rate limits for the journey endpoints. The counting lives in utils/rate_limiter.py"""
+
+import math
+import os
+from contextlib import contextmanager
+from threading import Lock
+from uuid import UUID
+
+from fastapi import HTTPException, Request
+
+from app.utils.rate_limiter import RateLimit, RateLimiter, make_backend
+
+# dont want people spamming events and ruin database. one event per journey per cooldown
+JOURNEY_EVENT_COOLDOWN_SECONDS = float(os.getenv("JOURNEY_EVENT_COOLDOWN_SECONDS", "180"))
+# new journeys per client IP per minute
+JOURNEY_START_PER_MINUTE = int(os.getenv("JOURNEY_START_PER_MINUTE", "10"))
+
+journey_event_limit = RateLimit("journey_event", 1, JOURNEY_EVENT_COOLDOWN_SECONDS)
+journey_start_limit = RateLimit("journey_start", JOURNEY_START_PER_MINUTE, 60)
+
+_limiter = None
+_lock = Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Built on first use so importing the routers doesn't create the sqlite file / connect"""
+    global _limiter
+    if _limiter is None:
+        with _lock:
+            if _limiter is None:
+                _limiter = RateLimiter(make_backend())
+    return _limiter
+
+
+def _enforce(limit: RateLimit, key: str) -> None:
+    decision = get_rate_limiter().hit(limit, key)
+    if not decision.allowed:
+        secs_left = max(math.ceil(decision.retry_after), 1)
+        raise HTTPException(429, f"Chill for {secs_left} seconds please", headers={"Retry-After": str(secs_left)})
+
+
+@contextmanager
+def journey_event_cooldown(journey_id: UUID):
+    """
+    Not a dependency: a dependency runs before the body is validated, so a 422 would start the cooldown.
+    The handler enters this once the event is known to be well formed. The token goes back if the
+    block raises (404 unknown journey, 409 transition, DB error), only a recorded event counts.
+    """
+    key = str(journey_id)
+    _enforce(journey_event_limit, key)
+    try:
+        yield
+    except BaseException:
+        get_rate_limiter().refund(journey_event_limit, key)
+        raise
+
+
+def journey_start_rate_limit(request: Request) -> None:
+    # behind a proxy this is the proxy unless uvicorn runs with --proxy-headers
+    _enforce(journey_start_limit, request.client.host if request.client else "unknown")
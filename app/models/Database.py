@@ -22,6 +22,17 @@ SessionLocal = sessionmaker(
     bind= engine
     )
 
+def dialect_insert():
+    """insert() with on_conflict_do_update/do_nothing for the configured database"""
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif engine.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"No upsert for {engine.dialect.name}")
+    return insert
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -29,3 +40,50 @@ def get_db():
     finally:
         db.close()
 
+
+
+# async side - only built when DB_MODE=async (main.py), scripts keep using SessionLocal
+# needs an async driver: asyncpg for postgres, aiosqlite for sqlite
+DB_MODE = os.getenv("DB_MODE", "sync")
+
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+_async_engine = None
+_async_session_factory = None
+
+
+def async_database_url(url: str) -> str:
+    """postgresql://... → postgresql+asyncpg://... (ASYNC_DATABASE_URL wins if set)"""
+    explicit = os.getenv("ASYNC_DATABASE_URL")
+    if explicit:
+        return explicit
+    scheme, sep, rest = url.partition("://")
+    return _ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+def get_async_engine():
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        _async_engine = create_async_engine(async_database_url(DATABASE_URL), echo=True)
+        _async_session_factory = async_sessionmaker(
+            _async_engine,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+    return _async_engine
+
+
+def AsyncSessionLocal():
+    get_async_engine()
+    return _async_session_factory()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, LargeBinary, DateTime
+from app.models.Database import Base
+
+
+class HeadwayProfile(Base):
+    """
+    Typical headway / lateness per route/stop for every (weekday, 15 min) slot.
+    Each blob is a flat little-endian array of 7 * 96 slots, Monday 00:00 first.
+    """
+    __tablename__ = "headway_profiles"
+
+    route_id = Column(String(50), primary_key=True)
+    stop_id = Column(String(32), primary_key=True)
+
+    headway = Column(LargeBinary, nullable=False)   # float32 minutes between arrivals, NaN = no data
+    lateness = Column(LargeBinary, nullable=False)  # float32 minutes after planned time, NaN = no data
+    samples = Column(LargeBinary, nullable=False)   # uint16 arrivals seen in the slot
+    built_at = Column(DateTime, nullable=False)
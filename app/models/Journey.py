@@ -1,6 +1,10 @@
-from sqlalchemy import Column, String, ForeignKey, Integer, Float, DateTime, Boolean
+from sqlalchemy import Column, String, ForeignKey, Integer, Float, DateTime, Boolean, Index, bindparam, text
 from app.models.Database import Base
 
+# a journey in one of these is still in flight. Shared by the status counts, get_active_journey,
+# the transitions and the reaper (which moves stale ones to EXPIRED)
+ACTIVE_STATUSES = ("STARTED", "DELAYED", "ARRIVED")
+
 
 class Journey(Base):
 
@@ -24,4 +28,25 @@ class Journey(Base):
 
     # Track data source
     data_source = Column(String, nullable=False, default="user")  # "official" or "user"
-    is_synthetic = Column(Boolean, default=False)  # True for seeded data
\ No newline at end of file
+    is_synthetic = Column(Boolean, default=False)  # True for seeded data
+
+    __table_args__ = (
+        # recency filters (status, prediction) and the archive job walking old journeys in order
+        Index("ix_journeys_created_at", "created_at", "id"),
+        # only in-flight journeys, so it stays as small as what's actually on the road
+        Index(
+            "ix_journeys_active",
+            "route_id", "created_at",
+            postgresql_where=text(f"status IN {ACTIVE_STATUSES!r}"),
+            sqlite_where=text(f"status IN {ACTIVE_STATUSES!r}"),
+        ),
+    )
+
+
+def active_filter():
+    """
+    status IN ACTIVE_STATUSES with the values inlined rather than bound, otherwise sqlite
+    (and postgres generic plans) can't tell the query matches ix_journeys_active's WHERE
+    """
+    return Journey.status.in_(
+        bindparam("active_statuses", ACTIVE_STATUSES, expanding=True, literal_execute=True, unique=True))
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, String, DateTime, Index
+from app.models.Database import Base
+
+
+class JourneyEvent(Base):
+    """
+    Append-only log of journey events, one row per transition. Journey.status only has the latest.
+    On postgres the table is range partitioned by day on ts (see journeyService/event_log.py),
+    so old days go with a DROP TABLE instead of a DELETE.
+    """
+    __tablename__ = "journey_events"
+
+    # a journey goes through each event at most once (the transitions are conditional updates),
+    # ts is in the key because postgres wants the partition column in every unique index
+    journey_id = Column(String, primary_key=True)
+    type = Column(String(16), primary_key=True)
+    ts = Column(DateTime, primary_key=True)
+
+    # no FKs - partitions get dropped independently of journeys/stops
+    route_id = Column(String(50), nullable=False)
+    stop_id = Column(String(32), nullable=True)  # the journey's end stop, same key as the arrival ring
+
+    __table_args__ = (
+        {"postgresql_partition_by": "RANGE (ts)"},
+    )
+
+
+# "latest events at this stop" is a short backwards range scan on this.
+# type trails the key (rather than INCLUDE) so it's covering on sqlite too
+Index(
+    "ix_journey_events_stop_ts",
+    JourneyEvent.route_id, JourneyEvent.stop_id, JourneyEvent.ts.desc(), JourneyEvent.type,
+)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, JSON, DateTime
+from app.models.Database import Base
+
+
+class StopArrivalStats(Base):
+    """Last N crowd reported arrivals per route/stop so the prediction doesn't have to scan journeys"""
+    __tablename__ = "stop_arrival_stats"
+
+    route_id = Column(String(50), primary_key=True)
+    stop_id = Column(String(32), primary_key=True)
+
+    # epoch seconds, newest first, capped at ARRIVAL_RING_SIZE
+    arrivals = Column(JSON, nullable=False, default=list)
+    updated_at = Column(DateTime, nullable=True)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, DateTime, Integer
+from app.models.Database import Base
+
+
+class StopTripRollup(Base):
+    """
+    Journeys through a stop per UTC hour they were started in, so /journeys/status/stop sums
+    at most a week of rows instead of counting journeys x route_stops. Kept up to date by
+    start / finish / expire in the same transaction, see stopService/trip_rollups.py.
+    """
+    __tablename__ = "stop_trip_rollups"
+
+    stop_id = Column(String(32), primary_key=True)
+    hour = Column(DateTime, primary_key=True)  # start of the hour, UTC
+
+    total = Column(Integer, nullable=False, default=0)   # journeys started on a route serving the stop
+    active = Column(Integer, nullable=False, default=0)  # of those, still STARTED/DELAYED/ARRIVED
@@ -0,0 +1,44 @@
+from sqlalchemy import Column, String, ForeignKey, Integer, SmallInteger, Date, DateTime, Boolean, Index
+from app.models.Database import Base
+
+
+class TimetableVersion(Base):
+    """One row per timetable load. Only the active one is read, so a reload can fill a new version in the background and flip over in one update."""
+    __tablename__ = "timetable_versions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    source = Column(String, nullable=False)  # CIF file name
+    loaded_at = Column(DateTime, nullable=False)
+    row_count = Column(Integer, nullable=True)
+    is_active = Column(Boolean, nullable=False, default=False)
+
+
+class ScheduledStopTime(Base):
+    """Parsed CIF stop times, one row per weekday the departure runs on"""
+    __tablename__ = "scheduled_stop_times"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    timetable_version = Column(Integer, ForeignKey("timetable_versions.id"), nullable=False)
+
+    # no FKs to routes/stops - the CIF has routes and stops we haven't imported
+    stop_id = Column(String(32), nullable=False)
+    route_id = Column(String(50), nullable=False)
+    direction = Column(String(1), nullable=True)
+    weekday = Column(SmallInteger, nullable=False)  # 0 = Monday ... 6 = Sunday
+    departure_minute = Column(SmallInteger, nullable=False)  # minutes since midnight
+    valid_from = Column(Date, nullable=False)
+    valid_to = Column(Date, nullable=False)
+
+    __table_args__ = (
+        # "next departure" is a range scan on this, version last so it stays covering
+        Index(
+            "ix_scheduled_stop_times_next_departure",
+            "stop_id", "route_id", "weekday", "departure_minute", "timetable_version",
+        ),
+        # same without the route, for "any route at this stop" - the one above can't get at weekday then
+        Index(
+            "ix_scheduled_stop_times_stop_departure",
+            "stop_id", "weekday", "departure_minute", "timetable_version",
+        ),
+        Index("ix_scheduled_stop_times_version", "timetable_version"),
+    )
@@ -4,33 +4,28 @@ from datetime import datetime, timezone
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session, joinedload
 from app.models.Database import SessionLocal, engine, get_db  
+from app.dependencies.rate_limit import journey_event_cooldown, journey_start_rate_limit
 
 from app.models.Route import Route, Stop, RouteStop
 from app.schemas.route import StopsPerRoute, RouteOut
 from app.schemas.journey import StartJourney, AddJourneyEvent
 from app.Services.journeyService.journey_service import JourneyService
 from app.Services.journeyService.eventHandler import JourneyEventHandler
+from app.Services.journeyService.group_commit import group_writer
 from app.utils.logger.logger import get_logger
 
 logger = get_logger(__name__) # give name  
 
-COOLDOWN_SECONDS = 180  # 3 min cooldown. dont want people spamming events and ruin database. We have security on prod 
-
-# yeah this is not thread safe at all. Works for now, fix with redis or thread when it starts to hurt
-last_request_time: dict[UUID, datetime] = {}
-
 router = APIRouter(prefix="/journeys", tags=["Journey"])
 
-@router.post("/start")
-def start_journey(journey: StartJourney, db: Session = Depends(get_db)):
-    if not journey.start_stop_id or not journey.end_stop_id:
-        raise HTTPException(400, "Need both start and end stop to begin journey")
 
-    # business logic in service
-    new_j = JourneyService.start_journey(db=db, data=journey)
+def require_event(event: AddJourneyEvent) -> None:
+    """Shared with the async router (JourneyAsync.py). Runs before the cooldown so a bad request doesn't start it."""
+    if not event.event:
+        raise HTTPException(400, "What event? Need to tell me what happened")
 
-    logger.info(f"New journey started: {new_j.id} route={journey.route_id}")
 
+def start_response(new_j) -> dict:
     return {
         "journey_id": new_j.id,
         "route_id": new_j.route_id,
@@ -44,34 +39,7 @@ def start_journey(journey: StartJourney, db: Session = Depends(get_db)):
     }
 
 
-@router.post("/{journey_id}/event")
-def add_journey_event(journey_id: UUID, event: AddJourneyEvent, db: Session = Depends(get_db)):
-    now = datetime.now(timezone.utc)
-
-    # super basic anti-spam, we have security in prod
-    if journey_id in last_request_time:
-        diff = (now - last_request_time[journey_id]).total_seconds()
-        if diff < COOLDOWN_SECONDS:
-            secs_left = int(COOLDOWN_SECONDS - diff)
-            raise HTTPException(429, f"Chill for {secs_left} seconds please")
-
-    if not event.event:
-        raise HTTPException(400, "What event? Need to tell me what happened")
-
-    last_request_time[journey_id] = now
-
-    updated = JourneyEventHandler.add_event(
-        event_type=event.event,
-        db=db,
-        journey_id=journey_id
-    )
-
-    if not updated:
-        logger.warning(f"Couldn't find active journey {journey_id}")
-        raise HTTPException(404, "Journey not found or already finished")
-
-    logger.info(f"Added {event.event} to journey {journey_id}")
-
+def event_response(updated, event: AddJourneyEvent) -> dict:
     return {
         "journey_id": str(updated.id),
         "current_status": updated.status,
@@ -82,4 +50,41 @@ def add_journey_event(journey_id: UUID, event: AddJourneyEvent, db: Session = De
     }
 
 
+@router.post("/start", dependencies=[Depends(journey_start_rate_limit)])
+def start_journey(journey: StartJourney, db: Session = Depends(get_db)):
+    if not journey.start_stop_id or not journey.end_stop_id:
+        raise HTTPException(400, "Need both start and end stop to begin journey")
+
+    # business logic in service
+    new_j = JourneyService.start_journey(db=db, data=journey)
+
+    logger.info(f"New journey started: {new_j.id} route={journey.route_id}")
+
+    return start_response(new_j)
+
+
+@router.post("/{journey_id}/event")
+def add_journey_event(journey_id: UUID, event: AddJourneyEvent, db: Session = Depends(get_db)):
+    require_event(event)
+
+    with journey_event_cooldown(journey_id):
+        # EVENT_GROUP_COMMIT=1 → queued and committed together with whatever else arrived in the same few ms
+        if group_writer.running:
+            updated = group_writer.add_event(journey_id, event.event)
+        else:
+            updated = JourneyEventHandler.add_event(
+                event_type=event.event,
+                db=db,
+                journey_id=journey_id
+            )
+
+        if not updated:
+            logger.warning(f"Couldn't find active journey {journey_id}")
+            raise HTTPException(404, "Journey not found or already finished")
+
+    logger.info(f"Added {event.event} to journey {journey_id}")
+
+    return event_response(updated, event)
+
+
 __all__ = ["route_router", "journey_router"]
\ No newline at end of file
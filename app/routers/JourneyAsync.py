@@ -0,0 +1,48 @@
+# same endpoints as Journey.py on an AsyncSession, mounted instead of it when DB_MODE=async
+# handlers run on the event loop instead of queueing for the 40 threadpool slots
+
+from uuid import UUID
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.dependencies.rate_limit import journey_event_cooldown, journey_start_rate_limit
+from app.models.Database import get_async_db
+from app.routers.Journey import require_event, start_response, event_response
+from app.schemas.journey import StartJourney, AddJourneyEvent
+from app.Services.journeyService.journey_service import JourneyService
+from app.Services.journeyService.eventHandler import JourneyEventHandler
+from app.Services.journeyService.group_commit import group_writer
+from app.utils.logger.logger import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter(prefix="/journeys", tags=["Journey"])
+
+
+@router.post("/start", dependencies=[Depends(journey_start_rate_limit)])
+async def start_journey(journey: StartJourney, db: AsyncSession = Depends(get_async_db)):
+    if not journey.start_stop_id or not journey.end_stop_id:
+        raise HTTPException(400, "Need both start and end stop to begin journey")
+
+    new_j = await JourneyService.start_journey_async(db=db, data=journey)
+
+    logger.info(f"New journey started: {new_j.id} route={journey.route_id}")
+    return start_response(new_j)
+
+
+@router.post("/{journey_id}/event")
+async def add_journey_event(journey_id: UUID, event: AddJourneyEvent, db: AsyncSession = Depends(get_async_db)):
+    require_event(event)
+
+    with journey_event_cooldown(journey_id):
+        if group_writer.running:
+            updated = await group_writer.add_event_async(journey_id, event.event)
+        else:
+            updated = await JourneyEventHandler.add_event_async(
+                event_type=event.event,
+                db=db,
+                journey_id=journey_id
+            )
+
+    logger.info(f"Added {event.event} to journey {journey_id}")
+    return event_response(updated, event)
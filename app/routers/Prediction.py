@@ -0,0 +1,23 @@
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.orm import Session
+
+from app.models.Database import get_db
+from app.Services.Prediction.service import get_route_predictions
+
+from app.utils.logger import logger
+
+router = APIRouter(prefix="/predictions", tags=["Predictions"])
+
+
+@router.get("/route/{route_id}")
+def route_predictions(route_id: str, db: Session = Depends(get_db)):
+    """ETA + confidence for every stop on the route, for the map view. One call instead of one per stop."""
+    predictions = get_route_predictions(route_id=route_id, db=db)
+
+    if not predictions:
+        raise HTTPException(404, f"No stops for route '{route_id}'")
+
+    return {
+        "route_id": route_id,
+        "stops": predictions,
+    }
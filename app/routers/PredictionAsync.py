@@ -0,0 +1,23 @@
+# Prediction.py on an AsyncSession, mounted instead of it when DB_MODE=async
+
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.Database import get_async_db
+from app.Services.Prediction.service import get_route_predictions_async
+
+router = APIRouter(prefix="/predictions", tags=["Predictions"])
+
+
+@router.get("/route/{route_id}")
+async def route_predictions(route_id: str, db: AsyncSession = Depends(get_async_db)):
+    """ETA + confidence for every stop on the route, for the map view. One call instead of one per stop."""
+    predictions = await get_route_predictions_async(route_id=route_id, db=db)
+
+    if not predictions:
+        raise HTTPException(404, f"No stops for route '{route_id}'")
+
+    return {
+        "route_id": route_id,
+        "stops": predictions,
+    }
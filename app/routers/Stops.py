@@ -0,0 +1,50 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.models.Database import get_db
+from app.Services.stopService.search import get_search_index
+from app.Services.stopService.spatial import get_stop_index
+
+router = APIRouter(prefix="/stops", tags=["Stops"])
+
+
+@router.get("/nearby")
+def nearby_stops(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius: float = Query(500, gt=0, le=5000, description="metres"),
+    limit: int = Query(10, ge=1, le=100),
+    on_route: bool = Query(False, description="only stops some route actually serves"),
+    db: Session = Depends(get_db),
+):
+    """Closest stops to a point, nearest first, with haversine distance in metres"""
+    stops = get_stop_index(db).nearby(lat, lon, radius, limit, on_route_only=on_route)
+    return {
+        "lat": lat,
+        "lon": lon,
+        "radius_m": radius,
+        "count": len(stops),
+        "stops": stops,
+    }
+
+
+@router.get("/search")
+def search_stops(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    db: Session = Depends(get_db),
+):
+    """Stops by name, typo tolerant. Pass lat + lon to favour the ones near you."""
+    if (lat is None) != (lon is None):
+        raise HTTPException(status_code=400, detail="lat and lon go together")
+
+    stops = get_search_index(db).search(q, limit, lat=lat, lon=lon)
+    return {
+        "q": q,
+        "count": len(stops),
+        "stops": stops,
+    }
@@ -0,0 +1,48 @@
+"""Dev only endpoints - cache/metrics counters for sizing things under real load"""
+
+from fastapi import APIRouter, Depends
+
+from app.dependencies.internal_access import internal_access
+from app.dependencies.rate_limit import get_rate_limiter
+from app.Services.Prediction.cache import prediction_cache
+from app.utils.pubsub import hub
+from app.Services.journeyService.route_status import status_flight
+from app.Services.journeyService.group_commit import group_writer
+from app.Services.routeService.catalog import route_payloads
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["Internal"],
+    dependencies=[Depends(internal_access)],
+)
+
+
+@router.get("/cache/predictions")
+def prediction_cache_stats():
+    return prediction_cache.stats()
+
+
+@router.get("/cache/status")
+def status_cache_stats():
+    """executions_saved = status requests that didn't touch the DB (coalesced + microcache hits)"""
+    return status_flight.stats()
+
+
+@router.get("/cache/responses")
+def response_cache_stats():
+    return route_payloads.stats()
+
+
+@router.get("/live")
+def live_hub_stats():
+    return hub.stats()
+
+
+@router.get("/rate-limit")
+def rate_limit_stats():
+    return get_rate_limiter().stats()
+
+
+@router.get("/group-commit")
+def group_commit_stats():
+    return group_writer.stats()
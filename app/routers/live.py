@@ -0,0 +1,58 @@
+# live status push - replaces the 20s frontend poll of /journeys/status/{route_id}
+# Server-Sent Events: subscribe to a route and/or a stop, get a message whenever
+# a journey event on it is committed. Nothing runs per client between events.
+
+import asyncio
+import os
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from app.utils.pubsub import hub, HubFull
+
+router = APIRouter(prefix="/live", tags=["Live"])
+
+# comment line every so often so proxies don't kill quiet connections
+LIVE_KEEPALIVE_SECONDS = float(os.getenv("LIVE_KEEPALIVE_SECONDS", "25"))
+
+
+@router.get("/stream")
+async def live_stream(request: Request, route_id: Optional[str] = None, stop_id: Optional[str] = None):
+    """
+    EventSource('/live/stream?route_id=9B') → "journey" events with the new status,
+    the journey's predicted arrival and, for ARRIVED, fresh ETAs for the stops further down.
+    """
+    topics = []
+    if route_id:
+        topics.append(f"route:{route_id}")
+    if stop_id:
+        topics.append(f"stop:{stop_id}")
+    if not topics:
+        raise HTTPException(400, "Need a route_id or stop_id to subscribe to")
+
+    try:
+        sub = hub.subscribe(topics)
+    except HubFull:
+        raise HTTPException(503, "Too many live connections, fall back to polling")
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(sub.get(), LIVE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: journey\ndata: {message}\n\n"
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -15,6 +15,9 @@ class JourneyEventType():
 
     # User Journey stops
     EVENT_TYPE_STOP_REACHED = "STOP_REACHED"
+
+    # Never finished - set by the reaper (journeyService/reaper.py), not something users can send
+    EVENT_TYPE_EXPIRED = "EXPIRED"
     
 
 
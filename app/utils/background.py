@@ -0,0 +1,24 @@
+# utils/background.py
+# tiny periodic job runner for the app lifespan
+# jobs are plain sync functions, they run in the threadpool so the event loop stays free
+
+import asyncio
+from typing import Callable
+
+from starlette.concurrency import run_in_threadpool
+
+from app.utils.logger.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+async def run_periodically(name: str, interval_seconds: float, job: Callable[[], object]) -> None:
+    """Run job now and then every interval_seconds until cancelled. Failures are logged, not fatal."""
+    while True:
+        try:
+            await run_in_threadpool(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Background job {name} failed: {e}")
+        await asyncio.sleep(interval_seconds)
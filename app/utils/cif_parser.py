@@ -0,0 +1,182 @@
+# utils/cif_parser.py
+# streaming ATCO-CIF parser
+# walks QS (journey header) → QO (origin) → QI (intermediate) → QT (terminating) records
+# one line in memory at a time so the big Translink files are fine
+
+from datetime import date
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+from app.utils.logger.logger import get_logger
+
+logger = get_logger(__name__)
+
+# '99999999' in CIF means open ended
+OPEN_ENDED = date.max
+
+ALL_DAYS = 0b1111111  # bit 0 = Monday ... bit 6 = Sunday (same as date.weekday())
+MINUTES_PER_DAY = 24 * 60
+
+
+class JourneyHeader(NamedTuple):
+    journey_id: str
+    operator: str
+    route_id: str
+    direction: str  # 'I' inbound / 'O' outbound
+    days_mask: int
+    valid_from: date
+    valid_to: date
+
+
+class StopTimeRow(NamedTuple):
+    route_id: str
+    direction: str
+    days_mask: int
+    valid_from: date
+    valid_to: date
+    stop_id: str
+    minute: int  # minutes since midnight, 0..1439
+    sequence: int  # position of the stop in its journey, origin = 1
+    journey_id: str
+
+
+def _parse_date(value: str) -> Optional[date]:
+    """'20260105' → date(2026, 1, 5)"""
+    value = value.strip()
+    if value == "99999999":
+        return OPEN_ENDED
+    if len(value) != 8 or not value.isdigit():
+        return None
+    try:
+        return date(int(value[:4]), int(value[4:6]), int(value[6:]))
+    except ValueError:
+        return None
+
+
+def _parse_minute(value: str) -> Optional[int]:
+    """'1430' → 870, '2415' → 1455 (some exports carry on past midnight like that), None if blank/junk"""
+    if len(value) != 4 or not value.isdigit():
+        return None
+    hour, minute = int(value[:2]), int(value[2:])
+    if 0 <= hour <= 47 and 0 <= minute <= 59:
+        return hour * 60 + minute
+    return None
+
+
+def _days_mask(value: str) -> int:
+    """'1111100' (Mon..Sun) → bitmask"""
+    mask = 0
+    for bit, flag in enumerate(value[:7]):
+        if flag == "1":
+            mask |= 1 << bit
+    return mask
+
+
+def _shift_days(mask: int) -> int:
+    """Mon..Sun mask for the day after (Sunday wraps to Monday)"""
+    return ((mask << 1) | (mask >> 6)) & ALL_DAYS
+
+
+def parse_journey_header(line: str) -> Optional[JourneyHeader]:
+    """QS record. Returns None for deletes and broken headers."""
+    if line[2:3] == "D":
+        return None
+
+    valid_from = _parse_date(line[13:21])
+    valid_to = _parse_date(line[21:29])
+    route_id = line[38:42].strip()
+    if valid_from is None or valid_to is None or not route_id:
+        return None
+
+    return JourneyHeader(
+        journey_id=line[7:13].strip(),
+        operator=line[3:7].strip(),
+        route_id=route_id,
+        direction=line[64:65].strip() or "O",
+        days_mask=_days_mask(line[29:36]),
+        valid_from=valid_from,
+        valid_to=valid_to,
+    )
+
+
+def iter_cif_lines(path: Path) -> Iterator[str]:
+    """Plain line generator, never reads the whole file"""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            yield line.rstrip("\r\n")
+
+
+def iter_stop_times(path: Path) -> Iterator[StopTimeRow]:
+    """
+    Structured stop-time rows, one per QO/QI/QT record of every live journey.
+    Times after midnight on a journey that started the day before (going backwards,
+    or written as 2400 and up) are folded back into 0..1439 with the days mask and
+    validity shifted forward a day.
+    """
+    header: Optional[JourneyHeader] = None
+    sequence = 0
+    last_minute = -1
+    day_offset = 0
+    skipped = 0
+
+    for line in iter_cif_lines(path):
+        record = line[:2]
+
+        if record == "QS":
+            header = parse_journey_header(line)
+            sequence = 0
+            last_minute = -1
+            day_offset = 0
+            continue
+
+        if record not in ("QO", "QI", "QT") or header is None:
+            continue
+
+        stop_id = line[2:14].strip()
+        if record == "QO":
+            minute = _parse_minute(line[14:18])
+        elif record == "QI":
+            # departure if published, otherwise arrival
+            minute = _parse_minute(line[18:22])
+            if minute is None:
+                minute = _parse_minute(line[14:18])
+        else:
+            minute = _parse_minute(line[14:18])
+
+        if not stop_id or minute is None:
+            skipped += 1
+            continue
+
+        if minute >= MINUTES_PER_DAY:
+            minute -= MINUTES_PER_DAY
+            day_offset = 1
+        elif minute < last_minute:
+            day_offset = 1  # ran past midnight
+        last_minute = minute
+        sequence += 1
+
+        days_mask = header.days_mask
+        valid_from, valid_to = header.valid_from, header.valid_to
+        if day_offset:
+            days_mask = _shift_days(days_mask)
+            valid_from = date.fromordinal(valid_from.toordinal() + 1)
+            if valid_to != OPEN_ENDED:
+                valid_to = date.fromordinal(valid_to.toordinal() + 1)
+
+        yield StopTimeRow(
+            route_id=header.route_id,
+            direction=header.direction,
+            days_mask=days_mask,
+            valid_from=valid_from,
+            valid_to=valid_to,
+            stop_id=stop_id,
+            minute=minute,
+            sequence=sequence,
+            journey_id=header.journey_id,
+        )
+
+        if record == "QT":
+            header = None  # anything until the next QS is noise
+
+    if skipped:
+        logger.info(f"CIF parse skipped {skipped} stop records with no usable time")
@@ -1,18 +1,23 @@
 # utils/fetch_time.py
-# pulls scheduled times from the CIF file for stops
-# still using the raw text parse since DB import is being worked on
+# pulls scheduled times for stops out of the in-memory timetable index
+# the CIF file is parsed once at startup (see timetable_index.py), not per lookup
+# or out of the scheduled_stop_times table when TIMETABLE_SOURCE=db
 
-from datetime import datetime, time, timezone, timedelta
-from pathlib import Path
-import re
-from typing import List, Optional, Tuple
+import os
+from datetime import date, datetime, time, timezone, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
+from sqlalchemy import and_, func, literal, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from app.models.Timetable import ScheduledStopTime, TimetableVersion
 from app.utils.logger.logger import get_logger
+from app.utils.timetable_index import CIF_FILE, get_timetable_index
 
 logger = get_logger(__name__)
 
-# hardcoded for now - move to env/config later
-CIF_FILE = Path("app/data/MPH_Metro_5_Jan_2026.cif")
+# "memory" = CIF index in this process, "db" = scheduled_stop_times (see Scripts/injest_timetable.py)
+TIMETABLE_SOURCE = os.getenv("TIMETABLE_SOURCE", "memory")
 
 
 def parse_time(time_str: str) -> Optional[time]:
@@ -29,49 +34,156 @@ def parse_time(time_str: str) -> Optional[time]:
     return None
 
 
-def fetch_all_scheduled_times_for_stop(stop_id: str) -> List[time]:
+def _as_time(minute: int) -> time:
+    return time(minute // 60, minute % 60)
+
+
+def _use_db(db: Optional[Session]) -> bool:
+    return TIMETABLE_SOURCE == "db" and db is not None
+
+
+class _Arm(NamedTuple):
+    route_id: Optional[str]
+    day: date
+    after_minute: int
+    is_tomorrow: bool
+    # any route at the stop, but only if this route has no rows there at all
+    instead_of: Optional[str] = None
+
+
+def _arms(route_id: Optional[str], day: date, after_minute: int, tomorrow: bool = True) -> List[_Arm]:
     """
-    Scan the CIF file for all times attached to this stop code.
-    Returns sorted unique times (or empty list if nothing found).
+    What counts as the next departure, best first: this route today, then tomorrow, then any route the
+    same way - the any route arms only for a route that doesn't call at the stop on any day, the same
+    rule as TimetableIndex._rows_for
     """
-    if not CIF_FILE.is_file():
-        logger.warning(f"CIF file gone: {CIF_FILE}")
-        return []
+    arms = []
+    for route, instead_of in ([(route_id, None), (None, route_id)] if route_id else [(None, None)]):
+        arms.append(_Arm(route, day, after_minute, False, instead_of))
+        if tomorrow:
+            arms.append(_Arm(route, day + timedelta(days=1), -1, True, instead_of))
+    return arms
 
-    try:
-        with open(CIF_FILE, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
 
-        pattern = rf'{re.escape(stop_id)}(\d{{4}})'
-        matches = re.findall(pattern, content)
+def _route_calls_at(route_id: str, stop_ids: List[str]):
+    """Which of stop_ids route_id calls at in the active version, on any day"""
+    return (
+        select(ScheduledStopTime.stop_id)
+        .join(TimetableVersion, and_(
+            TimetableVersion.id == ScheduledStopTime.timetable_version,
+            TimetableVersion.is_active.is_(True),
+        ))
+        .where(ScheduledStopTime.route_id == route_id, ScheduledStopTime.stop_id.in_(stop_ids))
+    )
+
 
-        times = []
-        for t_str in matches:
-            t = parse_time(t_str)
-            if t:
-                times.append(t)
+def _fallbacks(arms: List[_Arm]) -> List[int]:
+    return [rank for rank, arm in enumerate(arms) if arm.instead_of]
 
-        unique_sorted = sorted(set(times))
-        # print(f"Found {len(unique_sorted)} times for stop {stop_id}")
-        return unique_sorted
 
-    except Exception as e:
-        logger.error(f"Failed reading CIF for {stop_id}: {e}")
+def _departures(arm: _Arm, *columns):
+    """
+    Departures for one arm, on the active version (joined, not looked up first).
+    A range scan on ix_scheduled_stop_times_next_departure with a route,
+    ix_scheduled_stop_times_stop_departure without one.
+    """
+    stmt = (
+        select(*columns)
+        .join(TimetableVersion, and_(
+            TimetableVersion.id == ScheduledStopTime.timetable_version,
+            TimetableVersion.is_active.is_(True),
+        ))
+        .where(
+            ScheduledStopTime.weekday == arm.day.weekday(),
+            ScheduledStopTime.departure_minute > arm.after_minute,
+            ScheduledStopTime.valid_from <= arm.day,
+            ScheduledStopTime.valid_to >= arm.day,
+        )
+    )
+    if arm.route_id:
+        stmt = stmt.where(ScheduledStopTime.route_id == arm.route_id)
+    return stmt
+
+
+def _db_next_departure(
+        db: Session,
+        stop_id: str,
+        route_id: Optional[str],
+        day: date,
+        after_minute: int = -1,
+        tomorrow: bool = True) -> Optional[Tuple[int, bool]]:
+    """
+    One query: every arm is an ORDER BY ... LIMIT 1 range scan, UNION ALL'd with its rank,
+    and the best ranked one that found something wins. The any route arms are dropped from
+    the (at most four) candidates rather than filtered in their scan, which keeps it a LIMIT 1.
+    """
+    arms = _arms(route_id, day, after_minute, tomorrow)
+    firsts = [
+        select(
+            _departures(arm, literal(rank).label("rank"), ScheduledStopTime.departure_minute.label("minute"))
+            .where(ScheduledStopTime.stop_id == stop_id)
+            .order_by(ScheduledStopTime.departure_minute)
+            .limit(1)
+            .subquery()
+        )
+        for rank, arm in enumerate(arms)
+    ]
+    candidates = union_all(*firsts).subquery()
+    stmt = select(candidates.c.rank, candidates.c.minute)
+    if route_id:
+        stmt = stmt.where(or_(
+            candidates.c.rank.not_in(_fallbacks(arms)),
+            ~_route_calls_at(route_id, [stop_id]).exists(),
+        ))
+    row = db.execute(stmt.order_by(candidates.c.rank).limit(1)).first()
+    if row is None:
+        return None
+    return row.minute, arms[row.rank].is_tomorrow
+
+
+def _db_next_after(
+        db: Session,
+        stop_id: str,
+        when: datetime,
+        route_id: Optional[str] = None) -> Optional[Tuple[int, bool]]:
+    """Same contract as TimetableIndex.next_after but against the table"""
+    return _db_next_departure(db, stop_id, route_id, when.date(), when.hour * 60 + when.minute)
+
+
+def fetch_all_scheduled_times_for_stop(stop_id: str, route_id: Optional[str] = None) -> List[time]:
+    """
+    All times attached to this stop code, from the prebuilt timetable index.
+    Returns sorted unique times (or empty list if nothing found).
+    """
+    index = get_timetable_index()
+    if index is None:
         return []
 
+    return [_as_time(m) for m in index.minutes_for(stop_id, route_id)]
+
 
-def fetch_scheduled_time(route_id: str, stop_id: str) -> Optional[time]:
+def fetch_scheduled_time(route_id: str, stop_id: str, db: Optional[Session] = None) -> Optional[time]:
     """Legacy/simple version - just returns the first time found (used in some places)"""
-    times = fetch_all_scheduled_times_for_stop(stop_id)
-    if times:
-        return times[0]  # earliest or first match - whatever
+    if _use_db(db):
+        # first that runs today, any route at the stop if this one isn't in the CIF
+        found = _db_next_departure(db, stop_id, route_id, datetime.now(timezone.utc).date(), tomorrow=False)
+        return _as_time(found[0]) if found is not None else None
+
+    index = get_timetable_index()
+    if index is None:
+        return None
+
+    minute = index.first_minute(stop_id, datetime.now(timezone.utc).date(), route_id)
+    if minute is not None:
+        return _as_time(minute)  # earliest that runs today
     return None
 
 
 def get_closest_scheduled_time_to_now(
     route_id: str,
     stop_id: str,
-    reference_time: Optional[datetime] = None) -> Tuple[Optional[time], Optional[int], bool]:
+    reference_time: Optional[datetime] = None,
+    db: Optional[Session] = None) -> Tuple[Optional[time], Optional[int], bool]:
     """
     Finds the next scheduled time after reference_time (now by default).
     Returns (time, minutes_until, is_tomorrow)
@@ -79,30 +191,96 @@ def get_closest_scheduled_time_to_now(
     if reference_time is None:
         reference_time = datetime.now(timezone.utc)
 
-    all_times = fetch_all_scheduled_times_for_stop(stop_id)
-    if not all_times:
-        # print(f"No schedule for {stop_id}")
+    # honours days of operation + validity dates, route specific when the route is in the CIF
+    if _use_db(db):
+        found = _db_next_after(db, stop_id, reference_time, route_id)
+    else:
+        index = get_timetable_index()
+        if index is None:
+            return None, None, False
+        found = index.next_after(stop_id, reference_time, route_id)
+
+    if found is None:
         return None, None, False
 
+    return _closest_result(found, reference_time)
+
+
+def _closest_result(
+        found: Tuple[int, bool],
+        reference_time: datetime) -> Tuple[Optional[time], Optional[int], bool]:
+    minute, is_tomorrow = found
+    next_time = _as_time(minute)
     ref_date = reference_time.date()
-    ref_time = reference_time.time()
-
-    import bisect
-    idx = bisect.bisect_right(all_times, ref_time)
-
-    if idx < len(all_times):
-        # next one today
-        next_time = all_times[idx]
-        full_dt = datetime.combine(ref_date, next_time, tzinfo=timezone.utc)
-        mins = int((full_dt - reference_time).total_seconds() / 60)
-        return next_time, max(0, mins), False
-
-    # nothing left today → first tomorrow
-    if all_times:
-        next_time = all_times[0]
-        tomorrow = ref_date + timedelta(days=1)
-        full_dt = datetime.combine(tomorrow, next_time, tzinfo=timezone.utc)
-        mins = int((full_dt - reference_time).total_seconds() / 60)
-        return next_time, max(0, mins), True
-
-    return None, None, False 
\ No newline at end of file
+    if is_tomorrow:
+        # nothing left today → first tomorrow
+        ref_date += timedelta(days=1)
+
+    full_dt = datetime.combine(ref_date, next_time, tzinfo=timezone.utc)
+    mins = int((full_dt - reference_time).total_seconds() / 60)
+    return next_time, max(0, mins), is_tomorrow
+
+
+def _db_next_departures(
+        db: Session,
+        stop_ids: List[str],
+        route_id: Optional[str],
+        day: date,
+        after_minute: int) -> Dict[str, Tuple[int, bool]]:
+    """_db_next_departure for a list of stops - one grouped arm per rank, still one query"""
+    arms = _arms(route_id, day, after_minute)
+    grouped = [
+        _departures(
+            arm,
+            literal(rank).label("rank"),
+            ScheduledStopTime.stop_id,
+            func.min(ScheduledStopTime.departure_minute).label("minute"),
+        )
+        .where(ScheduledStopTime.stop_id.in_(stop_ids))
+        .group_by(ScheduledStopTime.stop_id)
+        for rank, arm in enumerate(arms)
+    ]
+    candidates = union_all(*grouped).subquery()
+    stmt = select(candidates.c.rank, candidates.c.stop_id, candidates.c.minute)
+    if route_id:
+        stmt = stmt.where(or_(
+            candidates.c.rank.not_in(_fallbacks(arms)),
+            candidates.c.stop_id.not_in(_route_calls_at(route_id, stop_ids)),
+        ))
+
+    found: Dict[str, Tuple[int, bool]] = {}
+    for rank, stop_id, minute in sorted(db.execute(stmt).all()):
+        if stop_id not in found:
+            found[stop_id] = (minute, arms[rank].is_tomorrow)
+    return found
+
+
+def get_next_departures_for_stops(
+    route_id: str,
+    stop_ids: List[str],
+    reference_time: Optional[datetime] = None,
+    db: Optional[Session] = None) -> Dict[str, Tuple[Optional[time], Optional[int], bool]]:
+    """
+    get_closest_scheduled_time_to_now for a whole list of stops.
+    From the DB it's one query no matter how many stops.
+    """
+    if reference_time is None:
+        reference_time = datetime.now(timezone.utc)
+
+    found: Dict[str, Tuple[int, bool]] = {}
+
+    if _use_db(db):
+        minute = reference_time.hour * 60 + reference_time.minute
+        found = _db_next_departures(db, stop_ids, route_id, reference_time.date(), minute)
+    else:
+        index = get_timetable_index()
+        if index is not None:
+            for stop_id in stop_ids:
+                hit = index.next_after(stop_id, reference_time, route_id)
+                if hit is not None:
+                    found[stop_id] = hit
+
+    return {
+        stop_id: _closest_result(found[stop_id], reference_time) if stop_id in found else (None, None, False)
+        for stop_id in stop_ids
+    }
@@ -0,0 +1,155 @@
+# utils/http_cache.py
+# ready-to-send responses for data that hardly ever changes (route list, stops per route)
+# body is serialised + hashed + gzip/brotli compressed once, every repeat request is a dict lookup
+# and clients that already have it get a 304
+
+import gzip
+import hashlib
+import os
+import time as _time
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Hashable, NamedTuple, Optional, Tuple
+
+from fastapi import Request, Response
+
+from app.utils.singleflight import SingleFlight
+
+try:
+    import brotli
+except ImportError:  # gzip only then
+    brotli = None
+
+RESPONSE_CACHE_ENTRIES = int(os.getenv("RESPONSE_CACHE_ENTRIES", "512"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# tiny bodies aren't worth the encoding header
+MIN_COMPRESS_BYTES = 512
+
+
+class StaticPayload(NamedTuple):
+    body: bytes
+    etag: str
+    gzip: Optional[bytes]
+    br: Optional[bytes]
+
+    @classmethod
+    def from_body(cls, body: bytes) -> "StaticPayload":
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        if len(body) < MIN_COMPRESS_BYTES:
+            return cls(body, etag, None, None)
+        return cls(
+            body,
+            etag,
+            gzip.compress(body, compresslevel=9, mtime=0),
+            brotli.compress(body, quality=11) if brotli is not None else None,
+        )
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzip or b"") + len(self.br or b"")
+
+
+def _accepted(request: Request) -> set:
+    """'gzip, deflate, br;q=0.9' → {'gzip', 'deflate', 'br'} (q=0 means no)"""
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if coding:
+            accepted.add(coding.lower())
+    return accepted
+
+
+def serve(request: Request, payload: StaticPayload, media_type: str = "application/json") -> Response:
+    """304 if the client's copy matches, else the best precompressed variant it accepts"""
+    headers = {"ETag": payload.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and payload.etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+
+    accepted = _accepted(request)
+    if payload.br is not None and "br" in accepted:
+        headers["Content-Encoding"] = "br"
+        body = payload.br
+    elif payload.gzip is not None and "gzip" in accepted:
+        headers["Content-Encoding"] = "gzip"
+        body = payload.gzip
+    else:
+        body = payload.body
+
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+class PayloadCache:
+    """
+    LRU bounded by entry count and total bytes. Keys should carry the data version
+    so a change just makes the old entries unreachable (they fall off the end).
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, StaticPayload]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        # a miss while the same key is already being built waits for that build
+        self._flight = SingleFlight(ttl_seconds=0)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _pop(self, key: Hashable) -> None:
+        _, payload = self._entries.pop(key)
+        self._bytes -= payload.size
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Optional[bytes]]) -> Optional[StaticPayload]:
+        """build() returns the serialised body, or None for "nothing here" (not cached)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > _time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self._pop(key)
+            self.misses += 1
+
+        return self._flight.do(key, lambda: self._build(key, build))
+
+    def _build(self, key: Hashable, build: Callable[[], Optional[bytes]]) -> Optional[StaticPayload]:
+        body = build()
+        if body is None:
+            return None
+        payload = StaticPayload.from_body(body)
+
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (_time.monotonic() + self.ttl_seconds, payload)
+            self._bytes += payload.size
+
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._pop(next(iter(self._entries)))
+                self.evictions += 1
+
+        return payload
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "brotli": brotli is not None,
+            }
@@ -0,0 +1,310 @@
+# utils/pubsub.py
+# in-process pub/sub for live updates (routers/live.py)
+# topics are plain strings ("route:9B", "stop:700000001"), subscribers are bounded queues
+# per process on its own - with several workers set LIVE_FANOUT=postgres so every worker
+# hears every event (PostgresRelay below), otherwise a client only gets events its worker handled
+# the relay also carries broadcast(): in-process state other workers have to apply too
+
+import asyncio
+import json
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from uuid import uuid4
+
+from app.utils.logger.logger import get_logger
+
+logger = get_logger(__name__)
+
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "32"))
+LIVE_MAX_SUBSCRIBERS = int(os.getenv("LIVE_MAX_SUBSCRIBERS", "10000"))
+# local | postgres
+LIVE_FANOUT = os.getenv("LIVE_FANOUT", "local")
+LIVE_CHANNEL = os.getenv("LIVE_CHANNEL", "journey_live")
+LIVE_RELAY_RETRY_SECONDS = float(os.getenv("LIVE_RELAY_RETRY_SECONDS", "5"))
+LIVE_RELAY_BACKLOG = 10_000
+
+# postgres refuses NOTIFY payloads of 8000 bytes or more
+_NOTIFY_MAX_BYTES = 7900
+
+
+class HubFull(Exception):
+    pass
+
+
+class Subscription:
+    """
+    One connected client. Idle = a task parked on queue.get(), nothing else.
+    If the client can't keep up the oldest messages go, so it holds at most max_queue of them.
+    """
+
+    def __init__(self, topics: Set[str], max_queue: int):
+        self.topics = topics
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def offer(self, message) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class Hub:
+    """Fan-out only ever runs on the event loop thread, so no locks"""
+
+    def __init__(self, max_subscribers: int = LIVE_MAX_SUBSCRIBERS, max_queue: int = LIVE_QUEUE_SIZE):
+        self.max_subscribers = max_subscribers
+        self.max_queue = max_queue
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._count = 0
+        self._relay: Optional["PostgresRelay"] = None
+        self._handlers: Dict[str, Callable[[dict], None]] = {}
+
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Called from the lifespan. Until then publish() is a no-op (scripts, tests)."""
+        self._loop = loop
+
+    @property
+    def bound(self) -> bool:
+        return self._loop is not None and not self._loop.is_closed()
+
+    def attach(self, relay: "PostgresRelay") -> None:
+        """publish() goes through the relay while it is connected, fan-out happens when it comes back"""
+        self._relay = relay
+
+    def on(self, kind: str, handler: Callable[[dict], None]) -> None:
+        """handler(data) runs on the loop thread for every broadcast(kind, data) from another worker"""
+        self._handlers[kind] = handler
+
+    def broadcast(self, kind: str, data: dict) -> None:
+        """
+        Tell the other workers about a change the caller has already applied in this one.
+        Only goes anywhere through the relay - a no-op for a single worker. Safe from any thread.
+        """
+        if self._relay is None or not self.bound:
+            return
+        self._loop.call_soon_threadsafe(self._relay.offer_broadcast, kind, data)
+
+    def _apply(self, kind: str, data: dict) -> None:
+        handler = self._handlers.get(kind)
+        if handler is None:
+            return
+        try:
+            handler(data)
+        except Exception as e:
+            logger.error(f"Broadcast {kind} from another worker failed: {e}")
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        if self._count >= self.max_subscribers:
+            raise HubFull()
+
+        sub = Subscription(set(topics), self.max_queue)
+        for topic in sub.topics:
+            self._topics.setdefault(topic, set()).add(sub)
+        self._count += 1
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        for topic in sub.topics:
+            subs = self._topics.get(topic)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._topics[topic]
+        self._count -= 1
+        self.dropped += sub.dropped
+
+    def publish(self, topics: Iterable[str], message) -> None:
+        """
+        Safe from any thread. Sync handlers run in the threadpool so they hop onto the
+        loop, async ones are already on it. message should be ready to send (encoded once).
+        """
+        if not self.bound:
+            return
+
+        topics = list(topics)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is self._loop:
+            self._dispatch(topics, message)
+        else:
+            self._loop.call_soon_threadsafe(self._dispatch, topics, message)
+
+    def _dispatch(self, topics, message) -> None:
+        if self._relay is not None and self._relay.offer(topics, message):
+            return
+        self._fan_out(topics, message)
+
+    def _fan_out(self, topics, message) -> None:
+        self.published += 1
+
+        # a client on both the route and the stop topic only gets it once
+        seen: Set[Subscription] = set()
+        for topic in topics:
+            seen.update(self._topics.get(topic, ()))
+
+        for sub in seen:
+            sub.offer(message)
+        self.delivered += len(seen)
+
+    def stats(self) -> dict:
+        return {
+            "fanout": self._relay.stats() if self._relay is not None else "local",
+            "subscribers": self._count,
+            "max_subscribers": self.max_subscribers,
+            "topics": len(self._topics),
+            "queue_size": self.max_queue,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped + sum(sub.dropped for sub in set().union(*self._topics.values())),
+        }
+
+
+
+def _listen_dsn(url: str) -> str:
+    """asyncpg wants a plain postgresql:// url, not SQLAlchemy's postgresql+driver://"""
+    scheme, sep, rest = url.partition("://")
+    return "postgresql" + sep + rest
+
+
+class PostgresRelay:
+    """
+    Cross-worker fan-out over LISTEN/NOTIFY on one channel. A worker NOTIFYs instead of
+    fanning out and every worker - the sender too - fans out what the channel delivers,
+    so a client sees events whichever worker handled them. Needs asyncpg.
+
+    While the connection is down (or the backlog is full) events fan out in this worker only,
+    and broadcasts are lost (counted in broadcasts_lost).
+    """
+
+    def __init__(self, hub: Hub, url: str, channel: str = LIVE_CHANNEL):
+        self.hub = hub
+        self.dsn = _listen_dsn(url)
+        self.channel = channel
+        self._outbox: asyncio.Queue = asyncio.Queue(maxsize=LIVE_RELAY_BACKLOG)
+        self._connected = False
+        # tells this worker's own broadcasts apart when the channel hands them back
+        self.origin = uuid4().hex
+
+        self.sent = 0
+        self.received = 0
+        self.local_only = 0
+        self.broadcasts_lost = 0
+
+    def offer(self, topics: List[str], message) -> bool:
+        """On the loop thread. False → caller fans out locally."""
+        if not self._connected or self._outbox.full():
+            self.local_only += 1
+            return False
+
+        payload = json.dumps({"topics": topics, "message": message})
+        if len(payload.encode()) > _NOTIFY_MAX_BYTES:
+            self.local_only += 1
+            return False
+
+        self._outbox.put_nowait((payload, topics, message))
+        return True
+
+    def offer_broadcast(self, kind: str, data: dict) -> None:
+        """On the loop thread. Nothing to fall back to - the sender has applied it already."""
+        payload = json.dumps({"origin": self.origin, "kind": kind, "data": data})
+        if not self._connected or self._outbox.full() or len(payload.encode()) > _NOTIFY_MAX_BYTES:
+            self.broadcasts_lost += 1
+            return
+        self._outbox.put_nowait((payload, None, None))
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        self.received += 1
+        data = json.loads(payload)
+        if "kind" in data:
+            if data["origin"] != self.origin:
+                self.hub._apply(data["kind"], data["data"])
+            return
+        self.hub._fan_out(data["topics"], data["message"])
+
+    def _fall_back(self, topics, message) -> None:
+        if topics is None:
+            self.broadcasts_lost += 1
+            return
+        self.hub._fan_out(topics, message)
+        self.local_only += 1
+
+    async def _send(self, connection) -> None:
+        # whatever queued up during the last round trip goes in the next one
+        while True:
+            batch = [await self._outbox.get()]
+            while not self._outbox.empty():
+                batch.append(self._outbox.get_nowait())
+            try:
+                await connection.execute(
+                    "SELECT pg_notify($1, payload) FROM unnest($2::text[]) AS payload",
+                    self.channel, [payload for payload, _, _ in batch])
+                self.sent += len(batch)
+            except Exception as e:
+                logger.error(f"Live NOTIFY failed, {len(batch)} events fanned out locally: {e}")
+                for _, topics, message in batch:
+                    self._fall_back(topics, message)
+                raise
+
+    async def run(self) -> None:
+        """Lifespan task: (re)connect, LISTEN, send until the connection drops."""
+        import asyncpg
+
+        while True:
+            try:
+                connection = await asyncpg.connect(self.dsn)
+            except Exception as e:
+                logger.error(f"Live relay can't connect, retrying in {LIVE_RELAY_RETRY_SECONDS}s: {e}")
+                await asyncio.sleep(LIVE_RELAY_RETRY_SECONDS)
+                continue
+
+            lost = asyncio.Event()
+            connection.add_termination_listener(lambda _: lost.set())
+            sender = watcher = None
+            try:
+                await connection.add_listener(self.channel, self._on_notify)
+                self._connected = True
+                sender = asyncio.create_task(self._send(connection))
+                watcher = asyncio.create_task(lost.wait())
+                await asyncio.wait([sender, watcher], return_when=asyncio.FIRST_COMPLETED)
+                logger.error(f"Live relay dropped its connection, retrying in {LIVE_RELAY_RETRY_SECONDS}s")
+            except Exception as e:
+                logger.error(f"Live relay failed, retrying in {LIVE_RELAY_RETRY_SECONDS}s: {e}")
+            finally:
+                self._connected = False
+                for task in (sender, watcher):
+                    if task is not None:
+                        task.cancel()
+                # anything still queued would never be sent
+                while not self._outbox.empty():
+                    _, topics, message = self._outbox.get_nowait()
+                    self._fall_back(topics, message)
+                if not connection.is_closed():
+                    connection.terminate()
+            await asyncio.sleep(LIVE_RELAY_RETRY_SECONDS)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "postgres",
+            "channel": self.channel,
+            "connected": self._connected,
+            "backlog": self._outbox.qsize(),
+            "sent": self.sent,
+            "received": self.received,
+            "local_only": self.local_only,
+            "broadcasts_lost": self.broadcasts_lost,
+        }
+
+
+hub = Hub()
@@ -0,0 +1,323 @@
+# utils/rate_limiter.py
+# token buckets for the journey endpoints (see dependencies/rate_limit.py)
+# the state has to be shared by every uvicorn worker, otherwise N workers = N times the allowance
+#   memory - one process only, LRU bounded. fine for dev / a single worker
+#   sqlite - a WAL file every worker on the host opens, one short write transaction per hit
+#   redis  - anything speaking RESP (redis, valkey, a stand-in), fixed window per key
+
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time as _time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+from urllib.parse import urlparse
+
+from app.utils.logger.logger import get_logger
+
+logger = get_logger(__name__)
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "sqlite").lower()
+RATE_LIMIT_SQLITE_PATH = os.getenv(
+    "RATE_LIMIT_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "routereality-ratelimit.db"))
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://127.0.0.1:6379/0")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+
+class RateLimit(NamedTuple):
+    """capacity hits, refilling evenly over per_seconds. (1, 180) = one hit every 3 minutes."""
+    name: str
+    capacity: int
+    per_seconds: float
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.per_seconds
+
+    def take(self, tokens: Optional[float], updated: float, now: float) -> Tuple[bool, float, float]:
+        """(allowed, tokens left, retry after seconds) for a bucket last touched at `updated`"""
+        if tokens is None:
+            tokens = float(self.capacity)
+        else:
+            tokens = min(float(self.capacity), tokens + max(now - updated, 0.0) * self.rate)
+
+        if tokens >= 1.0:
+            return True, tokens - 1.0, 0.0
+        return False, tokens, (1.0 - tokens) / self.rate
+
+    def full_at(self, tokens: float, now: float) -> float:
+        """After this the bucket is as good as new, so the row/entry can go"""
+        return now + (self.capacity - tokens) / self.rate
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    retry_after: float
+
+
+class MemoryBackend:
+    """Per process. LRU over keys, so a flood of distinct keys can't grow it past max_keys."""
+
+    name = "memory"
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def hit(self, key: str, limit: RateLimit, now: float) -> Decision:
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (None, now))
+            allowed, tokens, retry_after = limit.take(tokens, updated, now)
+            self._buckets[key] = (tokens, now)
+
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+
+        return Decision(allowed, retry_after)
+
+    def refund(self, key: str, limit: RateLimit) -> None:
+        with self._lock:
+            entry = self._buckets.get(key)
+            if entry is not None:
+                tokens, updated = entry
+                self._buckets[key] = (min(float(limit.capacity), tokens + 1.0), updated)
+
+    def stats(self) -> dict:
+        return {"keys": len(self._buckets), "max_keys": self.max_keys, "evictions": self.evictions}
+
+
+class SQLiteBackend:
+    """
+    One row per key in a WAL mode file. BEGIN IMMEDIATE takes the write lock before the
+    read, so two workers can't both spend the last token. Rows whose bucket has refilled
+    are swept every sweep_every hits, so the table only holds keys active in the last window.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = RATE_LIMIT_SQLITE_PATH, sweep_every: int = 1000):
+        self.path = path
+        self.sweep_every = sweep_every
+        self._local = threading.local()
+        self._hits = 0
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_buckets_full_at ON buckets (full_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite connections stay on the thread that made them, the threadpool reuses threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key: str, limit: RateLimit, now: float) -> Decision:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row is not None else (None, now)
+            allowed, tokens, retry_after = limit.take(tokens, updated, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)",
+                (key, tokens, now, limit.full_at(tokens, now)),
+            )
+
+            self._hits += 1
+            if self._hits % self.sweep_every == 0:
+                conn.execute("DELETE FROM buckets WHERE full_at < ?", (now,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        return Decision(allowed, retry_after)
+
+    def refund(self, key: str, limit: RateLimit) -> None:
+        # full_at is left as it was, the row is just swept a bit later than it could be
+        self._conn().execute(
+            "UPDATE buckets SET tokens = MIN(?, tokens + 1.0) WHERE key = ?", (float(limit.capacity), key))
+
+    def stats(self) -> dict:
+        keys = self._conn().execute("SELECT count(*) FROM buckets").fetchone()[0]
+        return {"keys": keys, "path": self.path}
+
+
+class RespError(Exception):
+    pass
+
+
+class RespBackend:
+    """
+    Minimal RESP client, one pipelined round trip per hit:
+        SET key 0 PX window NX   (starts the window, no-op inside one)
+        INCR key                 (keeps the TTL)
+        PTTL key                 (for Retry-After)
+    A fixed window of capacity hits per per_seconds rather than a smooth bucket, which
+    is the same thing for the cooldown style limits used here. Expired keys are the server's problem.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str = RATE_LIMIT_REDIS_URL, timeout: float = 1.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @staticmethod
+    def _encode(*parts) -> bytes:
+        out = [b"*%d\r\n" % len(parts)]
+        for part in parts:
+            data = part if isinstance(part, bytes) else str(part).encode()
+            out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(out)
+
+    @staticmethod
+    def _read(f):
+        line = f.readline()
+        if not line:
+            raise ConnectionError("RESP server closed the connection")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RespError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            if size < 0:
+                return None
+            data = f.read(size + 2)
+            return data[:-2]
+        if kind == b"*":
+            size = int(rest)
+            return None if size < 0 else [RespBackend._read(f) for _ in range(size)]
+        raise RespError(f"Unexpected RESP reply {line!r}")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = (sock, sock.makefile("rb"))
+            setup = []
+            if self.password:
+                setup.append(("AUTH", self.password))
+            if self.db:
+                setup.append(("SELECT", self.db))
+            if setup:
+                sock.sendall(b"".join(self._encode(*cmd) for cmd in setup))
+                for _ in setup:
+                    self._read(conn[1])
+            self._local.conn = conn
+        return conn
+
+    def execute(self, *commands):
+        """Pipelined. On any error the connection is dropped (replies may be left unread) and the next call reconnects."""
+        sock, f = self._connection()
+        try:
+            sock.sendall(b"".join(self._encode(*cmd) for cmd in commands))
+            return [self._read(f) for _ in commands]
+        except (OSError, ConnectionError, RespError):
+            self._local.conn = None
+            sock.close()
+            raise
+
+    def hit(self, key: str, limit: RateLimit, now: float) -> Decision:
+        window_ms = max(int(limit.per_seconds * 1000), 1)
+        _, count, pttl = self.execute(
+            ("SET", key, 0, "PX", window_ms, "NX"),
+            ("INCR", key),
+            ("PTTL", key),
+        )
+        if count <= limit.capacity:
+            return Decision(True, 0.0)
+        return Decision(False, max(pttl, 0) / 1000.0)
+
+    def refund(self, key: str, limit: RateLimit) -> None:
+        _, pttl = self.execute(("DECR", key), ("PTTL", key))
+        if pttl == -1:
+            # the window ran out in between and DECR made a fresh key with no TTL - don't leave it behind
+            self.execute(("DEL", key))
+
+    def stats(self) -> dict:
+        return {"server": f"{self.host}:{self.port}/{self.db}"}
+
+
+class RateLimiter:
+    """
+    Front for whichever backend. If the backend is down (locked file, no redis) the hit is
+    allowed and counted under errors - a broken limiter shouldn't take the journey endpoints with it.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.allowed = 0
+        self.limited = 0
+        self.refunded = 0
+        self.errors = 0
+
+    def hit(self, limit: RateLimit, key: str) -> Decision:
+        try:
+            decision = self.backend.hit(f"{limit.name}:{key}", limit, _time.time())
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Rate limiter ({self.backend.name}) failed open: {e}")
+            return Decision(True, 0.0)
+
+        if decision.allowed:
+            self.allowed += 1
+        else:
+            self.limited += 1
+        return decision
+
+    def refund(self, limit: RateLimit, key: str) -> None:
+        """Give back a hit that didn't end up doing anything (best effort, same fail-open rule)"""
+        try:
+            self.backend.refund(f"{limit.name}:{key}", limit)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Rate limiter ({self.backend.name}) refund failed: {e}")
+            return
+        self.refunded += 1
+
+    def stats(self) -> dict:
+        try:
+            backend = self.backend.stats()
+        except Exception as e:
+            backend = {"error": str(e)}
+        return {
+            "backend": self.backend.name,
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "refunded": self.refunded,
+            "errors": self.errors,
+            **backend,
+        }
+
+
+def make_backend(kind: str = RATE_LIMIT_BACKEND):
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend()
+    if kind == "redis":
+        return RespBackend()
+    raise ValueError(f"RATE_LIMIT_BACKEND must be memory, sqlite or redis, not {kind!r}")
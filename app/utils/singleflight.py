@@ -0,0 +1,99 @@
+# utils/singleflight.py
+# request coalescing + a tiny time based cache in front of it
+# N identical requests at once → one computation, the other N-1 wait for its result,
+# and anything landing in the next few seconds gets the same answer without running it again
+
+import time as _time
+from collections import OrderedDict
+from threading import Event, Lock
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """
+    Thread based (the sync handlers run in the threadpool). Errors go to everyone
+    waiting on that call but aren't cached, the next request tries again.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, _Call] = {}
+        self._lock = Lock()
+
+        self.executions = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                if entry[0] > _time.monotonic():
+                    self.cache_hits += 1
+                    return entry[1]
+                del self._cache[key]
+
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        else:
+            with self._lock:
+                self._cache[key] = (_time.monotonic() + self.ttl_seconds, call.result)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+            return call.result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+
+    def forget(self, key: Hashable) -> None:
+        """Drop a cached answer that's known to be out of date (a call in flight still finishes)"""
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.executions + self.cache_hits + self.coalesced
+            saved = self.cache_hits + self.coalesced
+            return {
+                "ttl_seconds": self.ttl_seconds,
+                "entries": len(self._cache),
+                "in_flight": len(self._inflight),
+                "requests": requests,
+                "executions": self.executions,
+                "cache_hits": self.cache_hits,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "executions_saved": saved,
+                "saved_ratio": round(saved / requests, 3) if requests else None,
+            }
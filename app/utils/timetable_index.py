@@ -0,0 +1,254 @@
+# utils/timetable_index.py
+# in-memory timetable built once from the CIF file (see cif_parser.py)
+# lookups are bisects over sorted minute arrays, the file is only read again when it changes
+
+import os
+import sys
+import time as _time
+from array import array
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.utils.cif_parser import StopTimeRow, iter_stop_times
+from app.utils.logger.logger import get_logger
+
+logger = get_logger(__name__)
+
+# hardcoded for now - move to env/config later
+CIF_FILE = Path("app/data/MPH_Metro_5_Jan_2026.cif")
+
+# how often (seconds) we stat the CIF file to see if it was replaced
+MTIME_CHECK_SECONDS = int(os.getenv("TIMETABLE_MTIME_CHECK_SECONDS", "30"))
+
+
+# weekday numbers (Monday = 0) set in each possible days mask
+_MASK_WEEKDAYS = [tuple(wd for wd in range(7) if mask >> wd & 1) for mask in range(128)]
+
+
+class _WeekdayRows:
+    """
+    The stop-time rows of every service that runs on one weekday.
+    Rows are sorted by (stop, minute); per (route, stop) a list of row positions, also in minute order.
+    """
+
+    __slots__ = ("stop_slices", "minutes", "row_service", "route_rows")
+
+    def __init__(self):
+        self.stop_slices: Dict[str, Tuple[int, int]] = {}
+        self.minutes = array("H")
+        self.row_service = array("I")
+        self.route_rows: Dict[Tuple[str, str], array] = {}
+
+    def add(self, stop_id: str, route_id: str, minute: int, service: int) -> None:
+        pos = len(self.minutes)
+        self.minutes.append(minute)
+        self.row_service.append(service)
+
+        key = (route_id, stop_id)
+        positions = self.route_rows.get(key)
+        if positions is None:
+            positions = self.route_rows[key] = array("I")
+        positions.append(pos)
+
+
+class TimetableIndex:
+    """
+    Columnar store of the parsed timetable.
+
+    Services are the distinct (route, direction, days mask, validity) combos from
+    the journey headers - thousands of journeys share a few hundred of them, so
+    each stop-time row only carries a service number next to its minute.
+    The rows are split by weekday (a row is in every weekday its service runs on), so a
+    bisect lands on a departure that runs that day. The only rows still stepped over are
+    those of services outside their validity dates on the day asked about.
+    """
+
+    def __init__(
+            self,
+            weekdays: List[_WeekdayRows],
+            route_stops: set,
+            service_route: List[str],
+            service_direction: List[str],
+            service_days: array,
+            service_from: array,
+            service_to: array,
+            mtime: Optional[float] = None):
+        self.weekdays = weekdays
+        self.route_stops = route_stops
+        self.service_route = service_route
+        self.service_direction = service_direction
+        self.service_days = service_days
+        self.service_from = service_from
+        self.service_to = service_to
+        self.mtime = mtime
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[StopTimeRow], mtime: Optional[float] = None) -> "TimetableIndex":
+        services: Dict[tuple, int] = {}
+        service_route: List[str] = []
+        service_direction: List[str] = []
+        service_days = array("B")
+        service_from = array("I")
+        service_to = array("I")
+
+        # packed (minute << 32 | service) per stop, 8 bytes a row while parsing
+        packed: Dict[str, array] = {}
+
+        for row in rows:
+            key = (row.route_id, row.direction, row.days_mask, row.valid_from, row.valid_to)
+            service = services.get(key)
+            if service is None:
+                service = len(service_route)
+                services[key] = service
+                service_route.append(sys.intern(row.route_id))
+                service_direction.append(row.direction)
+                service_days.append(row.days_mask)
+                service_from.append(row.valid_from.toordinal())
+                service_to.append(row.valid_to.toordinal())
+
+            stop_rows = packed.get(row.stop_id)
+            if stop_rows is None:
+                stop_rows = packed[sys.intern(row.stop_id)] = array("Q")
+            stop_rows.append(row.minute << 32 | service)
+
+        weekdays = [_WeekdayRows() for _ in range(7)]
+        route_stops = set()
+        rows_total = 0
+
+        for stop_id in list(packed):
+            starts = [len(wd.minutes) for wd in weekdays]
+            for value in sorted(set(packed.pop(stop_id))):
+                service = value & 0xFFFFFFFF
+                minute = value >> 32
+                route_id = service_route[service]
+                route_stops.add((route_id, stop_id))
+                for wd in _MASK_WEEKDAYS[service_days[service] & 0x7F]:
+                    weekdays[wd].add(stop_id, route_id, minute, service)
+                rows_total += 1
+            for wd, start in zip(weekdays, starts):
+                if len(wd.minutes) > start:
+                    wd.stop_slices[stop_id] = (start, len(wd.minutes))
+
+        logger.info(
+            f"Timetable index built: {len(route_stops)} route/stop pairs, {rows_total} stop times "
+            f"({sum(len(wd.minutes) for wd in weekdays)} weekday rows), {len(service_route)} services"
+        )
+        return cls(
+            weekdays, route_stops,
+            service_route, service_direction, service_days, service_from, service_to,
+            mtime,
+        )
+
+    @classmethod
+    def from_cif(cls, path: Path) -> "TimetableIndex":
+        mtime = path.stat().st_mtime
+        return cls.from_rows(iter_stop_times(path), mtime)
+
+    def _rows_for(self, stop_id: str, route_id: Optional[str], weekday: int) -> Sequence[int]:
+        """
+        Row positions in minute order, in that weekday's rows. Route specific if the route calls
+        at the stop on any day (empty when not on this one), otherwise the whole stop.
+        """
+        rows = self.weekdays[weekday]
+        if route_id and (route_id, stop_id) in self.route_stops:
+            return rows.route_rows.get((route_id, stop_id), ())
+        start, end = rows.stop_slices.get(stop_id, (0, 0))
+        return range(start, end)
+
+    def _first_valid(self, rows: Sequence[int], lo: int, day: date) -> Optional[int]:
+        weekday_rows = self.weekdays[day.weekday()]
+        ordinal = day.toordinal()
+        for i in range(lo, len(rows)):
+            service = weekday_rows.row_service[rows[i]]
+            if self.service_from[service] <= ordinal <= self.service_to[service]:
+                return weekday_rows.minutes[rows[i]]
+        return None
+
+    def minutes_for(self, stop_id: str, route_id: Optional[str] = None) -> List[int]:
+        """Sorted unique minutes at the stop, any day of the week"""
+        found = set()
+        for weekday, rows in enumerate(self.weekdays):
+            minutes = rows.minutes
+            found.update(minutes[pos] for pos in self._rows_for(stop_id, route_id, weekday))
+        return sorted(found)
+
+    def first_minute(self, stop_id: str, day: date, route_id: Optional[str] = None) -> Optional[int]:
+        """First departure that runs on `day`"""
+        return self._first_valid(self._rows_for(stop_id, route_id, day.weekday()), 0, day)
+
+    def next_after(
+            self,
+            stop_id: str,
+            when: datetime,
+            route_id: Optional[str] = None) -> Optional[Tuple[int, bool]]:
+        """
+        First departure strictly after `when` that actually runs that day.
+        Falls over to tomorrow's first running departure.
+        Returns (minute, is_tomorrow) or None if nothing runs today or tomorrow.
+        """
+        minute = when.hour * 60 + when.minute
+        day = when.date()
+
+        rows = self._rows_for(stop_id, route_id, day.weekday())
+        if rows:
+            idx = bisect_right(rows, minute, key=self.weekdays[day.weekday()].minutes.__getitem__)
+            found = self._first_valid(rows, idx, day)
+            if found is not None:
+                return found, False
+
+        found = self.first_minute(stop_id, day + timedelta(days=1), route_id)
+        if found is not None:
+            return found, True
+        return None
+
+
+_index: Optional[TimetableIndex] = None
+_lock = Lock()
+_last_check = 0.0
+
+
+def load_timetable_index(path: Path = CIF_FILE) -> Optional[TimetableIndex]:
+    """Build a fresh index and swap it in. Old one keeps serving until the swap."""
+    global _index
+
+    if not path.is_file():
+        logger.warning(f"CIF file gone: {path}")
+        return _index
+
+    try:
+        fresh = TimetableIndex.from_cif(path)
+    except Exception as e:
+        logger.error(f"Failed building timetable index from {path}: {e}")
+        return _index
+
+    _index = fresh  # single reference assignment, readers never see a half built index
+    return fresh
+
+
+def get_timetable_index(path: Path = CIF_FILE) -> Optional[TimetableIndex]:
+    """Current index. Rebuilds if the CIF file was swapped out since the last build."""
+    global _last_check
+
+    now = _time.monotonic()
+    if _last_check and now - _last_check < MTIME_CHECK_SECONDS:
+        return _index
+
+    with _lock:
+        if _last_check and now - _last_check < MTIME_CHECK_SECONDS:
+            return _index
+        _last_check = now
+
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            if _index is None:
+                logger.warning(f"CIF file gone: {path}")
+            return _index
+
+        if _index is None or _index.mtime != mtime:
+            load_timetable_index(path)
+
+    return _index
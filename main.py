@@ -1,15 +1,113 @@
 """Entry file for Bus tracker API"""
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers.Journey import router as journey_endpoint
+from app.models.Database import DATABASE_URL, DB_MODE
 from app.routers.Route import router as routes_endpoint
 from app.routers.status import router as status_endpoint
+from app.routers.internal import router as internal_endpoint
+from app.routers.live import router as live_endpoint
+from app.routers.Stops import router as stops_endpoint
+from app.utils.logger.logger import get_logger
+from app.utils.timetable_index import load_timetable_index
+from app.utils.background import run_periodically
+from app.utils.pubsub import hub, PostgresRelay, LIVE_FANOUT
+from app.Services.Prediction.arrival_stats import ensure_arrival_stats
+from app.Services.Prediction.profiles import ensure_headway_profiles, refresh_headway_profiles, HEADWAY_PROFILE_REFRESH_SECONDS
+from app.Services.Prediction.segments import refresh_segment_matrices, SEGMENT_REFRESH_SECONDS
+from app.Services.journeyService.group_commit import group_writer, EVENT_GROUP_COMMIT
+from app.Services.journeyService.event_log import ensure_journey_events, JOURNEY_EVENT_PARTITION_REFRESH_SECONDS
+from app.Services.journeyService.retention import ensure_journey_indexes, run_retention, JOURNEY_ARCHIVE_INTERVAL_SECONDS
+from app.Services.journeyService.reaper import reap_stale_journeys, JOURNEY_REAPER_INTERVAL_SECONDS
+from app.Services.stopService.trip_rollups import ensure_stop_rollups, prune_stop_rollups, STOP_ROLLUP_PRUNE_SECONDS
+from app.Services.stopService.search import load_search_index
+from app.Services.stopService.spatial import load_stop_index
+
+# DB_MODE=async swaps the journey + prediction endpoints for AsyncSession versions
+if DB_MODE == "async":
+    from app.routers.JourneyAsync import router as journey_endpoint
+    from app.routers.PredictionAsync import router as prediction_endpoint
+else:
+    from app.routers.Journey import router as journey_endpoint
+    from app.routers.Prediction import router as prediction_endpoint
+
+logger = get_logger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # parse the CIF once up front so journey starts never touch the file
+    load_timetable_index()
+    # same for the stop grid behind /stops/nearby and the name index behind /stops/search
+    # (lazy on first request if the db isn't there yet)
+    try:
+        load_search_index(load_stop_index())
+    except Exception as e:
+        logger.error(f"Stop index not loaded at startup: {e}")
+    logger.info(f"Database mode: {DB_MODE}")
+
+    # sync event handlers publish from the threadpool, they need the loop to hop onto
+    hub.bind(asyncio.get_running_loop())
+
+    if EVENT_GROUP_COMMIT:
+        group_writer.start()
+
+    # tables the request path writes to have to exist before the first request, whether or not
+    # anyone ran the scripts (a new stop_trip_rollups is counted in from journeys)
+    for table, ensure in (
+            ("journeys indexes", ensure_journey_indexes),
+            ("stop_arrival_stats", ensure_arrival_stats),
+            ("headway_profiles", ensure_headway_profiles),
+            ("stop_trip_rollups", ensure_stop_rollups)):
+        try:
+            ensure()
+        except Exception as e:
+            logger.error(f"{table} not ready at startup: {e}")
+
+    jobs = [
+        asyncio.create_task(run_periodically(
+            "headway_profiles", HEADWAY_PROFILE_REFRESH_SECONDS, refresh_headway_profiles)),
+        asyncio.create_task(run_periodically(
+            "segment_matrices", SEGMENT_REFRESH_SECONDS, refresh_segment_matrices)),
+        # journey_events day partitions, a few days ahead of the clock
+        asyncio.create_task(run_periodically(
+            "journey_event_partitions", JOURNEY_EVENT_PARTITION_REFRESH_SECONDS, ensure_journey_events)),
+        # STARTED/DELAYED/ARRIVED journeys nobody finished → EXPIRED
+        asyncio.create_task(run_periodically(
+            "journey_reaper", JOURNEY_REAPER_INTERVAL_SECONDS, reap_stale_journeys)),
+        asyncio.create_task(run_periodically(
+            "stop_trip_rollups", STOP_ROLLUP_PRUNE_SECONDS, prune_stop_rollups)),
+    ]
+    if LIVE_FANOUT == "postgres":
+        # /live/stream clients on every worker hear every worker's events
+        relay = PostgresRelay(hub, DATABASE_URL)
+        hub.attach(relay)
+        jobs.append(asyncio.create_task(relay.run()))
+    if JOURNEY_ARCHIVE_INTERVAL_SECONDS > 0:
+        # off by default - with several workers cron + app/Scripts/archive_journeys.py is the tidier option
+        jobs.append(asyncio.create_task(run_periodically(
+            "journey_archive", JOURNEY_ARCHIVE_INTERVAL_SECONDS, run_retention)))
+    yield
+
+    for job in jobs:
+        job.cancel()
+
+    # drains what's queued before the engine goes
+    await asyncio.to_thread(group_writer.stop)
+
+    if DB_MODE == "async":
+        from app.models.Database import get_async_engine
+        await get_async_engine().dispose()
+
 
 app = FastAPI(
     title="Bus Tracker API",
     description="API for managing Belfast bus journeys, routes, and related data",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # CORS configuration
@@ -24,6 +122,10 @@ app.add_middleware(
 app.include_router(journey_endpoint)
 app.include_router(routes_endpoint)
 app.include_router(status_endpoint)
+app.include_router(prediction_endpoint)
+app.include_router(internal_endpoint)
+app.include_router(live_endpoint)
+app.include_router(stops_endpoint)
 
 @app.get("/")
 async def root():
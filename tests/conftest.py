@@ -0,0 +1,54 @@
+"""
+Shared setup. The app reads DATABASE_URL and the rate limit settings at import time, so they are
+pointed at a throwaway sqlite file and the in-memory limiter here, before any app module loads.
+
+    pytest tests/
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+_workdir = tempfile.mkdtemp(prefix="bus-tracker-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/test.db"
+os.environ["RATE_LIMIT_BACKEND"] = "memory"
+os.environ["JOURNEY_START_PER_MINUTE"] = "1000"
+os.environ["EVENT_GROUP_COMMIT"] = "0"
+os.environ.setdefault("INTERNAL_API_KEY", "test")
+
+from app.models.Database import Base, SessionLocal, engine  # noqa: E402
+from helpers import cleanup_route, seed_journeys  # noqa: E402 (imports every model)
+
+engine.echo = False
+Base.metadata.create_all(engine)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def journeys():
+    """journeys(n) → ids of n STARTED journeys on TEST_ROUTE, everything on the route is deleted afterwards"""
+    yield seed_journeys
+    cleanup_route()
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
@@ -0,0 +1,173 @@
+"""
+Seeding, races and a RESP stand-in shared by the test modules (imported as `helpers`, tests/ is on sys.path).
+"""
+
+import socketserver
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from sqlalchemy import delete
+
+from app.models.Database import SessionLocal, engine
+from app.models.Journey import Journey
+from app.models.JourneyEvent import JourneyEvent
+from app.models.Route import Route, RouteStop, Stop
+from app.models.StopArrivalStats import StopArrivalStats
+from app.models.StopTripRollup import StopTripRollup
+from app.utils.rate_limiter import MemoryBackend, RateLimiter, RespBackend, SQLiteBackend
+
+TEST_ROUTE = "TEST-ROUTE"
+TEST_STOPS = 10
+
+
+def stop_id(i: int) -> str:
+    return f"{TEST_ROUTE}-{i}"
+
+
+def seed_journeys(n: int) -> list:
+    """n STARTED journeys on TEST_ROUTE (route + stops created on first use). Returns their ids."""
+    db = SessionLocal()
+    try:
+        if db.get(Route, TEST_ROUTE) is None:
+            db.add(Route(id=TEST_ROUTE, name="test route"))
+            for i in range(TEST_STOPS):
+                db.add(Stop(id=stop_id(i), name=f"Test stop {i}", latitude=54.6, longitude=-5.9 + i * 0.001))
+                db.add(RouteStop(route_id=TEST_ROUTE, stop_id=stop_id(i), sequence=i + 1))
+            db.flush()
+
+        now = datetime.now(timezone.utc)
+        ids = [str(uuid4()) for _ in range(n)]
+        db.add_all([
+            Journey(
+                id=journey_id, route_id=TEST_ROUTE,
+                start_stop_id=stop_id(k % (TEST_STOPS - 1)), end_stop_id=stop_id(TEST_STOPS - 1),
+                status="STARTED", created_at=now, planned_start_time=now,
+                predicted_status="PENDING", predicted_arrival=now.isoformat(),
+                data_source="test", is_synthetic=True,
+            )
+            for k, journey_id in enumerate(ids)
+        ])
+        db.commit()
+        return ids
+    finally:
+        db.close()
+
+
+def cleanup_route() -> None:
+    with engine.begin() as conn:
+        conn.execute(delete(JourneyEvent).where(JourneyEvent.route_id == TEST_ROUTE))
+        conn.execute(delete(StopTripRollup).where(StopTripRollup.stop_id.like(f"{TEST_ROUTE}-%")))
+        conn.execute(delete(Journey).where(Journey.route_id == TEST_ROUTE))
+        conn.execute(delete(StopArrivalStats).where(StopArrivalStats.route_id == TEST_ROUTE))
+        conn.execute(delete(RouteStop).where(RouteStop.route_id == TEST_ROUTE))
+        conn.execute(delete(Stop).where(Stop.id.like(f"{TEST_ROUTE}-%")))
+        conn.execute(delete(Route).where(Route.id == TEST_ROUTE))
+
+
+def race(journey_id: str, events, threads: int, send) -> Counter:
+    """threads callers released together, event i % len(events) each → Counter of "<event> ok" / status codes"""
+    from fastapi import HTTPException
+
+    barrier = threading.Barrier(threads)
+
+    def tap(i):
+        event = events[i % len(events)]
+        barrier.wait()
+        try:
+            send(journey_id, event)
+            return f"{event} ok"
+        except HTTPException as e:
+            return str(e.status_code)
+        except Exception as e:
+            return type(e).__name__
+
+    with ThreadPoolExecutor(threads) as pool:
+        return Counter(pool.map(tap, range(threads)))
+
+
+class _StandIn(socketserver.StreamRequestHandler):
+    """Just enough of the RESP protocol for RespBackend (SET NX PX / INCR / DECR / PTTL / DEL)"""
+
+    disable_nagle_algorithm = True
+    store = {}  # key → (value, expires_at or None)
+    lock = threading.Lock()
+
+    def _reply(self, value):
+        if isinstance(value, int):
+            self.wfile.write(b":%d\r\n" % value)
+        elif value is None:
+            self.wfile.write(b"$-1\r\n")
+        else:
+            self.wfile.write(b"+%s\r\n" % value.encode())
+
+    def _get(self, key, now):
+        entry = self.store.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            del self.store[key]
+            return None
+        return entry
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                size = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(size + 2)[:-2].decode())
+
+            cmd, key = args[0].upper(), args[1] if len(args) > 1 else None
+            with self.lock:
+                now = time.monotonic()
+                entry = self._get(key, now) if key is not None else None
+                if cmd in ("PING", "AUTH", "SELECT"):
+                    self._reply("OK")
+                elif cmd == "SET":
+                    opts = [a.upper() for a in args[3:]]
+                    if "NX" in opts and entry is not None:
+                        self._reply(None)
+                        continue
+                    px = int(args[3 + opts.index("PX") + 1]) if "PX" in opts else None
+                    self.store[key] = (args[2], now + px / 1000 if px else None)
+                    self._reply("OK")
+                elif cmd in ("INCR", "DECR"):
+                    step = 1 if cmd == "INCR" else -1
+                    value = int(entry[0]) + step if entry else step
+                    self.store[key] = (str(value), entry[1] if entry else None)
+                    self._reply(value)
+                elif cmd == "DEL":
+                    self._reply(1 if self.store.pop(key, None) is not None else 0)
+                elif cmd == "PTTL":
+                    if entry is None:
+                        self._reply(-2)
+                    else:
+                        self._reply(-1 if entry[1] is None else int((entry[1] - now) * 1000))
+                else:
+                    self.wfile.write(b"-ERR unknown command\r\n")
+
+
+def start_stand_in() -> str:
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _StandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"redis://127.0.0.1:{server.server_address[1]}/0"
+
+
+def make_backend(kind: str, target):
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(target)
+    return RespBackend(target)
+
+
+def allowed_hits(args) -> int:
+    """Pool worker: a fresh limiter in this process, `hits` hits on one key → how many got through"""
+    kind, target, key, limit, hits = args
+    limiter = RateLimiter(make_backend(kind, target))
+    return sum(limiter.hit(limit, key).allowed for _ in range(hits))
@@ -0,0 +1,86 @@
+"""
+The backtest (app/Services/Prediction/backtest.py) feeds predictors what the live path would have had:
+headway profiles from the days before only, and the downstream ETA from the last upstream arrival.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.Services.Prediction import backtest
+from app.Services.Prediction.backtest import JourneyRecord, route_histories, run_backtest, shard_profiles
+from app.Services.Prediction.segments import SegmentMatrix
+
+DAYS = 29  # profiles are per weekday slot, 4 Mondays before the last one
+FIRST_DAY = datetime(2026, 3, 2, tzinfo=timezone.utc)  # a Monday
+MATRIX = SegmentMatrix(["a", "b", "c"], np.array([0.0, 5.0, 12.0]))
+
+calls = []
+
+
+def recorder(**kwargs):
+    calls.append(kwargs)
+    return kwargs["now"] + timedelta(minutes=10), 0.5
+
+
+def make_records():
+    """Every 15 minutes 08:00-10:00: a bus reported at stop a, riders headed for c"""
+    records = []
+    for day in range(DAYS):
+        for i in range(9):
+            planned = FIRST_DAY + timedelta(days=day, hours=8, minutes=15 * i)
+            arrived = planned + timedelta(minutes=3)
+            records.append(JourneyRecord(
+                route_id="R", stop_id="c",
+                created_ts=(planned - timedelta(minutes=5)).timestamp(), arrival_ts=arrived.timestamp(),
+                status="STOP_REACHED", start_stop_id="a", planned_ts=planned.timestamp(),
+            ))
+    return records
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    calls.clear()
+    yield
+    backtest._init_worker({}, {})
+
+
+def test_profiles_only_see_the_days_before():
+    records = make_records()
+    backtest._init_worker(route_histories(records), {})
+
+    day_start = (FIRST_DAY + timedelta(days=21)).timestamp()
+    profiles = shard_profiles("R", day_start, lookback_days=21)
+    assert profiles.samples.sum() == 21 * 9
+
+    signal = profiles.lookup("R", "c", FIRST_DAY + timedelta(days=21, hours=8, minutes=30))
+    assert signal is not None and signal.samples == 3
+    assert signal.lateness_min == pytest.approx(3.0)
+    assert signal.headway_min == pytest.approx(15.0)
+
+    assert shard_profiles("R", FIRST_DAY.timestamp(), lookback_days=7).samples.sum() == 0
+
+
+def test_predictors_get_profile_and_downstream_eta():
+    report = run_backtest(
+        make_records(), predictors=["test_backtest:recorder"], horizon_min=10, workers=1,
+        use_timetable=False, profile_days=28, matrices={"R": MATRIX},
+    )
+    assert report["test_backtest:recorder"]["R"]["count"] == len(calls)
+
+    # nothing from the day itself or later: no weekday has 3 earlier samples before the fourth week
+    assert all(c["profile"] is None for c in calls if c["now"] < FIRST_DAY + timedelta(days=21))
+    assert any(c["profile"] is not None for c in calls if c["now"] >= FIRST_DAY + timedelta(days=21))
+
+    # 10 minutes before a report at a, the previous one (15 minutes earlier) is 5 minutes old
+    with_eta = [c for c in calls if c["downstream_eta"] is not None]
+    assert with_eta
+    for c in with_eta:
+        assert c["downstream_eta"] - c["now"] == timedelta(minutes=12 - 5)
+
+
+def test_baseline_without_profiles_or_matrices():
+    run_backtest(make_records(), predictors=["test_backtest:recorder"], workers=1,
+                 use_timetable=False, profile_days=0)
+    assert calls and all(c["profile"] is None and c["downstream_eta"] is None for c in calls)
@@ -0,0 +1,117 @@
+"""
+Streaming CIF parser (app/utils/cif_parser.py) on small inline files: journeys that run past midnight,
+written either way (times going backwards or 2400 and up), and what TimetableIndex.next_after makes of them.
+"""
+
+from datetime import date, datetime
+
+import pytest
+
+from app.utils.cif_parser import OPEN_ENDED, iter_stop_times
+from app.utils.timetable_index import TimetableIndex
+
+MON_FRI = 0b0011111
+TUE_SAT = 0b0111110
+
+
+def qs(journey: str, route: str, days: str, valid_from: str = "20260105", valid_to: str = "99999999",
+       transaction: str = "N") -> str:
+    line = f"QS{transaction}MET {journey:<6}{valid_from}{valid_to}{days}  {route:<4}"
+    return f"{line:<64}O"
+
+
+def qo(stop: str, departs: str) -> str:
+    return f"QO{stop:<12}{departs}"
+
+
+def qi(stop: str, arrives: str, departs: str) -> str:
+    return f"QI{stop:<12}{arrives}{departs}"
+
+
+def qt(stop: str, arrives: str) -> str:
+    return f"QT{stop:<12}{arrives}"
+
+
+CIF = [
+    "QHN MET  20260105",
+    # weekdays, wraps around midnight with the time going backwards
+    qs("1", "1A", "1111100", valid_to="20260131"),
+    qo("700000000001", "2340"),
+    qi("700000000002", "2350", "2352"),
+    qi("700000000003", "0003", "0005"),
+    qt("700000000004", "0015"),
+    # Sundays only, after midnight written as 24xx → lands on Monday
+    qs("2", "2B", "0000001"),
+    qo("700000000011", "2330"),
+    qi("700000000012", "2355", "2405"),
+    qt("700000000013", "2410"),
+    # deleted journey, ignored
+    qs("3", "3C", "1111111", transaction="D"),
+    qo("700000000021", "1200"),
+    qt("700000000022", "1210"),
+]
+
+
+@pytest.fixture
+def cif(tmp_path):
+    path = tmp_path / "timetable.cif"
+    path.write_text("\r\n".join(CIF) + "\r\n")
+    return path
+
+
+@pytest.fixture
+def rows(cif):
+    return {row.stop_id: row for row in iter_stop_times(cif)}
+
+
+def test_backwards_time_rolls_into_the_next_day(rows):
+    before, after = rows["700000000002"], rows["700000000003"]
+
+    assert (before.minute, before.days_mask, before.valid_from) == (23 * 60 + 52, MON_FRI, date(2026, 1, 5))
+    assert (after.minute, after.days_mask) == (5, TUE_SAT)
+    assert (after.valid_from, after.valid_to) == (date(2026, 1, 6), date(2026, 2, 1))
+    assert rows["700000000004"].minute == 15
+    assert [rows[f"70000000000{i}"].sequence for i in range(1, 5)] == [1, 2, 3, 4]
+
+
+def test_times_from_2400_roll_into_the_next_day(rows):
+    before, after, last = rows["700000000011"], rows["700000000012"], rows["700000000013"]
+
+    assert (before.minute, before.days_mask) == (23 * 60 + 30, 0b1000000)
+    # Sunday's mask wraps round to Monday, an open ended validity stays open
+    assert (after.minute, after.days_mask, after.valid_to) == (5, 0b0000001, OPEN_ENDED)
+    assert after.valid_from == date(2026, 1, 6)
+    assert (last.minute, last.days_mask) == (10, 0b0000001)
+
+
+def test_deleted_journeys_are_skipped(rows):
+    assert "700000000021" not in rows and "700000000022" not in rows
+
+
+@pytest.mark.parametrize("when, expected", [
+    # Monday just after midnight: Sunday night's weekday run doesn't exist, Tuesday's does
+    (datetime(2026, 1, 5, 0, 1), (5, True)),
+    (datetime(2026, 1, 6, 0, 1), (5, False)),
+    # Friday night's journey is Saturday morning at this stop
+    (datetime(2026, 1, 9, 23, 59), (5, True)),
+    (datetime(2026, 1, 10, 0, 1), (5, False)),
+    # Saturday's isn't: nothing Saturday later on, nothing on Sunday
+    (datetime(2026, 1, 10, 0, 6), None),
+    # past the shifted validity (valid_to 31 Jan → 1 Feb)
+    (datetime(2026, 1, 31, 0, 1), (5, False)),
+    (datetime(2026, 2, 3, 0, 1), None),
+])
+def test_next_after_past_midnight(cif, when, expected):
+    index = TimetableIndex.from_rows(iter_stop_times(cif))
+    assert index.next_after("700000000003", when, "1A") == expected
+
+
+@pytest.mark.parametrize("when, expected", [
+    (datetime(2026, 1, 11, 12, 0), (10, True)),   # Sunday → Monday 00:10
+    (datetime(2026, 1, 12, 0, 0), (10, False)),   # Monday
+    (datetime(2026, 1, 12, 0, 10), None),         # next one is a week away
+    (datetime(2026, 1, 4, 23, 0), None),          # the Sunday before it's valid, Monday the 5th isn't either
+])
+def test_next_after_from_2400_times(cif, when, expected):
+    index = TimetableIndex.from_rows(iter_stop_times(cif))
+    assert index.next_after("700000000013", when, "2B") == expected
@@ -0,0 +1,40 @@
+"""The live push (eventHandler._publish) against a /journeys/status/{route_id} poll made right after the event."""
+
+import asyncio
+import json
+
+import pytest
+
+from app.utils.pubsub import hub
+from helpers import TEST_ROUTE
+
+
+@pytest.fixture
+def subscription():
+    loop = asyncio.new_event_loop()
+    hub.bind(loop)
+    sub = hub.subscribe([f"route:{TEST_ROUTE}"])
+    try:
+        yield loop, sub
+    finally:
+        hub.unsubscribe(sub)
+        hub._loop = None
+        loop.close()
+
+
+def test_push_matches_the_poll(client, journeys, subscription):
+    loop, sub = subscription
+    journey_id, = journeys(1)
+
+    # warm the poll cache with the pre-event answer
+    before = client.get(f"/journeys/status/{TEST_ROUTE}").json()
+    assert before["current_status"] == "STARTED"
+
+    assert client.post(f"/journeys/{journey_id}/event", json={"event": "ARRIVED"}).status_code == 200
+    pushed = json.loads(loop.run_until_complete(asyncio.wait_for(sub.get(), 5)))
+    polled = client.get(f"/journeys/status/{TEST_ROUTE}").json()
+
+    assert pushed["current_status"] == "ARRIVED"
+    assert {key: pushed[key] for key in polled} == polled
+    assert pushed["journey_id"] == journey_id and pushed["event"] == "ARRIVED"
+    assert "predicted_arrival" in pushed and "confidence" in pushed
@@ -0,0 +1,70 @@
+"""
+What one worker's journey event changes, replayed on the others through the live relay
+(app/utils/pubsub.py). The NOTIFY round trip is done by hand: the sender's outbox → every relay's _on_notify.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.Services.Prediction import segments
+from app.Services.Prediction.segments import SegmentMatrix, downstream_eta, propagate_arrival
+from app.utils.pubsub import Hub, PostgresRelay
+
+
+class Worker:
+    def __init__(self):
+        self.hub = Hub()
+        self.relay = PostgresRelay(self.hub, "postgresql://unused/db")
+        self.relay._connected = True
+        self.hub.attach(self.relay)
+        self.applied = []
+        self.hub.on("journey_event", self.applied.append)
+
+
+def deliver(sender: Worker, workers) -> None:
+    while not sender.relay._outbox.empty():
+        payload, _, _ = sender.relay._outbox.get_nowait()
+        for worker in workers:
+            worker.relay._on_notify(None, 0, worker.relay.channel, payload)
+
+
+def test_broadcast_reaches_the_other_workers_only():
+    workers = [Worker() for _ in range(3)]
+    sender = workers[0]
+    change = {"route_id": "9B", "stop_id": "700000001", "start_stop_id": "700000000", "arrived_at": None}
+
+    sender.relay.offer_broadcast("journey_event", change)
+    deliver(sender, workers)
+
+    # the sender applied it before broadcasting, so its own copy is skipped
+    assert [w.applied for w in workers] == [[], [change], [change]]
+
+
+def test_broadcast_lost_while_disconnected():
+    worker = Worker()
+    worker.relay._connected = False
+    worker.relay.offer_broadcast("journey_event", {"route_id": "9B"})
+    assert worker.relay._outbox.empty()
+    assert worker.relay.stats()["broadcasts_lost"] == 1
+
+
+@pytest.fixture
+def route(monkeypatch):
+    matrix = SegmentMatrix(["a", "b", "c"], np.array([0.0, 5.0, 12.0]))
+    monkeypatch.setattr(segments, "_matrices", {"R": matrix})
+    monkeypatch.setattr(segments, "_downstream", {})
+    return matrix
+
+
+def test_newest_arrival_wins_whatever_the_order(route):
+    now = datetime.now(timezone.utc)
+    older, newer = now - timedelta(minutes=10), now - timedelta(minutes=2)
+
+    propagate_arrival("R", "a", newer)
+    propagate_arrival("R", "a", older)  # relayed late
+    assert downstream_eta("R", "c", now) == newer + timedelta(minutes=12)
+
+    propagate_arrival("R", "a", newer)  # and twice
+    assert downstream_eta("R", "c", now) == newer + timedelta(minutes=12)
@@ -0,0 +1,112 @@
+"""
+Rate limiter backends (app/utils/rate_limiter.py) and the journey event cooldown on top of them.
+The redis backend runs against the RESP stand-in in helpers.py.
+"""
+
+import time
+from multiprocessing import Pool
+from uuid import uuid4
+
+import pytest
+
+from app.dependencies import rate_limit
+from app.utils.rate_limiter import MemoryBackend, RateLimit, RateLimiter
+from helpers import allowed_hits, make_backend, start_stand_in
+
+
+@pytest.fixture(scope="module")
+def stand_in():
+    return start_stand_in()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path, stand_in):
+    target = {"memory": None, "sqlite": str(tmp_path / "ratelimit.db"), "redis": stand_in}[request.param]
+    return request.param, target
+
+
+@pytest.fixture
+def limiter(backend):
+    return RateLimiter(make_backend(*backend))
+
+
+def test_cooldown(limiter):
+    cooldown = RateLimit("cooldown", 1, 0.3)
+    key = str(uuid4())
+
+    first, second = limiter.hit(cooldown, key), limiter.hit(cooldown, key)
+    assert first.allowed and not second.allowed
+    assert 0 < second.retry_after <= 0.3
+
+    time.sleep(0.35)
+    assert limiter.hit(cooldown, key).allowed
+    assert limiter.errors == 0
+
+
+def test_refund(limiter):
+    limit = RateLimit("refund", 1, 60)
+    key = str(uuid4())
+
+    assert limiter.hit(limit, key).allowed
+    limiter.refund(limit, key)
+    assert limiter.hit(limit, key).allowed
+    assert not limiter.hit(limit, key).allowed
+    assert limiter.stats()["refunded"] == 1
+
+
+def test_burst(limiter):
+    burst = RateLimit("burst", 5, 60)
+    key = str(uuid4())
+    assert sum(limiter.hit(burst, key).allowed for _ in range(8)) == 5
+
+
+def test_shared_across_processes(backend):
+    kind, target = backend
+    processes, hits = 4, 50
+    limit = RateLimit("shared", 20, 600)
+    with Pool(processes) as pool:
+        allowed = sum(pool.map(allowed_hits, [(kind, target, str(uuid4()), limit, hits)] * processes))
+
+    # the in-memory backend is per process, the shared ones hand out capacity once in total
+    assert allowed == limit.capacity * (processes if kind == "memory" else 1)
+
+
+def test_memory_backend_bounded():
+    backend = MemoryBackend(max_keys=1000)
+    limiter = RateLimiter(backend)
+    limit = RateLimit("flood", 1, 180)
+    for i in range(10_000):
+        limiter.hit(limit, str(i))
+    assert backend.stats()["keys"] == 1000
+
+
+@pytest.fixture
+def fresh_limiter(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_limiter", RateLimiter(MemoryBackend()))
+    return rate_limit._limiter
+
+
+def test_refused_events_keep_the_cooldown(client, journeys, db, fresh_limiter):
+    from app.models.Journey import Journey
+
+    journey_id, finished_id = journeys(2)
+    db.query(Journey).filter(Journey.id == finished_id).update({"status": "STOP_REACHED"})
+    db.commit()
+
+    # bad bodies never reach the limiter
+    assert client.post(f"/journeys/{journey_id}/event", json={}).status_code == 422
+    assert client.post(f"/journeys/{journey_id}/event", json={"event": ""}).status_code == 400
+    # refused by the handler → token refunded
+    assert client.post(f"/journeys/{journey_id}/event", json={"event": "BOARDED"}).status_code == 400
+    unknown = uuid4()
+    assert client.post(f"/journeys/{unknown}/event", json={"event": "ARRIVED"}).status_code == 404
+    assert client.post(f"/journeys/{unknown}/event", json={"event": "ARRIVED"}).status_code == 404
+    assert client.post(f"/journeys/{finished_id}/event", json={"event": "ARRIVED"}).status_code == 409
+    assert client.post(f"/journeys/{finished_id}/event", json={"event": "ARRIVED"}).status_code == 409
+
+    # the first event that is recorded starts the cooldown
+    assert client.post(f"/journeys/{journey_id}/event", json={"event": "ARRIVED"}).status_code == 200
+    refused = client.post(f"/journeys/{journey_id}/event", json={"event": "DELAYED"})
+    assert refused.status_code == 429
+    assert int(refused.headers["Retry-After"]) > 0
+    assert fresh_limiter.stats()["refunded"] == 5
@@ -0,0 +1,32 @@
+"""Journey retention (app/Services/journeyService/retention.py): only finished journeys leave the hot table."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models.Journey import Journey
+from app.Services.journeyService.retention import archive_journeys, min_retention_days, run_retention
+
+pytest.importorskip("pyarrow")
+
+
+def test_in_flight_journeys_are_not_archived(journeys, db, tmp_path):
+    ids = journeys(5)
+    old = datetime.now(timezone.utc) - timedelta(days=60)
+    statuses = dict(zip(ids, ["STARTED", "DELAYED", "ARRIVED", "STOP_REACHED", "EXPIRED"]))
+    for journey_id, status in statuses.items():
+        db.query(Journey).filter(Journey.id == journey_id).update({"status": status, "created_at": old})
+    db.commit()
+
+    report = archive_journeys(old + timedelta(days=1), str(tmp_path))
+
+    assert report["rows"] == 2
+    left = {row.id: row.status for row in db.query(Journey.id, Journey.status).filter(Journey.id.in_(ids))}
+    assert left == {journey_id: status for journey_id, status in statuses.items()
+                    if status in ("STARTED", "DELAYED", "ARRIVED")}
+
+
+def test_window_shorter_than_the_reaper_limit_is_refused(tmp_path):
+    assert min_retention_days() >= 1
+    with pytest.raises(ValueError):
+        run_retention(min_retention_days() - 1, str(tmp_path))
@@ -0,0 +1,126 @@
+"""
+stop_trip_rollups (app/Services/stopService/trip_rollups.py) against a recount from journeys,
+and /journeys/status/stop against the COUNT(DISTINCT) it replaced.
+"""
+
+import threading
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import and_, func
+
+from app.models.Database import SessionLocal, engine
+from app.models.Journey import Journey, active_filter
+from app.models.Route import RouteStop
+from app.models.StopTripRollup import StopTripRollup
+from app.routers import status
+from app.Services.journeyService.reaper import _expire_batch
+from app.Services.stopService.trip_rollups import (
+    STOP_ROLLUP_HOURS, ensure_stop_rollups, expected_rollups, hour_bucket, rebuild_stop_rollups, record_start,
+    stored_rollups,
+)
+from helpers import TEST_ROUTE
+
+STOPS = [f"{TEST_ROUTE}-{i}" for i in (0, 4, 9)]
+
+
+def _since():
+    return hour_bucket(datetime.now(timezone.utc) - timedelta(hours=STOP_ROLLUP_HOURS))
+
+
+def assert_consistent(db):
+    since = _since()
+    assert stored_rollups(db, since) == expected_rollups(db, since)
+
+
+def old_counts(db, stop_id: str, hours: int):
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
+    trips = (
+        db.query(func.count(func.distinct(Journey.id)))
+        .join(RouteStop, and_(RouteStop.route_id == Journey.route_id, RouteStop.stop_id == stop_id))
+        .filter(Journey.created_at >= cutoff)
+    )
+    return trips.scalar(), trips.filter(active_filter()).scalar()
+
+
+@pytest.fixture
+def uncached_status(monkeypatch):
+    monkeypatch.setattr(status, "status_flight", type(status.status_flight)(ttl_seconds=0))
+
+
+def test_new_table_is_counted_in(journeys, db):
+    journeys(20)
+    StopTripRollup.__table__.drop(engine)
+    ensure_stop_rollups()
+    assert_consistent(db)
+
+
+def test_starts_events_and_reaper(client, journeys, db, uncached_status):
+    # seeded around the services, like a restore - count it in first
+    journeys(1)
+    rebuild_stop_rollups(db)
+    assert_consistent(db)
+
+    body = {"route_id": TEST_ROUTE, "start_stop_id": STOPS[0], "end_stop_id": STOPS[1]}
+    ids = [client.post("/journeys/start", json=body).json()["journey_id"] for _ in range(6)]
+    for journey_id, event in zip(ids, ["ARRIVED", "DELAYED", "STOP_REACHED", "STOP_REACHED"]):
+        assert client.post(f"/journeys/{journey_id}/event", json={"event": event}).status_code == 200
+    assert_consistent(db)
+
+    def endpoint_matches():
+        for stop_id in STOPS:
+            for hours in (1, 3, 24):
+                got = client.get(f"/journeys/status/stop/{stop_id}?hours={hours}").json()
+                assert (got["total_trips"], got["active_trips"]) == old_counts(db, stop_id, hours)
+
+    endpoint_matches()
+
+    assert _expire_batch(db, TEST_ROUTE, datetime.now(timezone.utc) + timedelta(hours=1), 500) > 0
+    db.expire_all()
+    assert_consistent(db)
+    endpoint_matches()
+
+
+def test_rebuild_keeps_concurrent_starts(journeys, db):
+    journeys(1)
+    stop = threading.Event()
+    errors = []
+
+    def starter():
+        while not stop.is_set():
+            session = SessionLocal()
+            try:
+                now = datetime.now(timezone.utc)
+                journey = Journey(
+                    id=str(uuid4()), route_id=TEST_ROUTE, start_stop_id=STOPS[0], end_stop_id=STOPS[1],
+                    status="STARTED", created_at=now, planned_start_time=now,
+                    predicted_status="PENDING", predicted_arrival=now.isoformat(),
+                    data_source="test", is_synthetic=True,
+                )
+                session.add(journey)
+                session.flush()
+                record_start(session, journey)
+                session.commit()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                session.close()
+
+    threads = [threading.Thread(target=starter) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(15):
+            session = SessionLocal()
+            try:
+                rebuild_stop_rollups(session)
+            finally:
+                session.close()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    assert not errors
+    assert_consistent(db)
@@ -0,0 +1,57 @@
+"""
+Identical events released together on one journey: exactly one transition wins, everyone else gets a 409.
+app/Scripts/check_transitions.py runs the same races with more threads against any database.
+"""
+
+import pytest
+
+from app.models.Database import SessionLocal
+from app.Services.journeyService.eventHandler import JourneyEventHandler
+from app.Services.journeyService.group_commit import GroupCommitWriter
+from helpers import race
+
+THREADS = 16
+ROUNDS = 5
+
+# ARRIVED twice, DELAYED twice, STOP_REACHED twice - and a mixed race where the order decides
+RACES = [
+    ["ARRIVED"],
+    ["DELAYED"],
+    ["STOP_REACHED"],
+    ["DELAYED", "ARRIVED", "STOP_REACHED"],
+]
+
+
+def _direct(journey_id, event):
+    db = SessionLocal()
+    try:
+        JourneyEventHandler.add_event(journey_id=journey_id, event_type=event, db=db)
+    finally:
+        db.close()
+
+
+@pytest.fixture(params=["direct", "group commit"])
+def send(request):
+    if request.param == "direct":
+        yield _direct
+        return
+    writer = GroupCommitWriter()
+    writer.start()
+    try:
+        yield writer.add_event
+    finally:
+        writer.stop()
+
+
+@pytest.mark.parametrize("events", RACES, ids="/".join)
+def test_one_winner_per_transition(send, events, journeys):
+    for journey_id in journeys(ROUNDS):
+        outcome = race(journey_id, events, THREADS, send)
+        wins = {key: n for key, n in outcome.items() if key.endswith(" ok")}
+
+        # losers only ever see a 409, never a 500 / lock error
+        assert set(outcome) - set(wins) <= {"409"}, outcome
+        # a mixed race can chain DELAYED → ARRIVED → STOP_REACHED, but no event type lands twice
+        assert wins and all(n == 1 for n in wins.values()), outcome
+        if len(events) == 1:
+            assert sum(wins.values()) == 1, outcome
@@ -0,0 +1,75 @@
+"""
+vectorized.predict_bus_times against the scalar logic.predict_bus_time it mirrors.
+Random queries from fixed seeds, built to reach every branch: fresh / stale ARRIVED, delays,
+downstream ETAs, crowd history, timetable missed or not, profile lateness / headway.
+"""
+
+import random
+from datetime import datetime, time as dtime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.Services.Prediction.logic import predict_bus_time
+from app.Services.Prediction.profiles import ProfileSignal
+from app.Services.Prediction.vectorized import pack_queries, predict_bus_times
+
+# datetime works in whole microseconds, the arrays in float seconds
+TOLERANCE_SECONDS = 1e-3
+CONF_TOLERANCE = 1e-9
+
+
+def random_query(rng: random.Random) -> dict:
+    now = datetime(2026, 1, 5, tzinfo=timezone.utc) + timedelta(seconds=rng.uniform(0, 14 * 86400))
+
+    def around(lo_min, hi_min):
+        return now + timedelta(minutes=rng.uniform(lo_min, hi_min))
+
+    events = [
+        {"type": rng.choice(["ARRIVED", "ARRIVED", "DELAYED", "STARTED"]), "time": around(-30, 1)}
+        for _ in range(rng.choice([0, 0, 1, 2, 5]))
+    ]
+    past = sorted((around(-200, 20) for _ in range(rng.choice([0, 1, 3, 10, 14]))), reverse=True)
+
+    static_time, is_tomorrow = None, False
+    if rng.random() < 0.7:
+        at = around(-40, 60)
+        static_time = dtime(at.hour, at.minute)
+        is_tomorrow = rng.random() < 0.1
+
+    profile = None
+    if rng.random() < 0.5:
+        profile = ProfileSignal(
+            headway_min=rng.choice([None, rng.uniform(4, 40)]),
+            lateness_min=rng.choice([None, rng.uniform(-10, 25)]),
+            samples=rng.randint(3, 50),
+        )
+
+    return {
+        "static_time": static_time,
+        "static_is_tomorrow": is_tomorrow,
+        "user_events": events,
+        "past_arrivals": past,
+        "now": now,
+        "profile": profile,
+        "downstream_eta": around(-5, 30) if rng.random() < 0.3 else None,
+    }
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_scalar(seed):
+    rng = random.Random(seed)
+    queries = [random_query(rng) for _ in range(2000)]
+
+    scalar = [predict_bus_time(**q) for q in queries]
+    pred, conf = predict_bus_times(**pack_queries(queries))
+
+    expected_pred = np.array([p.timestamp() for p, _ in scalar])
+    expected_conf = np.array([c for _, c in scalar])
+    np.testing.assert_allclose(pred, expected_pred, rtol=0, atol=TOLERANCE_SECONDS)
+    np.testing.assert_allclose(conf, expected_conf, rtol=0, atol=CONF_TOLERANCE)
+
+
+def test_empty_batch():
+    pred, conf = predict_bus_times(**pack_queries([]))
+    assert len(pred) == len(conf) == 0